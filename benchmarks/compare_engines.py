@@ -0,0 +1,51 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""Compares the greedy and the multilevel fragmentation engines
+with respect to cut bonds, fragment size variance and runtime.
+
+Usage::
+
+    python benchmarks/compare_engines.py
+"""
+
+import os
+import time
+import numpy as np
+
+from fragmentino import MolecularFragmenter
+
+root = os.path.join(os.path.dirname(__file__), "..")
+
+systems = [
+    (os.path.join(root, "fragmentino", "tests", "small_molecule_4.xyz"), [5, 10]),
+    (os.path.join(root, "fragmentino", "tests", "medium_molecule_1.xyz"), [5, 10, 20]),
+    (os.path.join(root, "docs", "dna_strand.xyz"), [10, 30, 60]),
+]
+
+
+def compare_engines():
+    header = f"{'system':24} {'size':>5} {'engine':>10} {'fragments':>9}"
+    header += f" {'cut bonds':>9} {'variance':>9} {'time (s)':>9}"
+    print(header)
+
+    for file_name, max_fragment_sizes in systems:
+        for max_fragment_size in max_fragment_sizes:
+            for engine in ["greedy", "multilevel"]:
+                start = time.perf_counter()
+                f = MolecularFragmenter(max_fragment_size, file_name, engine=engine)
+                elapsed = time.perf_counter() - start
+
+                print(
+                    f"{os.path.basename(file_name):24} {max_fragment_size:5d} {engine:>10}"
+                    f" {f.n_fragments:9d} {f.n_cut_bonds:9d}"
+                    f" {np.var(f.fragment_sizes):9.1f} {elapsed:9.3f}"
+                )
+
+
+if __name__ == "__main__":
+    compare_engines()
@@ -0,0 +1,118 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""Deterministic generators of scalable systems for the benchmarks.
+
+Every generator takes an approximate number of atoms and returns the atomic
+numbers and Cartesian coordinates (Angstrom) of a system with at least that
+many atoms, with bonds that are found with the default ``bond_factor=1.3``.
+"""
+
+import os
+import numpy as np
+
+from fragmentino.io import FileHandlerXYZ
+from fragmentino.periodic_table import symbol_to_Z
+
+root = os.path.join(os.path.dirname(__file__), "..")
+
+
+def get_water_box(n_atoms):
+    """Water molecules on a cubic grid with a spacing of 3.1 Angstrom"""
+    n_molecules = -(-n_atoms // 3)
+    n = int(np.ceil(n_molecules ** (1 / 3) - 1e-9))
+
+    grid = np.stack(np.meshgrid(*[3.1 * np.arange(n)] * 3, indexing="ij"), axis=-1)
+    grid = grid.reshape(-1, 3)[:n_molecules]
+    water = np.array([[0.0, 0.0, 0.0], [0.96, 0.0, 0.0], [-0.24, 0.93, 0.0]])
+
+    xyz = (grid[:, None, :] + water).reshape(-1, 3)
+    Z = np.tile([8, 1, 1], n_molecules)
+    return Z, xyz
+
+
+def get_alkane_chain(n_atoms):
+    """A linear alkane C(n)H(2n+2) in the all-trans (zigzag) conformation"""
+    n_carbons = max(1, -(-(n_atoms - 2) // 3))
+    x, y = _get_zigzag(n_carbons, 1.26, 0.445)
+
+    # each carbon has two hydrogens, above and below the plane of the chain
+    hydrogens = np.repeat(np.column_stack((x, y, np.zeros(n_carbons))), 2, axis=0)
+    hydrogens[:, 1] += 0.63 * np.repeat(np.sign(y), 2)
+    hydrogens[:, 2] = np.tile([0.89, -0.89], n_carbons)
+
+    ends = np.array([[x[0] - 1.09, y[0], 0.0], [x[-1] + 1.09, y[-1], 0.0]])
+
+    xyz = np.vstack(
+        (
+            np.column_stack((x, y, np.zeros(n_carbons))),
+            hydrogens,
+            ends,
+        )
+    )
+    Z = np.hstack((np.full(n_carbons, 6), np.ones(2 * n_carbons + 2, dtype=int)))
+    return _order_along_chain(Z, xyz)
+
+
+def get_peptide_chain(n_atoms):
+    """A peptide-like chain of glycine residues (N, H, CA, 2 HA, C, O)
+    with a zigzag backbone"""
+    n_residues = max(1, -(-n_atoms // 7))
+    x, y = _get_zigzag(3 * n_residues, 1.25, 0.4)
+    backbone = np.column_stack((x, y, np.zeros(x.size)))
+    side = np.sign(y)[:, None] * np.array([0.0, 1.0, 0.0])
+
+    N, CA, C = backbone[0::3], backbone[1::3], backbone[2::3]
+    H = N + 1.01 * side[0::3]
+    O = C + 1.23 * side[2::3]
+    HA1 = CA + 0.63 * side[1::3] + [0.0, 0.0, 0.89]
+    HA2 = CA + 0.63 * side[1::3] - [0.0, 0.0, 0.89]
+
+    xyz = np.stack((N, H, CA, HA1, HA2, C, O), axis=1).reshape(-1, 3)
+    Z = np.tile([7, 1, 6, 1, 1, 6, 8], n_residues)
+    return Z, xyz
+
+
+def get_dna_strands(n_atoms):
+    """Copies of ``docs/dna_strand.xyz`` on a cubic grid, 5 Angstrom apart,
+    with the last copy cut after ``n_atoms`` atoms (in the order of the file)"""
+    symbols, strand = FileHandlerXYZ(
+        os.path.join(root, "docs", "dna_strand.xyz")
+    ).read()
+    Z = np.fromiter(map(symbol_to_Z, symbols), dtype=int)
+    strand = np.asarray(strand, dtype=float) - np.min(strand, axis=0)
+
+    n_copies = max(1, -(-n_atoms // Z.size))
+    n = int(np.ceil(n_copies ** (1 / 3) - 1e-9))
+    spacing = np.max(np.ptp(strand, axis=0)) + 5.0
+
+    grid = np.stack(np.meshgrid(*[spacing * np.arange(n)] * 3, indexing="ij"), axis=-1)
+    grid = grid.reshape(-1, 3)[:n_copies]
+
+    xyz = (grid[:, None, :] + strand).reshape(-1, 3)
+    return np.tile(Z, n_copies)[:n_atoms], xyz[:n_atoms]
+
+
+systems = {
+    "water": get_water_box,
+    "alkane": get_alkane_chain,
+    "peptide": get_peptide_chain,
+    "dna": get_dna_strands,
+}
+
+
+def _get_zigzag(n, dx, dy):
+    """Coordinates in the xy-plane of a planar zigzag chain of n atoms"""
+    x = dx * np.arange(n)
+    y = dy * np.where(np.arange(n) % 2 == 0, 1.0, -1.0)
+    return x, y
+
+
+def _order_along_chain(Z, xyz):
+    """Orders the atoms along the chain, as they would be in a typical input file"""
+    order = np.argsort(xyz[:, 0], kind="stable")
+    return Z[order], xyz[order]
@@ -0,0 +1,60 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""Measures the time to import fragmentino in fresh interpreters, as paid by every
+short-lived worker process, and the modules that take the longest to import.
+
+Exits with a non-zero status if the median import time exceeds the given limit
+(in milliseconds), such that regressions can be caught.
+
+Usage::
+
+    python benchmarks/import_time.py [n_repeats] [max_milliseconds]
+"""
+
+import subprocess
+import sys
+import numpy as np
+
+
+def get_import_times(module="fragmentino"):
+    """Cumulative import time (s) of each module, from ``python -X importtime``"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines()[1:]:
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative) * 1e-6
+
+    return times
+
+
+def measure_import_time(n_repeats, max_milliseconds=None):
+    totals = [get_import_times()["fragmentino"] for _ in range(n_repeats)]
+    median = 1000 * np.median(totals)
+
+    times = get_import_times()
+    print(f"{'module':<40} {'time (ms)':>9}")
+    for name in sorted(times, key=times.get, reverse=True)[:10]:
+        print(f"{name:<40} {1000 * times[name]:9.1f}")
+
+    print(f"median import time of fragmentino: {median:.1f} ms ({n_repeats} runs)")
+
+    if max_milliseconds is not None and median > max_milliseconds:
+        sys.exit(f"Import time exceeds {max_milliseconds} ms")
+
+
+if __name__ == "__main__":
+    measure_import_time(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10,
+        float(sys.argv[2]) if len(sys.argv) > 2 else None,
+    )
@@ -0,0 +1,63 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""Compares the runtime of the serial and the parallel bond perception
+on a box of water molecules, for an increasing number of workers.
+
+Usage::
+
+    python benchmarks/parallel_bonds.py [n_molecules_per_side]
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+from generators import get_water_box
+
+from fragmentino.neighbor_search import get_bonded_pairs
+from fragmentino.parallel_bonds import get_bonded_pairs_parallel
+from fragmentino.periodic_table import Z_to_covalent_radius
+
+
+def get_bonded_pairs_serial(xyz, Z, bond_factor=1.3):
+    """Serial bond perception with the same inputs and (sorted) output as
+    :func:`fragmentino.parallel_bonds.get_bonded_pairs_parallel`"""
+    return get_bonded_pairs(xyz, bond_factor * Z_to_covalent_radius(Z))
+
+
+def compare_workers(n):
+    Z, xyz = get_water_box(3 * n**3)
+
+    # imports (e.g. of the shared memory) are not timed
+    get_bonded_pairs_serial(xyz[:300], Z[:300])
+    get_bonded_pairs_parallel(xyz[:300], Z[:300], n_workers=1)
+
+    # both paths start from the atomic numbers and return the sorted bonds
+    start = time.perf_counter()
+    reference = get_bonded_pairs_serial(xyz, Z)
+    serial = time.perf_counter() - start
+
+    print(f"{xyz.shape[0]} atoms, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'time (s)':>9} {'speedup':>8}")
+    print(f"{'serial':>7} {serial:9.3f} {1.0:8.2f}")
+
+    n_workers = 1
+    while n_workers <= os.cpu_count():
+        start = time.perf_counter()
+        bonds = get_bonded_pairs_parallel(xyz, Z, n_workers=n_workers)
+        elapsed = time.perf_counter() - start
+
+        assert all(np.array_equal(a, b) for a, b in zip(bonds, reference))
+
+        print(f"{n_workers:7d} {elapsed:9.3f} {serial / elapsed:8.2f}")
+        n_workers *= 2
+
+
+if __name__ == "__main__":
+    compare_workers(int(sys.argv[1]) if len(sys.argv) > 1 else 40)
@@ -0,0 +1,189 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""Measures the wall time and peak memory of the stages of a fragmentation
+for synthetic systems of increasing size (see ``generators.py``), and stores
+the results as JSON such that releases can be compared.
+
+The stages are
+
+- ``read``: reading the xyz-file (:meth:`fragmentino.Molecule.from_xyz_file`)
+- ``bonds``: bond perception with the dense distance matrix
+  (:meth:`fragmentino.Molecule.get_bonds`)
+- ``bonds_linked_cells``: bond perception with linked cells
+  (:func:`fragmentino.neighbor_search.get_bonded_pairs`, serial)
+- ``fragment``: graph contraction from known bonds
+  (:meth:`fragmentino.MolecularFragmenter.from_molecule`)
+- ``cap``: :meth:`fragmentino.MolecularFragmenter.add_H_to_capped_bonds`
+
+The peak memory is measured with :mod:`tracemalloc` in a second run of each stage,
+such that the tracing does not affect the wall time.
+
+Usage::
+
+    python benchmarks/run_benchmarks.py --sizes 100 1000 10000 --output results.json
+"""
+
+import argparse
+import copy
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+# imported here, such that the lazy imports of fragmentino are not timed
+import scipy.sparse.csgraph
+import scipy.spatial
+
+from generators import systems
+
+import fragmentino
+from fragmentino import Molecule, MolecularFragmenter
+from fragmentino.neighbor_search import get_bonded_pairs
+
+stages = ["read", "bonds", "bonds_linked_cells", "fragment", "cap"]
+
+
+def measure(run, setup=lambda: None):
+    """Wall time (s) and peak memory (bytes) of ``run(setup())``"""
+    inputs = setup()
+    start = time.perf_counter()
+    run(inputs)
+    elapsed = time.perf_counter() - start
+
+    inputs = setup()
+    tracemalloc.start()
+    run(inputs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, peak
+
+
+def benchmark_system(name, n_atoms, options):
+    """Runs the stages for one system, yields a result for each stage"""
+    Z, xyz = systems[name](n_atoms)
+    m = Molecule(Z, xyz)
+    n_atoms = m.size
+
+    def get_result(stage, elapsed, peak):
+        return {
+            "system": name,
+            "n_atoms": int(n_atoms),
+            "stage": stage,
+            "time": elapsed,
+            "peak_memory": int(peak),
+        }
+
+    if "read" in options.stages:
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, name + ".xyz")
+            m.write_xyz(file_name)
+            yield get_result(
+                "read", *measure(lambda _: Molecule.from_xyz_file(file_name))
+            )
+
+    if "bonds" in options.stages and n_atoms <= options.max_dense_atoms:
+        yield get_result("bonds", *measure(lambda _: m.get_bonds()))
+
+    def get_bonds_linked_cells(_):
+        return get_bonded_pairs(m.xyz, m._get_bonding_radii(), m.cell)
+
+    bonds = np.column_stack(get_bonds_linked_cells(None))
+    if "bonds_linked_cells" in options.stages:
+        yield get_result("bonds_linked_cells", *measure(get_bonds_linked_cells))
+
+    if n_atoms > options.max_fragment_atoms:
+        return
+
+    def fragment(_):
+        return MolecularFragmenter.from_molecule(options.fragment_size, m, bonds=bonds)
+
+    if "fragment" in options.stages:
+        yield get_result("fragment", *measure(fragment))
+
+    if "cap" in options.stages:
+        f = fragment(None)
+        yield get_result(
+            "cap",
+            *measure(lambda g: g.add_H_to_capped_bonds(), lambda: copy.deepcopy(f)),
+        )
+
+
+def get_metadata():
+    return {
+        "fragmentino": fragmentino.__version__,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def run_benchmarks(options):
+    results = []
+
+    print(
+        f"{'system':>8} {'atoms':>8} {'stage':>18} {'time (s)':>9} {'peak (MB)':>10}",
+        file=sys.stderr,
+    )
+    for name in options.systems:
+        for n_atoms in options.sizes:
+            for result in benchmark_system(name, n_atoms, options):
+                results.append(result)
+                print(
+                    f"{name:>8} {result['n_atoms']:8d} {result['stage']:>18}"
+                    f" {result['time']:9.3f} {result['peak_memory'] / 1e6:10.1f}",
+                    file=sys.stderr,
+                )
+
+    report = {"metadata": get_metadata(), "results": results}
+    if options.output is None:
+        json.dump(report, sys.stdout, indent=1)
+    else:
+        with open(options.output, "w") as f:
+            json.dump(report, f, indent=1)
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--systems", nargs="+", choices=list(systems), default=list(systems)
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=[100, 1000, 10000],
+        help="approximate numbers of atoms, up to 10^6",
+    )
+    parser.add_argument("--stages", nargs="+", choices=stages, default=stages)
+    parser.add_argument("--fragment-size", type=int, default=30)
+    parser.add_argument(
+        "--max-dense-atoms",
+        type=int,
+        default=10000,
+        help="largest system for bond perception with the dense distance matrix",
+    )
+    parser.add_argument(
+        "--max-fragment-atoms",
+        type=int,
+        default=10000,
+        help="largest system that is fragmented",
+    )
+    parser.add_argument("--output", help="JSON file, default is standard output")
+    return parser
+
+
+if __name__ == "__main__":
+    run_benchmarks(get_parser().parse_args())
@@ -3,8 +3,28 @@ from fragmentino.io import FileHandlerXYZ
 from fragmentino.graph import SimpleWeightedGraph
 from fragmentino.graph import ContractableWeightedGraph
 from fragmentino.molecular_fragmenter import MolecularFragmenter
-from fragmentino.visualization_tools import MoleculeFigure
-from fragmentino.visualization_tools import MoleculePlotter
+from fragmentino.fragment_set import FragmentSet
 
 
 __version__ = "0.1.0"
+
+# plotly is only imported when the visualization tools are first used
+_lazy_imports = {
+    "MoleculeFigure": "fragmentino.visualization_tools",
+    "MoleculePlotter": "fragmentino.visualization_tools",
+}
+
+
+def __getattr__(name):
+    if name in _lazy_imports:
+        import importlib
+
+        value = getattr(importlib.import_module(_lazy_imports[name]), name)
+        globals()[name] = value
+        return value
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_lazy_imports))
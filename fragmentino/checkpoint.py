@@ -0,0 +1,126 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""Atomic storage of arrays in compressed ``.npz`` files, used for the checkpoints
+of :class:`fragmentino.MolecularFragmenter`.
+
+A file is written to a temporary file in the same directory, which replaces the
+target only when it is complete and flushed to disk. A crash while writing
+therefore never corrupts a previously written file.
+"""
+
+import json
+import os
+import tempfile
+import numpy as np
+
+checkpoint_version = 1
+
+
+def save_npz_atomic(file_name, arrays):
+    """Writes arrays to a compressed ``.npz`` file, atomically
+
+    Parameters
+    ----------
+    file_name : str
+        File name with full or relative path, used as is (no extension is added)
+    arrays : dict
+        Arrays by name
+    """
+    file_name = os.path.abspath(os.path.expanduser(file_name))
+    directory, base_name = os.path.split(file_name)
+
+    fd, temporary = tempfile.mkstemp(
+        dir=directory, prefix="." + base_name + ".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez_compressed(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temporary, file_name)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+    _fsync_directory(directory)
+
+
+def load_npz(file_name):
+    """Reads all arrays of an ``.npz`` file
+
+    Parameters
+    ----------
+    file_name : str
+        File name with full or relative path
+
+    Returns
+    -------
+    arrays : dict
+        Arrays by name
+    """
+    with np.load(os.path.expanduser(file_name), allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+def write_checkpoint(file_name, arrays, options):
+    """Writes a checkpoint, atomically
+
+    Parameters
+    ----------
+    file_name : str
+        File name with full or relative path
+    arrays : dict
+        Arrays by name
+    options : dict
+        Options and status that can be stored as JSON
+    """
+    arrays = dict(arrays)
+    arrays["version"] = np.array(checkpoint_version)
+    arrays["options"] = np.array(json.dumps(options))
+
+    save_npz_atomic(file_name, arrays)
+
+
+def read_checkpoint(file_name):
+    """Reads a checkpoint written by :func:`write_checkpoint`
+
+    Parameters
+    ----------
+    file_name : str
+        File name with full or relative path
+
+    Returns
+    -------
+    arrays : dict
+        Arrays by name
+    options : dict
+        Options and status
+    """
+    arrays = load_npz(file_name)
+
+    if "version" not in arrays or "options" not in arrays:
+        raise ValueError(f"{file_name} is not a checkpoint")
+
+    if int(arrays.pop("version")) != checkpoint_version:
+        raise ValueError("Unsupported checkpoint version")
+
+    options = json.loads(str(arrays.pop("options")))
+    return arrays, options
+
+
+def _fsync_directory(directory):
+    """Flushes the directory entry of a replaced file to disk, where supported"""
+    if not hasattr(os, "O_DIRECTORY"):
+        return  # pragma: no cover
+
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
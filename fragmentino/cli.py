@@ -0,0 +1,313 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""Command-line interface for batch fragmentation of xyz-files.
+
+The inputs are fragmented in parallel, one process per input. For every input, a
+summary is written to standard output as one line of JSON as soon as the input
+is done, such that the output can be processed in a shell pipeline, e.g.::
+
+    fragmentino structures/ --size 20 --cap --workers 8 | jq .n_fragments
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+
+from fragmentino.molecule import Molecule
+from fragmentino.molecular_fragmenter import MolecularFragmenter
+
+
+def main(argv=None):
+    """Runs the command-line interface
+
+    Parameters
+    ----------
+    argv : list, optional
+        Command-line arguments. Default is ``None``, in which case
+        ``sys.argv[1:]`` is used.
+
+    Returns
+    -------
+    status : int
+        0 if all inputs were fragmented, 1 otherwise
+    """
+    parser = _get_parser()
+    args = parser.parse_args(argv)
+
+    file_names = get_input_files(args.inputs)
+    if not file_names:
+        parser.error("no xyz-files found")
+
+    if args.workers < 1:
+        parser.error("number of workers must be positive")
+
+    cell = args.cell
+    if cell is not None:
+        if len(cell) == 9:
+            cell = [cell[0:3], cell[3:6], cell[6:9]]
+        elif len(cell) != 3:
+            parser.error("cell must be given by 3 side lengths or 9 lattice vectors")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    options = {
+        "max_fragment_size": args.size,
+        "bond_factor": args.bond_factor,
+        "cell": cell,
+        "max_motif_size": args.motif_size,
+        "max_ring_size": args.ring_size,
+        "engine": args.engine,
+        "atom_order": args.atom_order,
+        "cap": args.cap,
+        "order": args.order,
+        "layout": args.layout,
+        "output_dir": args.output_dir,
+    }
+    tasks = [(file_name, options) for file_name in file_names]
+
+    if args.workers == 1:
+        summaries = map(_fragment_file, tasks)
+        status = _write_summaries(summaries)
+    else:
+        with Pool(min(args.workers, len(tasks))) as pool:
+            status = _write_summaries(pool.imap_unordered(_fragment_file, tasks))
+
+    return status
+
+
+def get_input_files(inputs):
+    """Expands files, glob patterns and directories (all xyz-files in them)
+    into a list of file names, without duplicates
+
+    Parameters
+    ----------
+    inputs : list
+        Files, glob patterns or directories
+
+    Returns
+    -------
+    file_names : list
+    """
+    file_names = []
+    for name in inputs:
+        if os.path.isdir(name):
+            file_names.extend(sorted(glob.glob(os.path.join(name, "*.xyz"))))
+        elif glob.has_magic(name):
+            file_names.extend(sorted(glob.glob(name)))
+        else:
+            file_names.append(name)
+
+    return list(dict.fromkeys(file_names))
+
+
+def fragment_file(
+    file_name,
+    max_fragment_size,
+    bond_factor=1.3,
+    cell=None,
+    max_motif_size=None,
+    max_ring_size=None,
+    engine="greedy",
+    atom_order=None,
+    cap=False,
+    order="input",
+    layout="single",
+    output_dir=".",
+):
+    """Fragments an xyz-file and writes the fragments
+
+    Parameters
+    ----------
+    file_name : str
+        Name of the xyz-file (with full or relative path)
+    max_fragment_size : int
+        Maximal number of atoms in a fragment
+    bond_factor : float, optional
+        Factor used to determine bonds. Default is ``bond_factor=1.3``.
+    cell : list, optional
+        Lattice vectors or side lengths of the periodic cell. Default is ``None``.
+    max_motif_size : int, optional
+        See :class:`fragmentino.MolecularFragmenter`. Default is ``None``.
+    max_ring_size : int, optional
+        See :class:`fragmentino.MolecularFragmenter`. Default is ``None``.
+    engine : str, optional
+        See :class:`fragmentino.MolecularFragmenter`. Default is ``"greedy"``.
+    atom_order : str, optional
+        See :class:`fragmentino.MolecularFragmenter`. Default is ``None``.
+    cap : bool, optional
+        Whether capped bonds are saturated with hydrogen. Default is ``False``.
+    order : str, optional
+        Order of the fragments, ``"input"`` (default), ``"centrality"``,
+        ``"hilbert"`` or ``"morton"``.
+    layout : str, optional
+        ``"single"`` (default) for all fragments in one file,
+        see :meth:`fragmentino.MolecularFragmenter.write`, or ``"separate"`` for one file
+        per fragment, see :meth:`fragmentino.MolecularFragmenter.write_separate`,
+        or ``"npz"`` for a compact :class:`fragmentino.FragmentSet`
+        (``name_fragments.npz``).
+    output_dir : str, optional
+        Directory of the written files. Default is the current directory.
+
+    Returns
+    -------
+    summary : dict
+        Input, written files, number of atoms, fragments, capped bonds and added
+        hydrogens, and the time (s) of each step
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    m = Molecule.from_xyz_file(file_name, bond_factor=bond_factor, cell=cell)
+    timings["read"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    f = MolecularFragmenter.from_molecule(
+        max_fragment_size,
+        m,
+        max_motif_size=max_motif_size,
+        engine=engine,
+        max_ring_size=max_ring_size,
+        atom_order=atom_order,
+    )
+    timings["fragment"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if order == "centrality":
+        f.order_fragments_by_centrality()
+    elif order in ["hilbert", "morton"]:
+        f.order_fragments_by_space_filling_curve(order)
+    timings["order"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if cap:
+        f.add_H_to_capped_bonds()
+    timings["cap"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    file_prefix = os.path.join(
+        output_dir, os.path.splitext(os.path.basename(file_name))[0]
+    )
+    if layout == "separate":
+        f.write_separate(file_prefix)
+        outputs = [
+            file_prefix + "_fragment_" + str(i) + ".xyz" for i in range(f.n_fragments)
+        ]
+    elif layout == "npz":
+        f.get_fragment_set().save(file_prefix + "_fragments.npz")
+        outputs = [file_prefix + "_fragments.npz"]
+    else:
+        f.write(file_prefix)
+        outputs = [file_prefix + "_fragmented.xyz"]
+    timings["write"] = time.perf_counter() - start
+
+    return {
+        "input": file_name,
+        "outputs": outputs,
+        "n_atoms": int(m.size),
+        "n_fragments": int(f.n_fragments),
+        "n_capped_bonds": int(f.n_capped_bonds),
+        "n_added_H": int(f.n_added_H),
+        "timings": timings,
+    }
+
+
+def _fragment_file(task):
+    """Fragments a file, run by a worker process. Errors are reported in the summary"""
+    file_name, options = task
+    try:
+        return fragment_file(file_name, **options)
+    except Exception as error:
+        return {"input": file_name, "error": f"{type(error).__name__}: {error}"}
+
+
+def _write_summaries(summaries):
+    """Writes each summary as one line of JSON, as soon as it is available"""
+    status = 0
+    for summary in summaries:
+        if "error" in summary:
+            status = 1
+
+        print(json.dumps(summary), flush=True)
+
+    return status
+
+
+def _get_parser():
+    parser = argparse.ArgumentParser(
+        prog="fragmentino",
+        description="Fragments molecules in xyz-files. A summary of each input "
+        + "is written to standard output as one line of JSON.",
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="xyz-files, glob patterns or directories"
+    )
+    parser.add_argument(
+        "-s",
+        "--size",
+        type=int,
+        required=True,
+        help="maximal number of atoms in a fragment",
+    )
+    parser.add_argument(
+        "--bond-factor", type=float, default=1.3, help="factor used to determine bonds"
+    )
+    parser.add_argument(
+        "--cell",
+        type=float,
+        nargs="+",
+        help="side lengths (3 values) or lattice vectors (9 values) of a periodic cell",
+    )
+    parser.add_argument(
+        "--motif-size",
+        type=int,
+        help="isolated molecules with at most this many atoms are kept whole",
+    )
+    parser.add_argument(
+        "--ring-size",
+        type=int,
+        help="ring systems with at most this many atoms are kept whole",
+    )
+    parser.add_argument("--engine", choices=["greedy", "multilevel"], default="greedy")
+    parser.add_argument(
+        "--atom-order",
+        choices=["hilbert", "morton"],
+        help="order of the atoms in the bond search (space-filling curve)",
+    )
+    parser.add_argument(
+        "--cap", action="store_true", help="saturate capped bonds with hydrogen"
+    )
+    parser.add_argument(
+        "--order",
+        choices=["input", "centrality", "hilbert", "morton"],
+        default="input",
+        help="order of the fragments",
+    )
+    parser.add_argument(
+        "--layout",
+        choices=["single", "separate", "npz"],
+        default="single",
+        help="all fragments in one file, one file per fragment,"
+        " or a compact fragment set (.npz)",
+    )
+    parser.add_argument(
+        "-o", "--output-dir", default=".", help="directory of the written files"
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, default=1, help="number of worker processes"
+    )
+
+    return parser
+
+
+if __name__ == "__main__":
+    sys.exit(main())  # pragma: no cover
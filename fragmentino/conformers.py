@@ -0,0 +1,291 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+
+
+from fragmentino.molecule import Molecule
+from fragmentino.molecular_fragmenter import MolecularFragmenter
+from fragmentino.neighbor_search import get_bonded_pairs
+from fragmentino.io import FileHandlerXYZ
+from fragmentino.periodic_table import (
+    symbol_to_Z,
+    Z_to_bond_length,
+    Z_to_covalent_radius,
+)
+
+
+class ConformerEnsemble:
+    """Fragments an ensemble of conformers of a molecule with a common (consensus)
+    fragmentation
+
+    The bonds are determined for all conformers at once, with the distances of the
+    pairs that are bonded in any conformer (found with linked cells) evaluated in
+    blocks of conformers and atom pairs. A bond is part of the consensus
+    topology if it is present in at least a fraction ``consensus_threshold`` of the
+    conformers. The consensus topology is fragmented once, and the capped fragments
+    of all conformers are given as one stacked array.
+
+    Attributes
+    ----------
+    Z : numpy.ndarray
+        Atomic numbers, shared by all conformers
+    xyz : numpy.ndarray
+        Cartesian coordinates in Angstrom, of shape ``(n_conformers, n_atoms, 3)``
+    bonds : numpy.ndarray
+        Pairs of bonded atoms in the consensus topology
+    bond_lengths : numpy.ndarray
+        Length of each consensus bond in each conformer,
+        of shape ``(n_conformers, n_bonds)``
+    deviating_conformers : numpy.ndarray
+        Indices of the conformers whose bonds differ from the consensus topology
+    fragmenter : MolecularFragmenter
+        Fragmenter of the consensus topology, with the geometry of the first conformer
+    """
+
+    def __init__(
+        self,
+        Z,
+        xyz,
+        max_fragment_size,
+        bond_factor=1.3,
+        consensus_threshold=0.5,
+        block_size=10000000,
+        **options,
+    ):
+        """Creates the ensemble and fragments it
+
+        Parameters
+        ----------
+        Z : numpy.ndarray
+            Atomic numbers
+        xyz : numpy.ndarray
+            Cartesian coordinates in Angstrom, of shape ``(n_conformers, n_atoms, 3)``
+        max_fragment_size : int, float
+            Maximal number of atoms in a fragment,
+            or maximal cost of a fragment if ``cost_model`` is given.
+        bond_factor : float, optional
+            Factor used to determine bonds. Default is ``bond_factor=1.3``.
+        consensus_threshold : float, optional
+            Minimal fraction of the conformers in which a bond must be present to be
+            part of the consensus topology. Default is ``consensus_threshold=0.5``.
+        block_size : int, optional
+            Maximal number of pair distances that are evaluated at once. Default is 10⁷.
+        options : dict
+            Further options of :meth:`fragmentino.MolecularFragmenter.from_molecule`,
+            e.g. ``engine`` or ``max_ring_size``.
+        """
+        self.Z = np.atleast_1d(np.asarray(Z, dtype=int))
+        self.xyz = np.asarray(xyz, dtype=float)
+
+        if self.xyz.ndim != 3 or self.xyz.shape[1:] != (self.Z.size, 3):
+            raise ValueError("Coordinates must have shape (n_conformers, n_atoms, 3)")
+
+        self.bond_factor = bond_factor
+        self.consensus_threshold = consensus_threshold
+
+        self._find_bonds(block_size)
+
+        m = Molecule(self.Z, self.xyz[0], bond_factor)
+        bonds = np.column_stack((self.bonds, np.mean(self.bond_lengths, axis=0)))
+        self.fragmenter = MolecularFragmenter.from_molecule(
+            max_fragment_size, m, bonds=bonds, **options
+        )
+
+    @classmethod
+    def from_xyz_files(cls, file_names, max_fragment_size, **kwargs):
+        """Creates the ensemble from one xyz-file per conformer
+
+        Parameters
+        ----------
+        file_names : list
+            File names of the xyz-files with full or relative path
+        max_fragment_size : int, float
+            Maximal number of atoms in a fragment
+
+        See :class:`ConformerEnsemble` for the other parameters.
+
+        Returns
+        -------
+        ensemble : ConformerEnsemble
+        """
+        symbols, xyz = zip(
+            *[FileHandlerXYZ(file_name).read() for file_name in file_names]
+        )
+
+        if any(not np.array_equal(s, symbols[0]) for s in symbols):
+            raise ValueError("Conformers must have the same atoms")
+
+        Z = np.fromiter(map(symbol_to_Z, np.atleast_1d(symbols[0])), dtype=int)
+        return cls(Z, np.stack(xyz), max_fragment_size, **kwargs)
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}"
+            + f" Conformers: {self.n_conformers}"
+            + f" Fragments: {self.n_fragments}"
+        )
+
+    @property
+    def n_conformers(self):
+        return self.xyz.shape[0]
+
+    @property
+    def n_atoms(self):
+        return self.Z.size
+
+    @property
+    def n_fragments(self):
+        return self.fragmenter.n_fragments
+
+    @property
+    def fragment_labels(self):
+        """Fragment of each atom"""
+        return self.fragmenter.fragment_labels
+
+    def get_connectivity_differences(self, conformer):
+        """Returns the bonds of a conformer that differ from the consensus topology
+
+        Parameters
+        ----------
+        conformer : int
+            Index of the conformer
+
+        Returns
+        -------
+        missing : numpy.ndarray
+            Consensus bonds that are not present in the conformer
+        extra : numpy.ndarray
+            Bonds of the conformer that are not in the consensus topology
+        """
+        in_conformer = self._bonded_conformers == conformer
+        pairs = self._bonded_pairs[in_conformer]
+
+        is_consensus = np.isin(pairs, self._consensus_pairs)
+        missing = ~np.isin(self._consensus_pairs, pairs)
+
+        return (
+            self._pairs_to_atoms(self._consensus_pairs[missing]),
+            self._pairs_to_atoms(pairs[~is_consensus]),
+        )
+
+    def get_capped_geometries(self):
+        """Returns the hydrogen-capped fragments of all conformers as stacked arrays
+
+        The hydrogens are placed along the cut bonds, as in
+        :meth:`fragmentino.MolecularFragmenter.add_H_to_capped_bonds`. Fragment ``i``
+        is given by the atoms ``offsets[i]:offsets[i + 1]``, its atoms come first,
+        followed by its caps.
+
+        Returns
+        -------
+        Z : numpy.ndarray
+            Atomic numbers, of shape ``(n_atoms_capped,)``
+        xyz : numpy.ndarray
+            Cartesian coordinates, of shape ``(n_conformers, n_atoms_capped, 3)``
+        indices : numpy.ndarray
+            Index of each atom in the input, ``-1`` for the caps
+        offsets : numpy.ndarray
+            First atom of each fragment, of shape ``(n_fragments + 1,)``
+        """
+        labels = self.fragment_labels
+        bonded_labels = labels[self.bonds]
+        cut = self.bonds[bonded_labels[:, 0] != bonded_labels[:, 1]]
+
+        # a cap is given by the capped atom and its partner across the cut bond
+        caps = np.vstack((cut, cut[:, ::-1]))
+        atoms = np.column_stack(
+            (
+                np.hstack([fragment.indices for fragment in self.fragmenter]),
+                np.full(self.n_atoms, -1),
+            )
+        )
+
+        slots = np.vstack((atoms, caps))
+        fragments = labels[slots[:, 0]]
+        is_cap = np.hstack(
+            (np.zeros(self.n_atoms, dtype=bool), np.ones(len(caps), dtype=bool))
+        )
+
+        order = np.lexsort((is_cap, fragments))
+        slots, fragments, is_cap = slots[order], fragments[order], is_cap[order]
+
+        xyz = self.xyz[:, slots[:, 0], :]
+
+        r = self.xyz[:, slots[is_cap, 1], :] - xyz[:, is_cap, :]
+        n = r / np.linalg.norm(r, axis=-1, keepdims=True)
+        length = 0.9 * Z_to_bond_length(self.Z[slots[is_cap, 0]], 1, self.bond_factor)
+        xyz[:, is_cap, :] += n * length[:, None]
+
+        Z = np.where(is_cap, 1, self.Z[slots[:, 0]])
+        indices = np.where(is_cap, -1, slots[:, 0])
+        offsets = np.searchsorted(fragments, np.arange(self.n_fragments + 1))
+
+        return Z, xyz, indices, offsets
+
+    def _find_bonds(self, block_size):
+        """Determines the bonds of all conformers, in blocks of atom pairs,
+        and the consensus topology
+
+        Only the pairs that are bonded in at least one conformer are evaluated, which
+        are found with a linked-cell search of each conformer (see
+        :func:`fragmentino.neighbor_search.get_bonded_pairs`), such that neither the
+        time nor the memory grows with the number of all atom pairs.
+        """
+        radii = self.bond_factor * Z_to_covalent_radius(self.Z)
+
+        candidates = []
+        for xyz in self.xyz:
+            rows, cols, _ = get_bonded_pairs(xyz, radii)
+            candidates.append(rows.astype(np.int64) * self.n_atoms + cols)
+
+        candidates = np.unique(np.hstack(candidates + [np.zeros(0, dtype=np.int64)]))
+        rows, cols = np.divmod(candidates, self.n_atoms)
+        cutoffs = radii[rows] + radii[cols]
+
+        pairs_per_block = max(1, block_size // max(1, self.n_conformers))
+
+        bonded_conformers, bonded_pairs = [], []
+        for start in range(0, rows.size, pairs_per_block):
+            block = slice(start, start + pairs_per_block)
+
+            d = np.linalg.norm(
+                self.xyz[:, rows[block], :] - self.xyz[:, cols[block], :], axis=-1
+            )
+            conformers, pairs = np.nonzero(d < cutoffs[block])
+
+            bonded_conformers.append(conformers)
+            bonded_pairs.append(start + pairs)
+
+        self._bonded_conformers = np.hstack(bonded_conformers + [[]]).astype(int)
+        self._bonded_pairs = np.hstack(bonded_pairs + [[]]).astype(int)
+        self._pair_atoms = (rows, cols)
+
+        counts = np.bincount(self._bonded_pairs, minlength=rows.size)
+        self._consensus_pairs = np.flatnonzero(
+            counts >= self.consensus_threshold * self.n_conformers
+        )
+        self.bonds = self._pairs_to_atoms(self._consensus_pairs)
+
+        a1, a2 = self.bonds[:, 0], self.bonds[:, 1]
+        self.bond_lengths = np.linalg.norm(
+            self.xyz[:, a1, :] - self.xyz[:, a2, :], axis=-1
+        )
+
+        is_consensus = np.isin(self._bonded_pairs, self._consensus_pairs)
+        n_bonds = np.bincount(self._bonded_conformers, minlength=self.n_conformers)
+        n_consensus_bonds = np.bincount(
+            self._bonded_conformers[is_consensus], minlength=self.n_conformers
+        )
+        self.deviating_conformers = np.flatnonzero(
+            (n_bonds != self._consensus_pairs.size)
+            | (n_consensus_bonds != self._consensus_pairs.size)
+        )
+
+    def _pairs_to_atoms(self, pairs):
+        rows, cols = self._pair_atoms
+        return np.column_stack((rows[pairs], cols[pairs])).reshape(-1, 2)
@@ -0,0 +1,61 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""Cost models estimate the cost of a calculation on a fragment from the atomic
+numbers of its atoms. A cost model is any callable that takes the array of atomic
+numbers of a fragment and returns a number, e.g. ``lambda Z: np.sum(Z > 1) ** 3``.
+"""
+
+import numpy as np
+
+
+def atom_count_cost(Z):
+    """Cost given by the number of atoms
+
+    Parameters
+    ----------
+    Z : numpy.ndarray
+        Atomic numbers
+
+    Returns
+    -------
+    cost : int
+    """
+    return np.size(Z)
+
+
+class ElectronCost:
+    r"""Cost given by the number of electrons :math:`N_e` (of the neutral fragment)
+    to some power, i.e. :math:`\text{cost} = N_e^p`.
+    """
+
+    def __init__(self, exponent=1.0):
+        """Creates the cost model
+
+        Parameters
+        ----------
+        exponent : float
+            The exponent :math:`p`. Default is ``exponent=1.0``
+        """
+        self.exponent = exponent
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(exponent={self.exponent})"
+
+    def __call__(self, Z):
+        """Evaluates the cost
+
+        Parameters
+        ----------
+        Z : numpy.ndarray
+            Atomic numbers
+
+        Returns
+        -------
+        cost : float
+        """
+        return float(np.sum(Z)) ** self.exponent
@@ -0,0 +1,309 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+
+
+from fragmentino.molecule import Molecule
+from fragmentino.checkpoint import save_npz_atomic, load_npz
+from fragmentino.fragment_view import FragmentView
+
+
+class FragmentSet:
+    """Compact result of a fragmentation, held in a few flat arrays
+
+    The atoms of fragment i are ``fragment_atoms[fragment_offsets[i]:fragment_offsets[i + 1]]``
+    and its hydrogen caps are ``cap_xyz[cap_offsets[i]:cap_offsets[i + 1]]``
+    (compressed sparse row layout). The fragments are only built when they are
+    accessed, as :class:`fragmentino.fragment_view.FragmentView` of these arrays,
+    so a fragment set is cheap to store (see :meth:`save`) and to send between processes.
+
+    Attributes
+    ----------
+    Z : numpy.ndarray
+        Atomic numbers
+    xyz : numpy.ndarray
+        Cartesian coordinates in Angstrom of each atom in its fragment
+        (unwrapped for periodic systems)
+    labels : numpy.ndarray
+        Fragment of each atom
+    fragment_atoms : numpy.ndarray
+        Atoms of the fragments, fragment by fragment
+    fragment_offsets : numpy.ndarray
+        Start of each fragment in ``fragment_atoms``, and the total number of atoms
+    cut_bonds : numpy.ndarray
+        Pairs of bonded atoms in different fragments
+    capped_bonds : numpy.ndarray
+        Pairs of bonded fragments
+    cap_atoms : numpy.ndarray
+        Atom to which each hydrogen cap is bonded, fragment by fragment
+    cap_xyz : numpy.ndarray
+        Cartesian coordinates in Angstrom of each hydrogen cap
+    cap_offsets : numpy.ndarray
+        Start of the hydrogen caps of each fragment, and the total number of caps
+    bond_factor : float
+    cell : numpy.ndarray
+        Lattice vectors of a periodic system, ``None`` if not periodic
+    """
+
+    def __init__(
+        self,
+        Z,
+        xyz,
+        labels,
+        fragment_atoms=None,
+        fragment_offsets=None,
+        cut_bonds=None,
+        capped_bonds=None,
+        cap_atoms=None,
+        cap_xyz=None,
+        cap_offsets=None,
+        bond_factor=1.3,
+        cell=None,
+    ):
+        """Creates the fragment set
+
+        Parameters
+        ----------
+        Z : numpy.ndarray
+            Atomic numbers
+        xyz : numpy.ndarray
+            Cartesian coordinates in Angstrom
+        labels : numpy.ndarray
+            Fragment of each atom, the labels must be ``0, 1, ..., n_fragments - 1``
+        fragment_atoms, fragment_offsets : numpy.ndarray, optional
+            Atoms of the fragments. Default is ``None``, in which case they are
+            determined from the labels, with the atoms of a fragment in ascending order.
+        cut_bonds : numpy.ndarray, optional
+            Pairs of bonded atoms in different fragments. Default is ``None`` (no bonds).
+        capped_bonds : numpy.ndarray, optional
+            Pairs of bonded fragments. Default is ``None``, in which case they are
+            determined from ``cut_bonds``.
+        cap_atoms, cap_xyz, cap_offsets : numpy.ndarray, optional
+            Hydrogen caps. Default is ``None`` (no caps).
+        bond_factor : float, optional
+            Default is ``bond_factor=1.3``.
+        cell : numpy.ndarray, optional
+            Lattice vectors of a periodic system. Default is ``None`` (not periodic).
+        """
+        self.Z = np.atleast_1d(np.asarray(Z, dtype=int))
+        self.xyz = np.reshape(np.asarray(xyz, dtype=float), (-1, 3))
+        self.labels = np.atleast_1d(np.asarray(labels, dtype=int))
+        n_fragments = int(np.max(self.labels, initial=-1)) + 1
+
+        if fragment_atoms is None:
+            fragment_atoms = np.argsort(self.labels, kind="stable")
+            fragment_offsets = _get_offsets(self.labels, n_fragments)
+        self.fragment_atoms = np.asarray(fragment_atoms, dtype=int)
+        self.fragment_offsets = np.asarray(fragment_offsets, dtype=int)
+
+        if cut_bonds is None:
+            cut_bonds = np.zeros((0, 2), dtype=int)
+        self.cut_bonds = np.reshape(np.asarray(cut_bonds, dtype=int), (-1, 2))
+
+        if capped_bonds is None:
+            capped_bonds = np.unique(
+                np.sort(self.labels[self.cut_bonds], axis=1), axis=0
+            )
+        self.capped_bonds = np.reshape(np.asarray(capped_bonds, dtype=int), (-1, 2))
+
+        if cap_atoms is None:
+            cap_atoms = np.zeros(0, dtype=int)
+            cap_xyz = np.zeros((0, 3))
+            cap_offsets = np.zeros(n_fragments + 1, dtype=int)
+        self.cap_atoms = np.asarray(cap_atoms, dtype=int)
+        self.cap_xyz = np.reshape(np.asarray(cap_xyz, dtype=float), (-1, 3))
+        self.cap_offsets = np.asarray(cap_offsets, dtype=int)
+
+        self.bond_factor = bond_factor
+        self.cell = None if cell is None else np.asarray(cell, dtype=float)
+
+        self._atom_buffer = Molecule(self.Z, self.xyz, bond_factor, self.cell)
+        self._cap_buffer = Molecule(
+            np.ones(self.cap_atoms.size, dtype=int),
+            self.cap_xyz,
+            bond_factor,
+            self.cell,
+        )
+
+    @classmethod
+    def from_fragmenter(cls, fragmenter):
+        """Creates the fragment set of a fragmenter
+
+        The atoms of each fragment and its hydrogen caps (if added) are stored
+        in the order of the fragmenter.
+
+        Parameters
+        ----------
+        fragmenter : MolecularFragmenter
+
+        Returns
+        -------
+        fragment_set : FragmentSet
+        """
+        m = fragmenter.m
+        xyz = np.array(m.xyz, dtype=float)
+        fragment_atoms = []
+        cap_atoms = []
+        cap_xyz = []
+        cap_offsets = [0]
+
+        capped_atoms = {(v, cap): atom for v, atom, cap in fragmenter.added_H}
+
+        for v, fragment in enumerate(fragmenter):
+            atoms = fragment.indices >= 0
+            fragment_atoms.append(fragment.indices[atoms])
+            xyz[fragment.indices[atoms]] = fragment.xyz[atoms]
+
+            caps = np.flatnonzero(~atoms)
+            cap_atoms.append(
+                fragment.indices[[capped_atoms[v, cap] for cap in caps.tolist()]]
+            )
+            cap_xyz.append(np.reshape(fragment.xyz[caps], (-1, 3)))
+            cap_offsets.append(cap_offsets[-1] + caps.size)
+
+        labels = fragmenter.fragment_labels
+        bonds = np.reshape(fragmenter._bonds, (-1, 2))
+
+        return cls(
+            m.Z,
+            xyz,
+            labels,
+            np.hstack(fragment_atoms + [np.zeros(0, dtype=int)]),
+            _get_offsets(labels, fragmenter.n_fragments),
+            bonds[labels[bonds[:, 0]] != labels[bonds[:, 1]]],
+            np.reshape(np.array(fragmenter.g.edges, dtype=int), (-1, 2)),
+            np.hstack(cap_atoms + [np.zeros(0, dtype=int)]),
+            np.vstack(cap_xyz + [np.zeros((0, 3))]),
+            np.array(cap_offsets, dtype=int),
+            m.bond_factor,
+            m.cell,
+        )
+
+    @classmethod
+    def load(cls, file_name):
+        """Reads a fragment set written by :meth:`save`
+
+        Parameters
+        ----------
+        file_name : str
+            File name with full or relative path
+
+        Returns
+        -------
+        fragment_set : FragmentSet
+        """
+        arrays = load_npz(file_name)
+        cell = arrays.pop("cell")
+        bond_factor = float(arrays.pop("bond_factor"))
+
+        return cls(
+            bond_factor=bond_factor,
+            cell=cell if cell.size else None,
+            **arrays,
+        )
+
+    def save(self, file_name):
+        """Writes the fragment set to a compressed numpy ``.npz`` archive,
+        which is replaced atomically (see :mod:`fragmentino.checkpoint`)
+
+        Parameters
+        ----------
+        file_name : str
+            File name with full or relative path, used as is
+        """
+        save_npz_atomic(
+            file_name,
+            {
+                "Z": self.Z,
+                "xyz": self.xyz,
+                "labels": self.labels,
+                "fragment_atoms": self.fragment_atoms,
+                "fragment_offsets": self.fragment_offsets,
+                "cut_bonds": self.cut_bonds,
+                "capped_bonds": self.capped_bonds,
+                "cap_atoms": self.cap_atoms,
+                "cap_xyz": self.cap_xyz,
+                "cap_offsets": self.cap_offsets,
+                "bond_factor": np.array(self.bond_factor),
+                "cell": np.zeros(0) if self.cell is None else self.cell,
+            },
+        )
+
+    def __len__(self):
+        return self.n_fragments
+
+    def __getitem__(self, i):
+        """Returns fragment i, with its hydrogen caps, as a view of the atoms
+
+        The ``indices`` of the fragment give its atoms (-1 for the hydrogen caps).
+        """
+        if i < 0:
+            i += self.n_fragments
+        if not 0 <= i < self.n_fragments:
+            raise IndexError("fragment index out of range")
+
+        return FragmentView(
+            self._atom_buffer,
+            self.get_fragment_atoms(i),
+            self._cap_buffer,
+            slice(self.cap_offsets[i], self.cap_offsets[i + 1]),
+        )
+
+    def __iter__(self):
+        for i in range(self.n_fragments):
+            yield self[i]
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}"
+            + f" Fragments: {self.n_fragments}"
+            + f" Capped bonds: {self.n_capped_bonds}"
+        )
+
+    @property
+    def n_atoms(self):
+        return self.Z.size
+
+    @property
+    def n_fragments(self):
+        return self.fragment_offsets.size - 1
+
+    @property
+    def n_capped_bonds(self):
+        return self.capped_bonds.shape[0]
+
+    @property
+    def n_added_H(self):
+        return self.cap_atoms.size
+
+    @property
+    def fragment_sizes(self):
+        """Number of atoms of each fragment, including the hydrogen caps"""
+        return np.diff(self.fragment_offsets) + np.diff(self.cap_offsets)
+
+    def get_fragment_atoms(self, i):
+        """Atoms of fragment i (without hydrogen caps)
+
+        Parameters
+        ----------
+        i : int
+            Index of the fragment
+
+        Returns
+        -------
+        atoms : numpy.ndarray
+        """
+        return self.fragment_atoms[
+            self.fragment_offsets[i] : self.fragment_offsets[i + 1]
+        ]
+
+
+def _get_offsets(labels, n_fragments):
+    """Start of each fragment in an array that is sorted by the labels"""
+    counts = np.bincount(labels, minlength=n_fragments)
+    return np.hstack(([0], np.cumsum(counts))).astype(int)
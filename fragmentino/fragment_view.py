@@ -0,0 +1,269 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""Fragments that are views into shared atom buffers instead of owning their atoms.
+
+The atoms of all fragments are held in one parent :class:`fragmentino.Molecule`
+and the hydrogen caps of all fragments in one side buffer. A :class:`FragmentView`
+only stores which atoms (a slice or an index array) and which caps (a slice)
+belong to it, so the memory of a fragmented system is about that of its atoms::
+
+    fragments = pack_fragments(fragments)
+
+The views are molecules, so all read methods (e.g. ``center_of_mass``,
+``get_bonds``, ``write_xyz`` and plotting) work on them. Methods that change a
+view (e.g. ``add_atom`` or ``merge``) copy its atoms first. In-place changes of
+the arrays (e.g. ``fragment.xyz += shift``) only change the atoms of the fragment,
+since each fragment has its own part of the buffers.
+"""
+
+import numpy as np
+
+
+from fragmentino.molecule import Molecule
+
+_no_caps = slice(0, 0)
+
+
+class FragmentView(Molecule):
+    """Fragment whose atoms are a part of a parent molecule and its
+    hydrogen caps a part of a side buffer
+
+    For atoms given by a slice and a fragment without caps, ``Z``, ``xyz`` and
+    ``indices`` are views of the parent arrays, such that in-place changes are
+    written to the parent. Otherwise they are gathered when first accessed and
+    kept, such that in-place changes persist.
+
+    Copying (:func:`copy.deepcopy`) or pickling a view materializes it, i.e. gives a
+    :class:`fragmentino.Molecule` that owns its atoms (see :meth:`to_molecule`),
+    such that copies neither share nor keep alive the buffers.
+
+    Attributes
+    ----------
+    parent : Molecule
+        Buffer of the atoms
+    atoms : slice, numpy.ndarray
+        Atoms of the fragment in the parent
+    caps : Molecule
+        Buffer of the hydrogen caps, ``None`` if the fragment has no caps
+    cap_atoms : slice
+        Caps of the fragment in ``caps``
+    """
+
+    def __init__(self, parent, atoms, caps=None, cap_atoms=None):
+        """Creates the view
+
+        Parameters
+        ----------
+        parent : Molecule
+            Buffer of the atoms. Its ``indices`` are the indices of the fragment,
+            or the positions in the parent if ``None``.
+        atoms : slice, numpy.ndarray
+            Atoms of the fragment in the parent
+        caps : Molecule, optional
+            Buffer of the hydrogen caps, whose indices are always -1.
+            Default is ``None``.
+        cap_atoms : slice, optional
+            Caps of the fragment in ``caps``. Default is ``None`` (no caps).
+
+        Note
+        ----
+        The view has no arrays of its own, and its bond factor and cell are those
+        of the parent, such that a view needs little more memory than its slices.
+        """
+        self.parent = parent
+        self.atoms = atoms
+        self.caps = caps
+        self.cap_atoms = _no_caps if cap_atoms is None else cap_atoms
+
+    def __deepcopy__(self, memo):
+        return self.to_molecule()
+
+    def __reduce__(self):
+        return (
+            Molecule,
+            (self.Z, self.xyz, self.bond_factor, self.cell, self.indices),
+        )
+
+    @property
+    def Z(self):
+        return self._get("Z")
+
+    @Z.setter
+    def Z(self, Z):
+        self._set("Z", Z)
+
+    @property
+    def xyz(self):
+        return self._get("xyz")
+
+    @xyz.setter
+    def xyz(self, xyz):
+        self._set("xyz", xyz)
+
+    @property
+    def indices(self):
+        return self._get("indices")
+
+    @indices.setter
+    def indices(self, indices):
+        self._set("indices", indices)
+
+    @property
+    def bond_factor(self):
+        return self.__dict__.get("_bond_factor", self.parent.bond_factor)
+
+    @bond_factor.setter
+    def bond_factor(self, bond_factor):
+        self._bond_factor = bond_factor
+
+    @property
+    def cell(self):
+        return self.__dict__.get("_cell", self.parent.cell)
+
+    @cell.setter
+    def cell(self, cell):
+        self._cell = cell
+
+    @property
+    def size(self):
+        """Number of atoms in molecule"""
+        if "_copies" in self.__dict__ and "Z" in self._copies:
+            return self._copies["Z"].size
+
+        return self.n_atoms + self.n_caps
+
+    @property
+    def n_atoms(self):
+        """Number of atoms from the parent"""
+        if isinstance(self.atoms, slice):
+            return len(range(*self.atoms.indices(self.parent.size)))
+
+        return np.size(self.atoms)
+
+    @property
+    def n_caps(self):
+        """Number of hydrogen caps"""
+        if self.caps is None:
+            return 0
+
+        return len(range(*self.cap_atoms.indices(self.caps.size)))
+
+    @property
+    def is_view(self):
+        """Whether the atoms are still those of the buffers, i.e. not copied"""
+        return not self.__dict__.get("_copies")
+
+    def to_molecule(self):
+        """Returns a copy of the fragment as a molecule that owns its atoms
+
+        Returns
+        -------
+        molecule : Molecule
+        """
+        return Molecule(
+            np.array(self.Z),
+            np.array(self.xyz),
+            self.bond_factor,
+            self.cell,
+            np.array(self.indices),
+        )
+
+    def _get(self, name):
+        """Returns the changed or gathered copy of an array, or a view of the buffers"""
+        for cache in ("_copies", "_gathered"):
+            arrays = self.__dict__.get(cache)
+            if arrays is not None and name in arrays:
+                return arrays[name]
+
+        if name == "indices" and self.parent.indices is None:
+            if isinstance(self.atoms, slice):
+                values = np.arange(*self.atoms.indices(self.parent.size))
+            else:
+                values = np.array(self.atoms)
+        elif isinstance(self.atoms, slice) and self.n_caps == 0:
+            return getattr(self.parent, name)[self.atoms]
+        else:
+            values = getattr(self.parent, name)[self.atoms]
+
+        if self.n_caps > 0:
+            if name == "indices":
+                caps = np.full(self.n_caps, -1)
+            else:
+                caps = getattr(self.caps, name)[self.cap_atoms]
+
+            values = np.concatenate((values, caps))
+
+        self.__dict__.setdefault("_gathered", {})[name] = values
+        return values
+
+    def _set(self, name, values):
+        """Stores a changed array, the buffers are not changed"""
+        self.__dict__.setdefault("_copies", {})[name] = values
+
+
+def pack_fragments(fragments, cell=None):
+    """Copies the atoms of fragments into one parent buffer and their trailing
+    hydrogen caps (``indices`` -1) into one side buffer, and returns views of them
+
+    The order of the atoms in each fragment is kept.
+
+    Parameters
+    ----------
+    fragments : list
+        Molecules with ``indices``
+    cell : numpy.ndarray, optional
+        Lattice vectors of a periodic system. Default is ``None``.
+
+    Returns
+    -------
+    views : list
+        A :class:`FragmentView` of each fragment
+    """
+    n_atoms = []
+    for fragment in fragments:
+        atoms = np.flatnonzero(fragment.indices >= 0)
+        n_atoms.append(int(atoms[-1]) + 1 if atoms.size else 0)
+
+    bond_factor = fragments[0].bond_factor if fragments else 1.3
+
+    def get_buffer(parts):
+        parts = list(parts)
+        return Molecule(
+            np.hstack([Z for Z, _, _ in parts] + [np.zeros(0, dtype=int)]),
+            np.vstack([xyz for _, xyz, _ in parts] + [np.zeros((0, 3))]),
+            bond_factor,
+            cell,
+            np.hstack([i for _, _, i in parts] + [np.zeros(0, dtype=int)]),
+        )
+
+    parent = get_buffer(
+        (f.Z[:n], f.xyz[:n], f.indices[:n]) for f, n in zip(fragments, n_atoms)
+    )
+    caps = get_buffer(
+        (f.Z[n:], f.xyz[n:], f.indices[n:]) for f, n in zip(fragments, n_atoms)
+    )
+
+    atom_offsets = np.cumsum([0] + n_atoms).tolist()
+    cap_offsets = np.cumsum([0] + [f.size - n for f, n in zip(fragments, n_atoms)])
+    cap_offsets = cap_offsets.tolist()
+
+    views = []
+    for i, fragment in enumerate(fragments):
+        if cap_offsets[i + 1] > cap_offsets[i]:
+            fragment_caps = slice(cap_offsets[i], cap_offsets[i + 1])
+            view = FragmentView(
+                parent, slice(*atom_offsets[i : i + 2]), caps, fragment_caps
+            )
+        else:
+            view = FragmentView(parent, slice(*atom_offsets[i : i + 2]))
+
+        if fragment.bond_factor != bond_factor:
+            view.bond_factor = fragment.bond_factor
+        views.append(view)
+
+    return views
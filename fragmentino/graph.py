@@ -6,9 +6,31 @@
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
 import numpy as np
+import time
+from collections import namedtuple
 from copy import deepcopy
 
 
+from fragmentino.profiling import null_profiler
+
+ContractionProgress = namedtuple(
+    "ContractionProgress", ["n_merges", "n_edges", "largest_vertex", "elapsed"]
+)
+ContractionProgress.__doc__ = """Progress of a graph contraction
+
+Attributes
+----------
+n_merges : int
+    Number of merged vertices (contracted edges) so far
+n_edges : int
+    Number of edges left
+largest_vertex : int, float
+    ``size`` of the largest vertex
+elapsed : float
+    Wall time (s) since the start of the contraction
+"""
+
+
 class SimpleWeightedGraph:
     """Simple weighted graph class
 
@@ -104,42 +126,150 @@ class ContractableWeightedGraph(SimpleWeightedGraph):
     weights : list, numpy.ndarray
         stores the edge weights
 
-    max_vertex_size : int
+    max_vertex_size : int, float
         Maximal size of vertex
 
+    merged_size : callable, optional
+        Function ``merged_size(v1, v2)`` returning the size of the vertex that results
+        from merging vertices ``v1`` and ``v2``, e.g. an estimate of its computational cost.
+        Default is ``None``, in which case the sum of the ``size`` of the vertices is used.
+        During a contraction, the merged size of a pair of vertices is only evaluated
+        once, until one of them is merged.
+
+    profiler : fragmentino.profiling.Profiler, optional
+        Counts the contractions (``contractions``), the edges scanned for the next
+        contraction (``edges_scanned``), the copied vertices (``deepcopies``) and the
+        bytes of the reallocated edge arrays (``allocated_bytes``).
+        Default is ``None``.
+
     """
 
-    def __init__(self, max_vertex_size):
+    def __init__(self, max_vertex_size, merged_size=None, profiler=None):
         self.vertices = []
         self.weights = []
         self.edges = []
         self._max_vertex_size = max_vertex_size
-
-    def contract_by_smallest_weight(self):
+        self._merged_size = merged_size
+        self.profiler = null_profiler if profiler is None else profiler
+        self._merged_sizes = {}
+        self._cached_pairs = {}
+
+    def contract_by_smallest_weight(
+        self,
+        progress=None,
+        progress_interval=1.0,
+        time_budget=None,
+        cancel=None,
+        checkpoint=None,
+        checkpoint_interval=600.0,
+    ):
         """
         Contract edges (merge vertices) until no vertices
         can be merged without exceeding the maximal vertex size
 
         Always try to merge the vertices with the smallest edge weight
 
+        The contraction can be stopped early, by ``cancel`` or when the ``time_budget``
+        is used up. No vertex exceeds the maximal vertex size after any merge, so the
+        graph is then a valid, partially contracted graph.
+
+        Parameters
+        ----------
+        progress : callable, optional
+            Function ``progress(state)`` called with a :class:`ContractionProgress`
+            at most every ``progress_interval`` seconds and when the contraction ends.
+            Default is ``None``.
+        progress_interval : float, optional
+            Minimal time (s) between calls of ``progress``. Default is 1 second.
+        time_budget : float, optional
+            Wall time (s) after which no further edges are contracted.
+            Default is ``None`` (no limit).
+        cancel : threading.Event, optional
+            Any object with an ``is_set()`` method. The contraction stops before
+            the next merge when it is set. Default is ``None``.
+        checkpoint : callable, optional
+            Function ``checkpoint(graph)`` called after a merge, at most every
+            ``checkpoint_interval`` seconds, e.g. to store the partially contracted
+            graph. Default is ``None``.
+        checkpoint_interval : float, optional
+            Minimal time (s) between calls of ``checkpoint``. Default is 10 minutes.
+
+        Returns
+        -------
+        status : str
+            ``"complete"``, or ``"timeout"`` or ``"cancelled"`` if the contraction
+            was stopped early
+
         Warning
         -------
         Converts weights and edges to numpy.ndarray and sorts them according
         to ascending weight
 
         """
+        start = time.perf_counter()
+        last_progress = start
+        last_checkpoint = start
+
         self.weights = np.array(self.weights)
         self.edges = np.array(self.edges)
 
         self._sort_edges_by_weight()
+        self._clear_merged_sizes()
         edge_index = self._determine_next_graph_contraction()
 
+        status = "complete"
+        n_merges = 0
+        largest_vertex = max((vertex.size for vertex in self.vertices), default=0)
+
         while edge_index != -1:
+            if cancel is not None and cancel.is_set():
+                status = "cancelled"
+                break
+
+            now = time.perf_counter()
+            if time_budget is not None and now - start >= time_budget:
+                status = "timeout"
+                break
+
+            if progress is not None and now - last_progress >= progress_interval:
+                progress(
+                    ContractionProgress(
+                        n_merges, self.n_edges, largest_vertex, now - start
+                    )
+                )
+                last_progress = now
+
             self._graph_contraction(edge_index)
+            n_merges += 1
+            largest_vertex = max(largest_vertex, self.vertices[-1].size)
+
+            if checkpoint is not None:
+                now = time.perf_counter()
+                if now - last_checkpoint >= checkpoint_interval:
+                    checkpoint(self)
+                    last_checkpoint = now
+
             edge_index = self._determine_next_graph_contraction()
 
+        if progress is not None:
+            progress(
+                ContractionProgress(
+                    n_merges,
+                    self.n_edges,
+                    largest_vertex,
+                    time.perf_counter() - start,
+                )
+            )
+
+        self._clear_merged_sizes()
+        return status
+
     def _sort_edges_by_weight(self):
         """Sort edges by weights"""
+        # already sorted edges keep their order, such that a contraction that
+        # is continued (e.g. from a checkpoint) merges the same vertices
+        if np.all(self.weights[1:] >= self.weights[:-1]):
+            return
         self.edges = self.edges[self.weights.argsort()]
         self.weights.sort()
 
@@ -153,7 +283,10 @@ class ContractableWeightedGraph(SimpleWeightedGraph):
         """
         for edge_index, edge in enumerate(self.edges):
             if self._can_contract_edge(edge):
+                self.profiler.count("edges_scanned", edge_index + 1)
                 return edge_index
+
+        self.profiler.count("edges_scanned", len(self.edges))
         return -1
 
     def _can_contract_edge(self, edge):
@@ -172,9 +305,38 @@ class ContractableWeightedGraph(SimpleWeightedGraph):
             True if contraction is possible
         """
         v1, v2 = edge
-        new_v_size = self.vertices[v1].size + self.vertices[v2].size
+        if self._merged_size is None:
+            new_v_size = self.vertices[v1].size + self.vertices[v2].size
+        else:
+            new_v_size = self._get_merged_size(v1, v2)
         return new_v_size <= self._max_vertex_size
 
+    def _get_merged_size(self, v1, v2):
+        """Merged size of two vertices, cached until one of them is merged
+
+        The cache is keyed by the identity of the vertices, which do not change
+        during a contraction except by merging.
+        """
+        key = (id(self.vertices[v1]), id(self.vertices[v2]))
+        size = self._merged_sizes.get(key)
+
+        if size is None:
+            size = self._merged_size(self.vertices[v1], self.vertices[v2])
+            self._merged_sizes[key] = size
+            for vertex_id in key:
+                self._cached_pairs.setdefault(vertex_id, []).append(key)
+
+        return size
+
+    def _forget_merged_sizes(self, vertex):
+        """Removes the cached merged sizes of a vertex that is merged"""
+        for key in self._cached_pairs.pop(id(vertex), []):
+            self._merged_sizes.pop(key, None)
+
+    def _clear_merged_sizes(self):
+        self._merged_sizes = {}
+        self._cached_pairs = {}
+
     def _graph_contraction(self, edge_index):
         """Graph contraction
 
@@ -188,10 +350,16 @@ class ContractableWeightedGraph(SimpleWeightedGraph):
         self._merge_vertices(v1, v2)
         self._remove_duplicate_edges()
 
+        self.profiler.count("contractions")
+
     def _merge_vertices(self, v1, v2):
         """Update vertices"""
+        self._forget_merged_sizes(self.vertices[v1])
+        self._forget_merged_sizes(self.vertices[v2])
+
         v1_copy = deepcopy(self.vertices[v1])
         v2_copy = deepcopy(self.vertices[v2])
+        self.profiler.count("deepcopies", 2)
 
         del self.vertices[v2]
         del self.vertices[v1]
@@ -205,6 +373,7 @@ class ContractableWeightedGraph(SimpleWeightedGraph):
         """Delete edge"""
         self.edges = np.delete(self.edges, edge_index, axis=0)
         self.weights = np.delete(self.weights, edge_index, axis=0)
+        self.profiler.count("allocated_bytes", self.edges.nbytes + self.weights.nbytes)
 
     def _remove_duplicate_edges(self):
         """Remove duplicate edges"""
@@ -212,6 +381,9 @@ class ContractableWeightedGraph(SimpleWeightedGraph):
         self.edges, indices = np.unique(self.edges, axis=0, return_index=True)
         self.weights = self.weights[np.array(indices)]
         self._sort_edges_by_weight()
+        self.profiler.count(
+            "allocated_bytes", 2 * (self.edges.nbytes + self.weights.nbytes)
+        )
 
     def _update_vertex_indices_in_edges(self, v1, v2):
         """Update vertex indices in edges
@@ -240,6 +412,47 @@ class ContractableWeightedGraph(SimpleWeightedGraph):
             edge[1] = _update_vertex_index(edge[1], v1, v2)
 
         self.edges = np.sort(self.edges, axis=1)
+        self.profiler.count("allocated_bytes", self.edges.nbytes)
+
+    def merge_vertices_by_label(self, labels):
+        """Merges all vertices that share a label, irrespective of edges
+        and of the maximal vertex size
+
+        The merged vertices are ordered by the first occurrence of their label,
+        edges between vertices with the same label are removed.
+
+        Parameters
+        ----------
+        labels : numpy.ndarray
+            Label of each vertex
+
+        Returns
+        -------
+        new_index : numpy.ndarray
+            Index of the merged vertex of each vertex
+        """
+        _, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+        rank = np.empty(first.size, dtype=int)
+        rank[np.argsort(first)] = np.arange(first.size)
+        new_index = rank[inverse.ravel()]
+
+        vertices = [None] * first.size
+        for v, vertex in zip(new_index, self.vertices):
+            if vertices[v] is None:
+                vertices[v] = deepcopy(vertex)
+            else:
+                vertices[v].merge(vertex)
+        self.vertices = vertices
+        self.profiler.count("deepcopies", first.size)
+
+        edges = new_index[np.reshape(np.array(self.edges, dtype=int), (-1, 2))]
+        keep = edges[:, 0] != edges[:, 1]
+
+        self.edges = np.sort(edges[keep], axis=1)
+        self.weights = np.array(self.weights)[keep]
+        self._remove_duplicate_edges()
+
+        return new_index
 
     def swap_vertices(self, v1, v2):
         """
@@ -260,3 +473,19 @@ class ContractableWeightedGraph(SimpleWeightedGraph):
             edge[1] = _update_vertex_index(edge[1], v1, v2)
 
         self.edges = np.sort(self.edges, axis=1)
+        self.profiler.count("allocated_bytes", self.edges.nbytes)
+
+    def permute_vertices(self, order):
+        """
+        Reorders the vertices, such that vertex i is the previous vertex ``order[i]``
+
+        Parameters
+        ----------
+        order : numpy.ndarray
+            Permutation of the vertex indices
+        """
+        self.vertices = [self.vertices[i] for i in order]
+
+        new_index = np.argsort(order)
+        edges = new_index[np.reshape(np.array(self.edges, dtype=int), (-1, 2))]
+        self.edges = np.sort(edges, axis=1)
@@ -0,0 +1,246 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+
+from fragmentino.graph import ContractableWeightedGraph
+
+
+class FragmentHierarchy:
+    """Stores a hierarchy of fragments, i.e., fragments of fragments,
+    as a tree given by parent-index arrays
+
+    Attributes
+    ----------
+    max_sizes : list
+        Maximal fragment size of each level
+
+    parents : list
+        ``parents[0]`` gives the fragment (in level 0) of each atom
+        and ``parents[l]`` gives the parent (in level l) of each fragment in level l - 1.
+
+    capped_bonds : list
+        ``capped_bonds[l]`` stores the pairs of fragments in level l that are bonded
+
+    """
+
+    def __init__(self, max_sizes, parents, capped_bonds):
+        self.max_sizes = list(max_sizes)
+        self.parents = parents
+        self.capped_bonds = capped_bonds
+
+    @classmethod
+    def from_bonds(
+        cls, n_atoms, bonds, bond_lengths, max_sizes, merged_size=None, labels=None
+    ):
+        """Creates the hierarchy by contracting the bond graph level by level.
+        Each level contracts the graph of the previous level.
+
+        Parameters
+        ----------
+        n_atoms : int
+            Number of atoms
+        bonds : numpy.ndarray
+            Pairs of bonded atoms
+        bond_lengths : numpy.ndarray
+            Length of each bond, used as edge weights
+        max_sizes : list
+            Maximal fragment size of each level, in increasing order
+        merged_size : callable, optional
+            Size of two merged fragments, see :class:`fragmentino.ContractableWeightedGraph`.
+            The fragments have an ``atoms`` attribute with the indices of their atoms.
+        labels : numpy.ndarray, optional
+            Initial vertex of each atom (e.g. a ring system that must not be cut),
+            numbered ``0, 1, ...``. The first level is contracted from these vertices.
+            Default is ``None`` (every atom is a vertex).
+
+        Returns
+        -------
+        hierarchy : FragmentHierarchy
+        """
+        if np.any(np.diff(max_sizes) < 0):
+            raise ValueError("Maximal fragment sizes must be increasing")
+
+        if labels is None:
+            vertices = [_Fragment(i, [i]) for i in range(n_atoms)]
+            edges = np.reshape(np.array(bonds, dtype=int), (-1, 2))
+            weights = np.array(bond_lengths, dtype=float)
+        else:
+            labels = np.asarray(labels)
+            vertices = _get_vertices(labels)
+            edges, weights = _get_capped_bonds(labels, bonds, bond_lengths)
+
+        parents, capped_bonds = _contract_levels(
+            vertices, edges, weights, max_sizes, merged_size
+        )
+        if labels is not None:
+            parents[0] = parents[0][labels]
+
+        return cls(max_sizes, parents, capped_bonds)
+
+    @classmethod
+    def from_labels(cls, labels, bonds, bond_lengths, max_sizes, merged_size=None):
+        """Creates the hierarchy from given fragments, e.g. those of a
+        :class:`fragmentino.MolecularFragmenter`, which are the first level.
+        Each following level contracts the graph of the previous level.
+
+        Parameters
+        ----------
+        labels : numpy.ndarray
+            Fragment of each atom in the first level, numbered ``0, 1, ...``
+        bonds : numpy.ndarray
+            Pairs of bonded atoms
+        bond_lengths : numpy.ndarray
+            Length of each bond, used as edge weights
+        max_sizes : list
+            Maximal fragment size of each level (including the first level),
+            in increasing order
+        merged_size : callable, optional
+            Size of two merged fragments, see :meth:`from_bonds`
+
+        Returns
+        -------
+        hierarchy : FragmentHierarchy
+        """
+        if np.any(np.diff(max_sizes) < 0):
+            raise ValueError("Maximal fragment sizes must be increasing")
+
+        labels = np.array(labels, dtype=int)
+        edges, weights = _get_capped_bonds(labels, bonds, bond_lengths)
+
+        parents, capped_bonds = _contract_levels(
+            _get_vertices(labels), edges, weights, max_sizes[1:], merged_size
+        )
+
+        return cls(max_sizes, [labels] + parents, [edges] + capped_bonds)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__} Levels: {self.n_levels}"
+
+    @property
+    def n_levels(self):
+        """Number of levels"""
+        return len(self.parents)
+
+    def n_fragments(self, level):
+        """Number of fragments in a level"""
+        return int(np.max(self.parents[level], initial=-1)) + 1
+
+    def get_labels(self, level):
+        """Returns the fragment (in the given level) of each atom
+
+        Parameters
+        ----------
+        level : int
+
+        Returns
+        -------
+        labels : numpy.ndarray
+        """
+        labels = self.parents[0]
+        for parent in self.parents[1 : level + 1]:
+            labels = parent[labels]
+
+        return labels
+
+    def get_fragment_sizes(self, level):
+        """Returns the number of atoms in each fragment of a level"""
+        return np.bincount(self.get_labels(level), minlength=self.n_fragments(level))
+
+    def get_children(self, level, fragment):
+        """Returns the children of a fragment, i.e. the fragments of level - 1
+        (or the atoms, for level 0) that it consists of
+
+        Parameters
+        ----------
+        level : int
+        fragment : int
+
+        Returns
+        -------
+        children : numpy.ndarray
+        """
+        return np.flatnonzero(self.parents[level] == fragment)
+
+
+class _Fragment:
+    """Vertex used to contract the graph of a level. Keeps track of the
+    vertices from the previous level (``members``) and of the atoms."""
+
+    def __init__(self, member, atoms):
+        self.members = [member]
+        self.atoms = np.asarray(atoms)
+
+    @property
+    def size(self):
+        return self.atoms.size
+
+    def merge(self, other):
+        self.members = self.members + other.members
+        self.atoms = np.hstack((self.atoms, other.atoms))
+
+
+def _get_vertices(labels):
+    """Returns a vertex for each label, with the atoms that have the label"""
+    order = np.argsort(labels, kind="stable")
+    split = np.cumsum(np.bincount(labels))[:-1]
+
+    return [_Fragment(i, atoms) for i, atoms in enumerate(np.split(order, split))]
+
+
+def _get_capped_bonds(labels, bonds, bond_lengths):
+    """Returns the pairs of bonded vertices, ordered by the length of the shortest
+    bond between them, and this length"""
+    pairs = np.sort(labels[np.reshape(np.array(bonds, dtype=int), (-1, 2))], axis=1)
+    bond_lengths = np.array(bond_lengths, dtype=float)
+
+    capped = pairs[:, 0] != pairs[:, 1]
+    pairs = pairs[capped]
+    bond_lengths = bond_lengths[capped]
+
+    order = np.lexsort((bond_lengths, pairs[:, 1], pairs[:, 0]))
+    pairs, first = np.unique(pairs[order], axis=0, return_index=True)
+    pairs = np.reshape(pairs, (-1, 2))
+    weights = bond_lengths[order][first]
+
+    order = np.lexsort((pairs[:, 1], pairs[:, 0], weights))
+    return pairs[order], weights[order]
+
+
+def _contract_levels(vertices, edges, weights, max_sizes, merged_size):
+    """Contracts the graph level by level
+
+    Returns
+    -------
+    parents : list
+        Parent of each vertex of the previous level, for each level
+    capped_bonds : list
+        Pairs of bonded fragments, for each level
+    """
+    parents = []
+    capped_bonds = []
+
+    for max_size in max_sizes:
+        g = ContractableWeightedGraph(max_size, merged_size)
+        g.add_vertices(vertices)
+        g.edges = edges
+        g.weights = weights
+
+        g.contract_by_smallest_weight()
+
+        parent = np.empty(len(vertices), dtype=int)
+        for i, vertex in enumerate(g.vertices):
+            parent[vertex.members] = i
+
+        edges = np.reshape(g.edges, (-1, 2)).astype(int)
+        weights = g.weights
+        vertices = [_Fragment(i, vertex.atoms) for i, vertex in enumerate(g.vertices)]
+
+        parents.append(parent)
+        capped_bonds.append(edges)
+
+    return parents, capped_bonds
@@ -9,6 +9,9 @@ import numpy as np
 import os
 
 
+from fragmentino.profiling import null_profiler
+
+
 class FileHandlerXYZ:
 
     """Handles the reading and writing of xyz-files.
@@ -21,7 +24,7 @@ class FileHandlerXYZ:
     Units are Angstroms
     """
 
-    def __init__(self, file_name):
+    def __init__(self, file_name, profiler=None):
 
         """Creates a xyz-file handler
 
@@ -29,27 +32,34 @@ class FileHandlerXYZ:
         ----------
         file_name : str
             The name of the file, includng full or relative path.
+        profiler : fragmentino.profiling.Profiler, optional
+            Times the reading (``read_xyz``) and writing (``write_xyz``), and counts
+            the atoms read and written. Default is ``None``.
         """
         self.file_name = os.path.expanduser(file_name.strip())
+        self.profiler = null_profiler if profiler is None else profiler
 
     def read(self):
 
         """Read xyz-file"""
 
-        symbols, x, y, z = np.loadtxt(
-            self.file_name,
-            skiprows=2,
-            dtype={
-                "names": ("atom", "x", "y", "z"),
-                "formats": ("S2", "f4", "f4", "f4"),
-            },
-            converters={3: _remove_zero_width_whitespace},
-            encoding="utf-8",
-            unpack=True,
-        )
-
-        symbols = symbols.astype(str)
-        xyz = np.column_stack([x, y, z])
+        with self.profiler.timer("read_xyz"):
+            symbols, x, y, z = np.loadtxt(
+                self.file_name,
+                skiprows=2,
+                dtype={
+                    "names": ("atom", "x", "y", "z"),
+                    "formats": ("S2", "f4", "f4", "f4"),
+                },
+                converters={3: _remove_zero_width_whitespace},
+                encoding="utf-8",
+                unpack=True,
+            )
+
+            symbols = symbols.astype(str)
+            xyz = np.column_stack([x, y, z])
+
+        self.profiler.count("atoms_read", symbols.size)
 
         return symbols, xyz
 
@@ -66,12 +76,33 @@ class FileHandlerXYZ:
         comment : str
             Optional comment for xyz-file comment line
 
+        """
+        with self.profiler.timer("write_xyz"), open(self.file_name, "w") as f:
+            _write_frame(f, symbols, xyz, comment)
+
+        self.profiler.count("atoms_written", len(symbols))
+
+    def write_frames(self, frames):
+
+        """Write several geometries to a multi-frame xyz-file
+
+        Parameters
+        ----------
+        frames : iterable
+            Geometries given as ``(symbols, xyz, comment)``
+
         """
         with open(self.file_name, "w") as f:
-            f.write(str(xyz.shape[0]) + "\n")
-            f.write(comment + "\n")
-            for symbol, pos in zip(symbols, xyz):
-                f.write(f"{symbol} {pos[0]:15.10f} {pos[1]:15.10f} {pos[2]:15.10f}\n")
+            for symbols, xyz, comment in frames:
+                _write_frame(f, symbols, xyz, comment)
+
+
+def _write_frame(f, symbols, xyz, comment):
+    """Write a geometry to an open file"""
+    f.write(str(xyz.shape[0]) + "\n")
+    f.write(comment + "\n")
+    for symbol, pos in zip(symbols, xyz):
+        f.write(f"{symbol} {pos[0]:15.10f} {pos[1]:15.10f} {pos[2]:15.10f}\n")
 
 
 def _remove_zero_width_whitespace(string):
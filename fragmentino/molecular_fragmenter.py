@@ -6,33 +6,465 @@
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
 import numpy as np
-from scipy.spatial import distance_matrix
-import random
+import json
+import os
+from itertools import compress
 
 
 from fragmentino.molecule import Molecule
+from fragmentino.neighbor_search import get_bonded_pairs, get_bonded_pairs_of
+from fragmentino.io import FileHandlerXYZ
+from fragmentino.scheduling import schedule_lpt, get_schedule_statistics
+from fragmentino.hierarchy import FragmentHierarchy
+from fragmentino.rings import get_ring_bonds
+from fragmentino.space_filling_curves import get_space_filling_curve_order
+from fragmentino.partitioning import (
+    partition_multilevel,
+    refine_fiduccia_mattheyses,
+    split_disconnected_parts,
+    get_adjacency_matrix,
+    count_cut_edges,
+)
 from fragmentino.periodic_table import Z_to_bond_length
 from fragmentino import ContractableWeightedGraph
-from fragmentino.visualization_tools import MoleculeFigure, MoleculePlotter
+from fragmentino.cost_models import atom_count_cost
+from fragmentino.profiling import null_profiler, timed
+from fragmentino.checkpoint import write_checkpoint, read_checkpoint
+from fragmentino.fragment_set import FragmentSet
+from fragmentino.fragment_view import FragmentView, pack_fragments
 
 
 class MolecularFragmenter:
     """Handles the fragmentation of a molecule"""
 
-    def __init__(self, max_fragment_size, file_name):
+    profiler = null_profiler
+
+    def __init__(
+        self,
+        max_fragment_size,
+        file_name,
+        max_motif_size=None,
+        cell=None,
+        cost_model=None,
+        engine="greedy",
+        max_ring_size=None,
+        n_workers=None,
+        atom_order=None,
+        profiler=None,
+        progress=None,
+        time_budget=None,
+        cancel=None,
+        checkpoint_file=None,
+        checkpoint_interval=600.0,
+    ):
         """Creates Molecular fragmenter
 
         Parameters
         ----------
+        max_fragment_size : int, float
+           Maximal number of atoms in a fragment,
+           or maximal cost of a fragment if ``cost_model`` is given.
+        file_name : str
+           Name xyz file to read (with full or relative path).
+        max_motif_size : int, optional
+           Isolated molecules (e.g. water, ions and small solvent molecules) with
+           at most ``max_motif_size`` atoms are collapsed into single vertices
+           before the graph contraction. Default is ``None``, in which case
+           every atom starts out as a vertex.
+        cell : numpy.ndarray, optional
+           Lattice vectors (rows of a 3x3 array) or side lengths of an orthorhombic
+           cell for periodic systems. Default is ``None`` (not periodic).
+           The fragments are unwrapped, i.e., they are not split by the cell boundary.
+        cost_model : callable, optional
+           Function that estimates the cost of a fragment from its atomic numbers
+           (see :mod:`fragmentino.cost_models`), e.g. ``ElectronCost(exponent=3)``.
+           The cost is used instead of the number of atoms to limit the fragment size.
+           Default is ``None``.
+        engine : str, optional
+           Fragmentation engine. Either ``"greedy"`` (default), which contracts the bonds
+           in order of increasing bond length, or ``"multilevel"``, which uses a multilevel
+           graph partitioner (see :func:`fragmentino.partitioning.partition_multilevel`)
+           that typically cuts fewer bonds. The multilevel engine does not support
+           cost models.
+        max_ring_size : int, optional
+           Ring systems (single or fused rings) with at most ``max_ring_size`` atoms
+           are collapsed into single vertices before the fragmentation, such that
+           their bonds are never cut. The ring systems are found once, from the
+           biconnected components of the bond graph (see :mod:`fragmentino.rings`).
+           Default is ``None``, in which case rings may be cut.
+        n_workers : int, optional
+           Number of processes used to determine the bonds, see
+           :func:`fragmentino.parallel_bonds.get_bonded_pairs_parallel`. Default is
+           ``None``, in which case the bonds are determined serially.
+        atom_order : str, optional
+           Space-filling curve (``"hilbert"`` or ``"morton"``, see
+           :mod:`fragmentino.space_filling_curves`) along which the atoms are ordered
+           for the bond perception, for better memory locality of the linked-cell
+           search (see :func:`fragmentino.neighbor_search.get_bonded_pairs`).
+           The bonds are mapped back to the input order. Default is ``None``, in which case the input
+           order is used.
+        profiler : fragmentino.profiling.Profiler, optional
+           Times the stages of the fragmentation (``read_xyz``, ``bonds``,
+           ``initial_labels``, ``contraction`` or ``partition``, ``cap``, ``write``, ...)
+           and counts the events in the graph contraction,
+           see :mod:`fragmentino.profiling`. Default is ``None`` (no profiling).
+        progress : callable, optional
+           Function called with the progress of the graph contraction, see
+           :meth:`fragmentino.ContractableWeightedGraph.contract_by_smallest_weight`.
+           Default is ``None``.
+        time_budget : float, optional
+           Wall time (s) of the graph contraction after which the contraction is stopped.
+           The fragments are then those of the partial contraction, which do not exceed
+           the maximal fragment size but may be smaller than necessary, and
+           ``contraction_status`` is ``"timeout"``. Default is ``None`` (no limit).
+        cancel : threading.Event, optional
+           Stops the graph contraction when set (e.g. from another thread), with
+           ``contraction_status`` ``"cancelled"`` and the fragments of the partial
+           contraction. Default is ``None``.
+        checkpoint_file : str, optional
+           File (with full or relative path) to which the state of the graph contraction
+           is written every ``checkpoint_interval`` seconds, and once the molecule is
+           fragmented. An interrupted fragmentation is continued with :meth:`resume`.
+           Default is ``None`` (no checkpoints).
+        checkpoint_interval : float, optional
+           Minimal time (s) between checkpoints during the graph contraction.
+           Default is 10 minutes.
+
+        Note
+        ----
+
+        ``progress``, ``time_budget`` and ``cancel`` only apply to the greedy engine.
+        """
+        self._setup(
+            Molecule.from_xyz_file(file_name, cell=cell, profiler=profiler),
+            max_fragment_size,
+            max_motif_size,
+            cost_model,
+            engine,
+            max_ring_size,
+            n_workers=n_workers,
+            atom_order=atom_order,
+            profiler=profiler,
+            contraction_options=dict(
+                progress=progress, time_budget=time_budget, cancel=cancel
+            ),
+            checkpoint_file=checkpoint_file,
+            checkpoint_interval=checkpoint_interval,
+        )
+
+    @classmethod
+    def from_molecule(
+        cls,
+        max_fragment_size,
+        m,
+        max_motif_size=None,
+        cost_model=None,
+        engine="greedy",
+        max_ring_size=None,
+        bonds=None,
+        n_workers=None,
+        atom_order=None,
+        profiler=None,
+        progress=None,
+        time_budget=None,
+        cancel=None,
+        checkpoint_file=None,
+        checkpoint_interval=600.0,
+    ):
+        """Creates Molecular fragmenter for a molecule that is already in memory
+
+        Parameters
+        ----------
+        max_fragment_size : int, float
+           Maximal number of atoms in a fragment,
+           or maximal cost of a fragment if ``cost_model`` is given.
+        m : Molecule
+           The molecule to fragment. The ``indices`` of the fragments refer to its atoms.
+        bonds : numpy.ndarray, optional
+           Bonds of the molecule, given as rows ``[atom_1_index, atom_2_index, distance]``
+           ordered as in :meth:`fragmentino.Molecule.get_bonds`. Default is ``None``,
+           in which case the bonds are determined (see ``n_workers`` and
+           ``atom_order``).
+
+        See :class:`MolecularFragmenter` for the other parameters.
+
+        Returns
+        -------
+        fragmenter : MolecularFragmenter
+        """
+        fragmenter = cls.__new__(cls)
+        fragmenter._setup(
+            Molecule(m.Z, m.xyz, m.bond_factor, m.cell),
+            max_fragment_size,
+            max_motif_size,
+            cost_model,
+            engine,
+            max_ring_size,
+            bonds,
+            n_workers=n_workers,
+            atom_order=atom_order,
+            profiler=profiler,
+            contraction_options=dict(
+                progress=progress, time_budget=time_budget, cancel=cancel
+            ),
+            checkpoint_file=checkpoint_file,
+            checkpoint_interval=checkpoint_interval,
+        )
+        return fragmenter
+
+    @classmethod
+    def resume(
+        cls,
+        file_name,
+        cost_model=None,
+        profiler=None,
+        progress=None,
+        time_budget=None,
+        cancel=None,
+        checkpoint_interval=600.0,
+    ):
+        """Creates Molecular fragmenter from a checkpoint, and completes the graph
+        contraction if the checkpoint was written before it was complete
+
+        The contraction continues exactly where it was stopped, so the fragments
+        are the same as those of an uninterrupted fragmentation. Further checkpoints
+        are written to the same file.
+
+        Parameters
+        ----------
+        file_name : str
+           Checkpoint written by :meth:`save_checkpoint` or during a fragmentation with
+           ``checkpoint_file`` (with full or relative path).
+        cost_model : callable, optional
+           The cost model of the fragmentation, which is not stored in the checkpoint.
+           Must be given if the checkpoint was written with a cost model.
+
+        See :class:`MolecularFragmenter` for the other parameters.
+
+        Returns
+        -------
+        fragmenter : MolecularFragmenter
+        """
+        arrays, options = read_checkpoint(file_name)
+
+        if options["has_cost_model"] and cost_model is None:
+            raise ValueError(
+                "The checkpoint was written with a cost model, which must be given"
+            )
+
+        cell = arrays["cell"] if arrays["cell"].size else None
+        m = Molecule(arrays["Z"], arrays["xyz"], float(arrays["bond_factor"]), cell)
+
+        fragmenter = cls.__new__(cls)
+        fragmenter._set_options(
+            m,
+            options["max_fragment_size"],
+            options["max_motif_size"],
+            cost_model,
+            options["engine"],
+            options["max_ring_size"],
+            options["n_workers"],
+            options["atom_order"],
+            profiler,
+        )
+        fragmenter._bonds = arrays["bonds"]
+        fragmenter._bond_lengths = arrays["bond_lengths"]
+
+        for atoms in np.split(arrays["vertex_atoms"], arrays["vertex_offsets"][1:-1]):
+            fragmenter.g.add_vertex(m[atoms])
+        fragmenter.g.edges = arrays["edges"]
+        fragmenter.g.weights = arrays["weights"]
+        fragmenter.contraction_status = options["status"]
+
+        if options["status"] != "complete":
+            fragmenter._contract(
+                dict(progress=progress, time_budget=time_budget, cancel=cancel),
+                file_name,
+                checkpoint_interval,
+            )
+            fragmenter.save_checkpoint(file_name)
+
+        if m.cell is not None:
+            with fragmenter.profiler.timer("unwrap"):
+                for fragment in fragmenter:
+                    fragment.unwrap()
+
+        if options["capped"]:
+            fragmenter.add_H_to_capped_bonds()
+        else:
+            fragmenter.pack_fragments()
+
+        return fragmenter
+
+    @classmethod
+    def iter_fragments(
+        cls,
+        max_fragment_size,
+        file_name,
+        max_motif_size=None,
+        cell=None,
+        cost_model=None,
+        engine="greedy",
+        max_ring_size=None,
+        add_H=True,
+        min_batch_size=1000,
+    ):
+        """Fragments a molecule piece by piece and yields the fragments as soon as they are final
+
+        The bonds are determined once with a linked-cell algorithm (see
+        :func:`fragmentino.neighbor_search.get_bonded_pairs`). No contraction crosses
+        a connected component of the bond graph (i.e. a molecule), so the components
+        are fragmented independently. Components
+        are gathered, in order of their first atom, into batches of at least
+        ``min_batch_size`` atoms, and the fragments of a batch are yielded before
+        the next batch is fragmented. The fragments are the same as those of
+        :class:`MolecularFragmenter`, but they come in a different order.
+
+        Parameters
+        ----------
+        max_fragment_size : int, float
+           Maximal number of atoms in a fragment,
+           or maximal cost of a fragment if ``cost_model`` is given.
         file_name : str
            Name xyz file to read (with full or relative path).
+        add_H : bool, optional
+           Whether to cap the fragments with hydrogens (see :meth:`add_H_to_capped_bonds`).
+           Default is ``True``.
+        min_batch_size : int, optional
+           Minimal number of atoms that are fragmented together. Default is 1000.
+
+        See :class:`MolecularFragmenter` for the other parameters.
+
+        Yields
+        ------
+        fragment : Molecule
+           The ``indices`` of a fragment give its atoms in the input (-1 for the
+           hydrogen caps).
         """
+        m = Molecule.from_xyz_file(file_name, cell=cell)
+        rows, cols, distances = get_bonded_pairs(m.xyz, m._get_bonding_radii(), m.cell)
+        n_components, components = _get_connected_components(
+            m.size, np.column_stack((rows, cols, distances))
+        )
+
+        order = np.argsort(components, kind="stable")
+        component_sizes = np.bincount(components, minlength=n_components)
+        component_atoms = np.split(order, np.cumsum(component_sizes)[:-1])
+
+        # bonds never cross components, so they are grouped likewise
+        bond_components = components[rows]
+        bond_order = np.argsort(bond_components, kind="stable")
+        bond_counts = np.bincount(bond_components, minlength=n_components)
+        component_bonds = np.split(bond_order, np.cumsum(bond_counts)[:-1])
+
+        first_atoms = [atoms[0] for atoms in component_atoms]
+        local_index = np.full(m.size, -1)
+
+        batch = []
+        batch_size = 0
+        for i, component in enumerate(np.argsort(first_atoms, kind="stable")):
+            batch.append(component)
+            batch_size += component_sizes[component]
+
+            if batch_size < min_batch_size and i < n_components - 1:
+                continue
 
-        self.m = Molecule.from_xyz_file(file_name)
+            atoms = np.hstack([component_atoms[c] for c in batch])
+            bonds = np.hstack([component_bonds[c] for c in batch])
+            batch = []
+            batch_size = 0
+
+            local_index[atoms] = np.arange(atoms.size)
+            local_rows = local_index[rows[bonds]]
+            local_cols = local_index[cols[bonds]]
+            bond_order = np.lexsort((local_cols, local_rows))
+
+            fragmenter = cls.from_molecule(
+                max_fragment_size,
+                m[atoms],
+                max_motif_size,
+                cost_model,
+                engine,
+                max_ring_size,
+                np.column_stack((local_rows, local_cols, distances[bonds]))[bond_order],
+            )
+
+            if add_H:
+                fragmenter.add_H_to_capped_bonds()
+
+            for fragment in fragmenter:
+                fragment.indices = np.where(
+                    fragment.indices >= 0, atoms[fragment.indices], -1
+                )
+                yield fragment
+
+    def _setup(
+        self,
+        m,
+        max_fragment_size,
+        max_motif_size,
+        cost_model,
+        engine,
+        max_ring_size,
+        bonds=None,
+        n_workers=None,
+        atom_order=None,
+        profiler=None,
+        contraction_options=None,
+        checkpoint_file=None,
+        checkpoint_interval=600.0,
+    ):
+        """Validates the options and fragments the molecule"""
+        self._set_options(
+            m,
+            max_fragment_size,
+            max_motif_size,
+            cost_model,
+            engine,
+            max_ring_size,
+            n_workers,
+            atom_order,
+            profiler,
+        )
+        self._fragment(bonds, contraction_options, checkpoint_file, checkpoint_interval)
+        self.pack_fragments()
+
+    def _set_options(
+        self,
+        m,
+        max_fragment_size,
+        max_motif_size,
+        cost_model,
+        engine,
+        max_ring_size,
+        n_workers,
+        atom_order,
+        profiler,
+    ):
+        """Validates and sets the options, with an empty graph"""
+        if engine not in ("greedy", "multilevel"):
+            raise ValueError(f"Unknown fragmentation engine {engine}")
+
+        if engine == "multilevel" and cost_model is not None:
+            raise ValueError("The multilevel engine does not support cost models")
+
+        self.m = m
+        self.profiler = null_profiler if profiler is None else profiler
         self.n_added_H = 0
         self.added_H = []
-        self.g = ContractableWeightedGraph(max_fragment_size)
-        self._fragment()
+        self._cost_model = cost_model
+        self._max_fragment_size = max_fragment_size
+        self.g = self._get_graph()
+        self._max_motif_size = max_motif_size
+        self._engine = engine
+        self._max_ring_size = max_ring_size
+        self._n_workers = n_workers
+        self._atom_order = atom_order
+        self.contraction_status = "complete"
+        self._buffers = []
+        self._n_buffered_atoms = 0
+        self._labeled_fragments = []
+        self._labels = None
 
     def __getitem__(self, key):
         return self.g.vertices[key]
@@ -57,6 +489,58 @@ class MolecularFragmenter:
 
         return fragment_sizes
 
+    @property
+    def fragment_costs(self):
+        """Estimated cost of each fragment, given by the cost model
+        (or the number of atoms if no cost model is used)"""
+        cost_model = self._cost_model or atom_count_cost
+        return np.array([cost_model(fragment.Z) for fragment in self])
+
+    @property
+    def statistics(self):
+        """Fragmentation statistics
+
+        The parallel efficiency is the mean over the maximal fragment cost, i.e.,
+        the efficiency of running each fragment as a separate job of equal width.
+
+        Returns
+        -------
+        statistics : dict
+        """
+        sizes = self.fragment_sizes
+        costs = self.fragment_costs
+
+        return {
+            "n_fragments": self.n_fragments,
+            "n_capped_bonds": self.n_capped_bonds,
+            "fragment_sizes": sizes.tolist(),
+            "fragment_costs": costs.tolist(),
+            "max_fragment_size": int(np.max(sizes)),
+            "mean_fragment_size": float(np.mean(sizes)),
+            "max_fragment_cost": float(np.max(costs)),
+            "total_cost": float(np.sum(costs)),
+            "parallel_efficiency": float(np.mean(costs) / np.max(costs)),
+        }
+
+    @property
+    def fragment_labels(self):
+        """Index of the fragment of each atom in the molecule"""
+        labels = self._get_packed_labels()
+        if labels is not None:
+            return labels.copy()
+
+        labels = np.full(self.m.size, -1)
+
+        for i, fragment in enumerate(self):
+            labels[fragment.indices[fragment.indices >= 0]] = i
+
+        return labels
+
+    @property
+    def n_cut_bonds(self):
+        """Number of bonds between atoms in different fragments"""
+        return count_cut_edges(self._bonds, self.fragment_labels)
+
     @property
     def n_fragments(self):
         return self.g.n_vertices
@@ -65,6 +549,59 @@ class MolecularFragmenter:
     def n_capped_bonds(self):
         return self.g.n_edges
 
+    def pack_fragments(self):
+        """Stores the atoms of all fragments in one buffer and the hydrogen caps in
+        a side buffer, such that the fragments are views of them
+        (see :mod:`fragmentino.fragment_view`)
+
+        This is done after the fragmentation and after every method that changes
+        the fragments. A fragment that is changed afterwards owns its atoms again.
+        """
+        self.g.vertices = pack_fragments(self.g.vertices, self.m.cell)
+
+        self._buffers = [self.g.vertices[0].parent] if self.g.vertices else []
+        self._n_buffered_atoms = self.m.size
+
+        labels = np.full(self.m.size, -1)
+        if self._buffers:
+            sizes = [fragment.n_atoms for fragment in self.g.vertices]
+            labels[self._buffers[0].indices] = np.repeat(np.arange(len(sizes)), sizes)
+        self._set_packed_labels(labels)
+
+    def _set_packed_labels(self, labels):
+        """Stores the labels of the atoms together with the (packed) fragments"""
+        self._labeled_fragments = list(self.g.vertices)
+        self._labels = labels
+
+    def _get_packed_labels(self):
+        """Returns the labels stored by :meth:`_set_packed_labels`, or ``None`` if the
+        fragments have been changed or reordered since"""
+        if self._labels is None or self._labels.size != self.m.size:
+            return None
+
+        fragments = self.g.vertices
+        if len(fragments) != len(self._labeled_fragments):
+            return None
+
+        if not all(
+            fragment is labeled and fragment.is_view
+            for fragment, labeled in zip(fragments, self._labeled_fragments)
+        ):
+            return None
+
+        return self._labels
+
+    def get_fragment_set(self):
+        """Returns the fragments as a compact :class:`fragmentino.FragmentSet`,
+        e.g. to store them or to send them to another process
+
+        Returns
+        -------
+        fragment_set : FragmentSet
+        """
+        return FragmentSet.from_fragmenter(self)
+
+    @timed("write")
     def write_separate(self, file_prefix):
         """Writes fragments to file. Fragment i is stored to ``file_prefix_fragment_i.xyz``
 
@@ -75,8 +612,11 @@ class MolecularFragmenter:
 
         """
         for i, fragment in enumerate(self):
-            fragment.write_xyz(file_prefix + "_fragment_" + str(i) + ".xyz")
+            fragment.write_xyz(
+                file_prefix + "_fragment_" + str(i) + ".xyz", profiler=self.profiler
+            )
 
+    @timed("write")
     def write(self, file_prefix):
         """Writes fragments to a single file. Fragment i is stored to ``file_prefix_fragmented.xyz``
 
@@ -94,8 +634,69 @@ class MolecularFragmenter:
         m.write_xyz(
             file_prefix + "_fragmented" + ".xyz",
             self._get_fragment_string(),
+            profiler=self.profiler,
         )
 
+    def write_job_manifest(self, file_prefix, n_workers, cost_model=None):
+        """Distributes the fragments over workers and writes a job manifest.
+
+        The fragments are packed into ``n_workers`` batches with the longest processing time
+        heuristic (see :func:`fragmentino.scheduling.schedule_lpt`) using the estimated
+        fragment costs. The fragments of batch w are stored as frames of
+        ``file_prefix_batch_w.xyz`` and the manifest is stored to ``file_prefix_manifest.json``.
+
+        Parameters
+        ----------
+        file_prefix : str
+            prefix for file (with full or relative path).
+        n_workers : int
+            Number of workers (batches)
+        cost_model : callable, optional
+            Cost model used to estimate the fragment costs.
+            Default is ``None``, in which case :attr:`fragment_costs` are used.
+
+        Returns
+        -------
+        manifest : dict
+            The manifest, with the predicted makespan and imbalance
+            and the fragments, cost and file of each batch.
+        """
+        if cost_model is None:
+            costs = self.fragment_costs
+        else:
+            costs = np.array([cost_model(fragment.Z) for fragment in self])
+
+        workers, loads = schedule_lpt(costs, n_workers)
+
+        manifest = {"n_workers": n_workers, "n_fragments": self.n_fragments}
+        manifest.update(get_schedule_statistics(loads))
+        manifest["batches"] = []
+
+        order = np.argsort(workers, kind="stable")
+        batches = np.split(order, np.cumsum(np.bincount(workers, minlength=n_workers)))
+
+        for worker, fragments in enumerate(batches[:n_workers]):
+            file_name = file_prefix + "_batch_" + str(worker) + ".xyz"
+
+            fh = FileHandlerXYZ(file_name)
+            fh.write_frames(
+                (self[i].symbols, self[i].xyz, f"Fragment {i + 1}") for i in fragments
+            )
+
+            manifest["batches"].append(
+                {
+                    "worker": worker,
+                    "file": os.path.basename(file_name),
+                    "fragments": fragments.tolist(),
+                    "cost": float(loads[worker]),
+                }
+            )
+
+        with open(file_prefix + "_manifest.json", "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        return manifest
+
     def _get_fragment_string(self):
 
         fragment_string = "Fragments:"
@@ -120,13 +721,17 @@ class MolecularFragmenter:
 
         return fragment_string
 
+    @timed("cap")
     def add_H_to_capped_bonds(self):
         """
         Hydrogen is added with an apropriate bond length (given by covalent radii)
         in a direction given by the unit vector along the capped bond.
-        """
-        self.n_added_H = self.n_capped_bonds * 2
 
+        Each added hydrogen is recorded in ``added_H`` as
+        ``[fragment_index, capped_atom, hydrogen]``, with the atoms given by their
+        position in the fragment. The fragment indices follow the fragments when
+        they are reordered or clustered.
+        """
         Z_H = 1
         for v1, v2 in self.g.edges:
 
@@ -139,16 +744,22 @@ class MolecularFragmenter:
                 a1 = bond[0]
                 a2 = bond[1]
 
-                r = m2.xyz[a2, :] - m1.xyz[a1, :]
+                r = m1.minimum_image(m2.xyz[a2, :] - m1.xyz[a1, :])
                 n = r / (np.linalg.norm(r))
 
                 # add H to m1
                 length = Z_to_bond_length(m1.Z[a1], Z_H, m1.bond_factor) * 0.9
                 m1.add_atom(Z_H, m1.xyz[a1, :] + n * length)
+                self.added_H.append([v1, a1, m1.size - 1])
 
                 # add H to m2
                 length = Z_to_bond_length(m2.Z[a2], Z_H, m2.bond_factor) * 0.9
                 m2.add_atom(Z_H, m2.xyz[a2, :] - n * length)
+                self.added_H.append([v2, a2, m2.size - 1])
+
+        # a capped bond between two fragments may consist of several cut bonds
+        self.n_added_H = len(self.added_H)
+        self.pack_fragments()
 
     def find_central_fragment(self):
         """
@@ -177,6 +788,10 @@ class MolecularFragmenter:
         """
         self.g.swap_vertices(f1, f2)
 
+        new_index = np.arange(self.n_fragments)
+        new_index[[f1, f2]] = [f2, f1]
+        self._renumber_added_H(new_index)
+
     def group_fragments_by_size(self):
         r"""Groups fragments such that fragments of the same size follow each other
         Warning
@@ -188,6 +803,7 @@ class MolecularFragmenter:
                 if j > i and fragment_i.same_size(fragment_j):
                     self.swap_fragments(i + 1, j)
 
+    @timed("order")
     def order_fragments_by_centrality(self):
         """Order fragments according to centrality, i.e.,
         with respect to increasing distance to the average of the center of mass of the fragments.
@@ -199,48 +815,1105 @@ class MolecularFragmenter:
         CM = np.array(CM)
 
         order = np.argsort(np.linalg.norm(CM - np.mean(CM, axis=0), axis=1))
-        self.g.vertices = [self.g.vertices[i] for i in order]
+        self.g.permute_vertices(order)
+        self._renumber_added_H(np.argsort(order))
+
+    @timed("order")
+    def order_fragments_by_space_filling_curve(self, curve="hilbert"):
+        """Orders the fragments along a space-filling curve through their centers of mass,
+        such that consecutive fragments (e.g. in the output and in the job batches of
+        :meth:`write_job_manifest`) are spatial neighbors
+
+        Parameters
+        ----------
+        curve : str, optional
+            Either ``"hilbert"`` (default) or ``"morton"``,
+            see :mod:`fragmentino.space_filling_curves`.
+        """
+        CM = np.array([fragment.center_of_mass for fragment in self])
+        order = get_space_filling_curve_order(CM, curve)
+        self.g.permute_vertices(order)
+        self._renumber_added_H(np.argsort(order))
+
+    @timed("cluster")
+    def cluster_closed_fragments(self, max_cluster_size=None):
+        r"""Clusters fragments without capped bonds (e.g. solvent molecules)
+        by spatial proximity.
+
+        Seeds are taken in order along the longest extent of the system and each
+        cluster is filled with the closest unclustered fragments, found with a
+        KD-tree over the fragment centers of mass, until the size cap is reached.
+        The procedure is close to :math:`\mathcal{O}(N \log N)` scaling.
 
-    def plot_fragments(self, colors="random", **kwargs):
+        Fragments with capped bonds are left untouched.
+
+        Parameters
+        ----------
+        max_cluster_size : int, float, optional
+            Maximal number of atoms in a cluster (or maximal cost, if a cost model is used).
+            Default is ``None``, in which case ``max_fragment_size`` is used.
+        """
+        if max_cluster_size is None:
+            max_cluster_size = self._max_fragment_size
+
+        edges = np.reshape(np.array(self.g.edges, dtype=int), (-1, 2))
+        closed = np.setdiff1d(np.arange(self.n_fragments), edges)
+        if closed.size < 2:
+            return
+
+        CM = np.array([self.g.vertices[i].center_of_mass for i in closed])
+
+        if self._cost_model is None:
+            clusters = _cluster_by_distance(
+                CM, self.fragment_sizes[closed], max_cluster_size
+            )
+        else:
+
+            def get_cost(units):
+                return self._cost_model(
+                    np.hstack([self.g.vertices[closed[i]].Z for i in units])
+                )
+
+            clusters = _cluster_by_distance(
+                CM, self.fragment_costs[closed], max_cluster_size, get_cost
+            )
+
+        labels = np.arange(self.n_fragments)
+        labels[closed] = self.n_fragments + clusters
+        self._renumber_added_H(self.g.merge_vertices_by_label(labels))
+        self.pack_fragments()
+
+    def _renumber_added_H(self, new_index):
+        """Maps the fragments in ``added_H`` to their indices after a reordering
+
+        Parameters
+        ----------
+        new_index : numpy.ndarray
+            New index of each fragment
+        """
+        self.added_H = [[int(new_index[v]), a, h] for v, a, h in self.added_H]
+
+    def plot_fragments(
+        self,
+        colors="random",
+        detail=None,
+        region=None,
+        max_points=100000,
+        file_name=None,
+        **kwargs,
+    ):
         """Plot fragments.
 
+        If all atoms and bonds need more than ``max_points`` points, or if ``detail``
+        or ``region`` is given, the fragments are plotted with levels of detail,
+        see :meth:`fragmentino.MoleculePlotter.get_level_of_detail_plots`.
+
         Parameters
         ----------
         colors : str, optional
             Default is "random"
+        detail : list, optional
+            Fragments shown with all atoms. Default is ``detail=None``.
+        region : tuple, optional
+            Center and radius of a sphere, the fragments with their centroid inside
+            are shown with all atoms. Default is ``region=None``.
+        max_points : int, optional
+            Maximal number of points in the plot. Default is ``max_points=100000``.
+        file_name : str, optional
+            If given, the plot is written to this standalone HTML file
+            instead of being shown. Default is ``file_name=None``.
         kwargs
-            Keyword arguments passed to :meth:`plotly.graph_objects.Figure.show`.
+            Keyword arguments passed to :meth:`plotly.graph_objects.Figure.show`,
+            or to :meth:`plotly.graph_objects.Figure.write_html`.
         """
-        plots = []
-        for i, fragment in enumerate(self):
+        from fragmentino.visualization_tools import MoleculeFigure, MoleculePlotter
 
-            if colors == "random":
-                color = "#%06x" % random.randint(0, 0xFFFFFF)
-            elif colors == "CPK":
-                color = None
+        m, labels, bonds = self._get_fragments_for_plotting()
 
-            plotter = MoleculePlotter(fragment, color)
+        plotter = MoleculePlotter(m, bonds=bonds)
 
-            plots.append(plotter.get_bond_plot(label="fragment " + str(i)))
-            plots.append(plotter.get_atom_plot(label="fragment " + str(i)))
+        n_points = m.size + 3 * bonds.shape[0]
+        if n_points > max_points or detail is not None or region is not None:
+            plots = plotter.get_level_of_detail_plots(
+                labels, detail, region, max_points, colors
+            )
+        else:
+            plots = plotter.get_fragment_plots(labels, colors)
 
         v = MoleculeFigure(data=plots)
-        v.show(**kwargs)
+        if file_name is None:
+            v.show(**kwargs)
+        else:
+            v.write_html(file_name, **kwargs)
 
-    def _fragment(self):
+    def _get_fragments_for_plotting(self):
+        """Stacks the fragments (with caps) into one molecule, and maps the known
+        bonds to it, such that no bonds have to be determined
+
+        Returns
+        -------
+        m : Molecule
+            All fragments
+        labels : numpy.ndarray
+            Fragment of each atom
+        bonds : numpy.ndarray
+            Pairs of bonded atoms, including the bonds to the caps
+        """
+        sizes = self.fragment_sizes
+        offsets = np.cumsum(sizes) - sizes
+
+        m = Molecule(
+            np.hstack([fragment.Z for fragment in self]),
+            np.vstack([fragment.xyz for fragment in self]),
+            self.m.bond_factor,
+        )
+        labels = np.repeat(np.arange(self.n_fragments), sizes)
+        indices = np.hstack([fragment.indices for fragment in self])
+
+        position = np.full(self.m.size, -1)
+        is_atom = indices >= 0
+        position[indices[is_atom]] = np.flatnonzero(is_atom)
+
+        bonds = position[self._bonds]
+
+        added_H = np.reshape(np.array(self.added_H, dtype=int), (-1, 3))
+        cap_bonds = offsets[added_H[:, 0], None] + added_H[:, 1:]
+
+        return m, labels, np.vstack((bonds, cap_bonds))
+
+    def _fragment(
+        self,
+        bonds=None,
+        contraction_options=None,
+        checkpoint_file=None,
+        checkpoint_interval=600.0,
+    ):
         r"""Fragments the molecule in an :math:`\mathcal{O}(N^2)` procedure:
 
-        - Makes a fragment for each atom. These atoms are the initial vertices of a graph
+        - Makes a fragment for each atom (or for each small isolated molecule
+          and small ring system, see ``max_motif_size`` and ``max_ring_size``).
+          These are the initial vertices of a graph
         - The bonds between atoms are edges for the graph
-        - Contracts the graph by contracting over edges with smallest weights (shortest bonds)
+        - Contracts the graph by contracting over edges with smallest weights (shortest bonds),
+          or partitions the graph with the multilevel engine
+
+        Parameters
+        ----------
+        bonds : list, optional
+            Bonds, given as ``[atom_1_index, atom_2_index, distance]``.
+            Default is ``None``, in which case they are determined.
+        contraction_options : dict, optional
+            Keyword arguments of
+            :meth:`fragmentino.ContractableWeightedGraph.contract_by_smallest_weight`.
+            Default is ``None``.
+        checkpoint_file : str, optional
+            File to which checkpoints are written. Default is ``None``.
+        checkpoint_interval : float, optional
+            Minimal time (s) between checkpoints during the graph contraction.
+        """
+        if bonds is None:
+            bonds = self._get_bonds()
+
+        if contraction_options is None:
+            contraction_options = {}
+
+        self._bonds = np.reshape(
+            np.array([bond[:2] for bond in bonds], dtype=int), (-1, 2)
+        )
+        self._bond_lengths = np.array([bond[2] for bond in bonds], dtype=float)
+
+        labels = self._get_initial_labels()
+
+        if self._engine == "multilevel":
+            self._partition_multilevel(labels)
+        else:
+            self._add_vertices_from_labels(labels)
+
+            for (a1, a2), bond_length in zip(self._bonds, self._bond_lengths):
+                if labels[a1] != labels[a2]:
+                    self.g.add_edge(labels[a1], labels[a2], bond_length)
+
+            self._contract(contraction_options, checkpoint_file, checkpoint_interval)
+
+        if checkpoint_file is not None:
+            self.save_checkpoint(checkpoint_file)
+
+        if self.m.cell is not None:
+            with self.profiler.timer("unwrap"):
+                for fragment in self:
+                    fragment.unwrap()
+
+    def _contract(self, contraction_options, checkpoint_file, checkpoint_interval):
+        """Contracts the graph, and writes checkpoints to ``checkpoint_file`` if given"""
+        if checkpoint_file is not None:
+            contraction_options = dict(
+                contraction_options,
+                checkpoint=lambda g: self._write_checkpoint(
+                    checkpoint_file, "in_progress"
+                ),
+                checkpoint_interval=checkpoint_interval,
+            )
+
+        with self.profiler.timer("contraction"):
+            self.contraction_status = self.g.contract_by_smallest_weight(
+                **contraction_options
+            )
+
+    def save_checkpoint(self, file_name):
+        """Writes the molecule, its bonds and the fragments (the state of the graph)
+        to a checkpoint, from which the fragmenter is restored with :meth:`resume`
+
+        The file is a compressed numpy ``.npz`` archive, which is replaced atomically,
+        i.e. a crash while writing leaves the previous checkpoint intact
+        (see :mod:`fragmentino.checkpoint`). Added hydrogens are not stored,
+        but they are added again when the fragmenter is restored.
+
+        Parameters
+        ----------
+        file_name : str
+            File name with full or relative path, used as is
+        """
+        self._write_checkpoint(file_name, self.contraction_status)
+
+    @timed("checkpoint")
+    def _write_checkpoint(self, file_name, status):
+        """Writes a checkpoint with the given status of the graph contraction"""
+        vertex_atoms = [fragment.indices[fragment.indices >= 0] for fragment in self]
+        vertex_sizes = [atoms.size for atoms in vertex_atoms]
+
+        arrays = {
+            "Z": self.m.Z,
+            "xyz": self.m.xyz,
+            "cell": np.zeros(0) if self.m.cell is None else self.m.cell,
+            "bond_factor": np.array(self.m.bond_factor),
+            "bonds": self._bonds,
+            "bond_lengths": self._bond_lengths,
+            "vertex_atoms": np.hstack(vertex_atoms + [np.zeros(0, dtype=int)]),
+            "vertex_offsets": np.hstack(([0], np.cumsum(vertex_sizes, dtype=int))),
+            "edges": np.reshape(np.array(self.g.edges, dtype=int), (-1, 2)),
+            "weights": np.array(self.g.weights, dtype=float),
+        }
+        options = {
+            "max_fragment_size": self._max_fragment_size,
+            "max_motif_size": self._max_motif_size,
+            "max_ring_size": self._max_ring_size,
+            "engine": self._engine,
+            "n_workers": self._n_workers,
+            "atom_order": self._atom_order,
+            "has_cost_model": self._cost_model is not None,
+            "status": status,
+            "capped": self.n_added_H > 0,
+        }
+        write_checkpoint(file_name, arrays, options)
+
+    @timed("partition")
+    def _partition_multilevel(self, labels):
+        """Fragments with the multilevel graph partitioner, starting from the
+        initial vertices given by ``labels``. The edge weights are inverse bond lengths.
+        """
+        edges = labels[self._bonds]
+        between = edges[:, 0] != edges[:, 1]
+
+        parts = partition_multilevel(
+            np.max(labels) + 1,
+            edges[between],
+            1.0 / self._bond_lengths[between],
+            self._max_fragment_size,
+            np.bincount(labels),
+        )
+
+        self._add_vertices_from_labels(parts[labels])
+        self._set_capped_bonds()
+
+    @timed("refine")
+    def refine_fragments(self, n_passes=10):
+        """Reduces the number of cut bonds by moving boundary atoms between neighboring
+        fragments, without exceeding the maximal fragment size, with the Fiduccia-Mattheyses
+        heuristic (see :func:`fragmentino.partitioning.refine_fiduccia_mattheyses`).
+
+        Fragments that are no longer connected are split, the order of the
+        fragments is otherwise kept.
+
+        Parameters
+        ----------
+        n_passes : int, optional
+            Maximal number of refinement passes. Default is ``n_passes=10``.
+
+        Returns
+        -------
+        n_cut_bonds_before : int
+            Number of cut bonds before the refinement
+        n_cut_bonds_after : int
+            Number of cut bonds after the refinement
+
+        Note
+        ----
+
+        Hydrogens added by :meth:`add_H_to_capped_bonds` are removed.
+        """
+        if self._cost_model is not None:
+            raise ValueError("Refinement does not support cost models")
+
+        labels = self.fragment_labels
+        n_cut_bonds_before = count_cut_edges(self._bonds, labels)
 
+        # small isolated molecules and ring systems are moved as a whole
+        units = self._get_initial_labels()
+        n_units = np.max(units, initial=-1) + 1
+        first_atom = np.unique(units, return_index=True)[1]
+
+        unit_bonds = units[self._bonds]
+        between = unit_bonds[:, 0] != unit_bonds[:, 1]
+        adjacency = get_adjacency_matrix(
+            n_units, unit_bonds[between], np.ones(np.count_nonzero(between))
+        )
+
+        unit_labels = refine_fiduccia_mattheyses(
+            adjacency,
+            np.bincount(units, minlength=n_units),
+            labels[first_atom],
+            self._max_fragment_size,
+            n_passes,
+        )
+        labels = split_disconnected_parts(adjacency, unit_labels)[units]
+
+        self.g = self._get_graph()
+        self._add_vertices_from_labels(labels)
+        self._set_capped_bonds()
+        self.n_added_H = 0
+        self.added_H = []
+
+        if self.m.cell is not None:
+            for fragment in self:
+                fragment.unwrap()
+
+        self.pack_fragments()
+        return n_cut_bonds_before, self.n_cut_bonds
+
+    def get_hierarchy(self, max_fragment_sizes):
+        """Fragments the molecule hierarchically (fragments of fragments)
+
+        If the first size is the maximal fragment size of the fragmenter, the first
+        level are the current fragments. Otherwise, the first level is obtained with
+        the engine of the fragmenter, keeping small isolated molecules and ring
+        systems whole (see ``max_motif_size`` and ``max_ring_size``). Every following
+        level is obtained by contracting the graph of the previous level, whose edges
+        are the capped bonds.
+
+        Parameters
+        ----------
+        max_fragment_sizes : list
+            Maximal fragment size (or cost, if a cost model is used) of each level,
+            in increasing order
+
+        Returns
+        -------
+        hierarchy : FragmentHierarchy
+        """
+        if self._cost_model is None:
+            merged_size = None
+        else:
+            merged_size = self._get_merged_atoms_cost
+
+        if max_fragment_sizes[0] == self._max_fragment_size:
+            labels = self.fragment_labels
+        elif self._engine == "multilevel":
+            units = self._get_initial_labels(max_size=max_fragment_sizes[0])
+            edges = units[self._bonds]
+            between = edges[:, 0] != edges[:, 1]
+
+            parts = partition_multilevel(
+                np.max(units, initial=-1) + 1,
+                edges[between],
+                1.0 / self._bond_lengths[between],
+                max_fragment_sizes[0],
+                np.bincount(units),
+            )
+            _, labels = np.unique(parts[units], return_inverse=True)
+        else:
+            return FragmentHierarchy.from_bonds(
+                self.m.size,
+                self._bonds,
+                self._bond_lengths,
+                max_fragment_sizes,
+                merged_size,
+                self._get_initial_labels(max_size=max_fragment_sizes[0]),
+            )
+
+        return FragmentHierarchy.from_labels(
+            np.ravel(labels),
+            self._bonds,
+            self._bond_lengths,
+            max_fragment_sizes,
+            merged_size,
+        )
+
+    def update_atoms(
+        self, changed=None, xyz=None, removed=None, added_Z=None, added_xyz=None
+    ):
+        r"""Re-fragments the molecule after a local edit of the structure.
+
+        Bonds are only redetermined around the changed and added atoms, and only the
+        fragments with atoms whose bonds have changed, together with their neighboring
+        fragments, are contracted again (with the same engine, and keeping small
+        isolated molecules and ring systems whole, see ``max_motif_size`` and
+        ``max_ring_size``). The other fragments are left untouched (in the same order,
+        as views of the same buffers) and the new fragments are appended, such that
+        the work beyond a few vectorized passes over the atoms and bonds scales with
+        the size of the edit.
+
+        The atoms are first moved, then the removed atoms are deleted (the remaining
+        atoms keep their order) and, finally, the added atoms are appended to the molecule.
+
+        Parameters
+        ----------
+        changed : numpy.ndarray, optional
+            Indices of the atoms that have moved
+        xyz : numpy.ndarray, optional
+            New Cartesian coordinates of the atoms that have moved
+        removed : numpy.ndarray, optional
+            Indices of the atoms to remove
+        added_Z : numpy.ndarray, optional
+            Atomic numbers of the atoms to add
+        added_xyz : numpy.ndarray, optional
+            Cartesian coordinates of the atoms to add
+
+        Note
+        ----
+
+        Hydrogens added by :meth:`add_H_to_capped_bonds` are removed.
+        """
+        changed = np.atleast_1d(np.array([] if changed is None else changed, dtype=int))
+        removed = np.atleast_1d(np.array([] if removed is None else removed, dtype=int))
+        added_Z = np.atleast_1d(np.array([] if added_Z is None else added_Z, dtype=int))
+        added_xyz = np.reshape([] if added_xyz is None else added_xyz, (-1, 3))
+
+        # the untouched fragments are only kept as views if they are still packed
+        labels = self._get_packed_labels()
+        is_packed = labels is not None
+        if not is_packed:
+            labels = self.fragment_labels
+
+        n_fragments = self.n_fragments
+        n_kept = self.m.size - np.unique(removed).size
+
+        # Fragments of the edited atoms and of their (former) bonding partners
+        edited = np.zeros(self.m.size, dtype=bool)
+        edited[changed] = True
+        edited[removed] = True
+
+        touched = np.any(edited[self._bonds], axis=1)
+
+        dirty = np.zeros(n_fragments + 1, dtype=bool)
+        dirty[labels[edited]] = True
+        dirty[labels[self._bonds[touched]].ravel()] = True
+
+        # Update molecule and bonds
+        keep = np.ones(self.m.size, dtype=bool)
+        keep[removed] = False
+
+        new_index = np.full(self.m.size, -1)
+        new_index[keep] = np.arange(n_kept)
+
+        moved_xyz = self.m.xyz.copy()
+        if changed.size > 0:
+            moved_xyz[changed] = np.reshape(xyz, (-1, 3))
+
+        self.m = Molecule(
+            np.hstack((self.m.Z[keep], added_Z)),
+            np.vstack((moved_xyz[keep], added_xyz)),
+            self.m.bond_factor,
+            self.m.cell,
+        )
+
+        active = np.hstack(
+            (new_index[changed[keep[changed]]], n_kept + np.arange(added_Z.size))
+        )
+        new_bonds, new_bond_lengths = self._get_bonds_to_atoms(active)
+
+        # the kept bonds stay in order, since the atoms keep their order
+        self._bonds, self._bond_lengths = _insert_bonds(
+            new_index[self._bonds[~touched]],
+            self._bond_lengths[~touched],
+            new_bonds,
+            new_bond_lengths,
+        )
+
+        # Fragments bonded to the edited atoms, and the neighbors of all dirty fragments
+        labels = np.hstack((labels[keep], np.full(added_Z.size, -1)))
+        dirty[labels[new_bonds].ravel()] = True
+
+        bonded_labels = labels[self._bonds]
+        neighbors = np.hstack(
+            (
+                bonded_labels[dirty[bonded_labels[:, 0]], 1],
+                bonded_labels[dirty[bonded_labels[:, 1]], 0],
+            )
+        )
+        dirty[neighbors] = True
+
+        dirty[-1] = True  # added atoms
+
+        # Contract the atoms of the dirty fragments again
+        atoms = np.flatnonzero(dirty[labels])
+        g = self._contract_atoms(atoms)
+
+        if self.m.cell is not None:
+            with self.profiler.timer("unwrap"):
+                for fragment in g.vertices:
+                    fragment.unwrap()
+
+        # Keep the other fragments, and renumber them and their capped bonds
+        is_untouched = ~dirty[:n_fragments]
+        rank = np.cumsum(is_untouched) - 1
+        n_untouched = np.count_nonzero(is_untouched)
+
+        old_edges = np.reshape(np.array(self.g.edges, dtype=int), (-1, 2))
+        old_weights = np.array(self.g.weights, dtype=float)
+        kept_edges = np.all(is_untouched[old_edges], axis=1)
+
+        if is_packed:
+            untouched = self._get_untouched_views(is_untouched, new_index, removed)
+        else:
+            untouched = []
+            for fragment in compress(self.g.vertices, is_untouched):
+                fragment = fragment[fragment.indices >= 0]
+                fragment.indices = new_index[fragment.indices]
+                untouched.append(fragment)
+
+        labels = np.where(labels >= 0, rank[labels], -1)
+        labels[atoms] = -1
+        for i, fragment in enumerate(g.vertices):
+            labels[fragment.indices] = n_untouched + i
+
+        self.g = self._get_graph()
+        self.g.add_vertices(untouched)
+
+        if is_packed and g.vertices:
+            views = pack_fragments(g.vertices, self.m.cell)
+            self.g.add_vertices(views)
+            self._buffers.append(views[0].parent)
+            self._n_buffered_atoms += views[0].parent.size
+        else:
+            self.g.add_vertices(g.vertices)
+
+        in_new_fragments = np.zeros(self.m.size, dtype=bool)
+        in_new_fragments[atoms] = True
+        self._set_capped_bonds(
+            labels,
+            np.any(in_new_fragments[self._bonds], axis=1),
+            rank[old_edges[kept_edges]],
+            old_weights[kept_edges],
+        )
+
+        self.n_added_H = 0
+        self.added_H = []
+
+        # the buffers are repacked once they are mostly unused
+        if is_packed and self._n_buffered_atoms <= 2 * max(self.m.size, 1):
+            self._set_packed_labels(labels)
+        else:
+            self.pack_fragments()
+
+    def _contract_atoms(self, atoms):
+        """Contracts the given atoms (and only the bonds between them) with the
+        configured engine, starting from their initial labels
+
+        Parameters
+        ----------
+        atoms : numpy.ndarray
+            Atoms to contract, in ascending order
+
+        Returns
+        -------
+        g : ContractableWeightedGraph
+            Graph with the new fragments
+        """
+        local_index = np.full(self.m.size, -1)
+        local_index[atoms] = np.arange(atoms.size)
+
+        local_bonds = local_index[self._bonds]
+        internal = np.all(local_bonds >= 0, axis=1)
+
+        # small isolated molecules and ring systems of the atoms are kept whole
+        units = self._get_initial_labels(atoms)
+
+        unit_bonds = units[local_bonds[internal]]
+        bond_lengths = self._bond_lengths[internal]
+        between = unit_bonds[:, 0] != unit_bonds[:, 1]
+
+        g = self._get_graph()
+        if self._engine == "multilevel" and atoms.size > 0:
+            parts = partition_multilevel(
+                np.max(units) + 1,
+                unit_bonds[between],
+                1.0 / bond_lengths[between],
+                self._max_fragment_size,
+                np.bincount(units),
+            )
+            self._add_vertices_from_labels(parts[units], atoms, g)
+        else:
+            self._add_vertices_from_labels(units, atoms, g)
+
+            for (u1, u2), bond_length in zip(
+                unit_bonds[between], bond_lengths[between]
+            ):
+                g.add_edge(u1, u2, bond_length)
+
+            with self.profiler.timer("contraction"):
+                g.contract_by_smallest_weight()
+
+        return g
+
+    def _get_untouched_views(self, is_untouched, new_index, removed):
+        """Returns the packed fragments that are kept by :meth:`update_atoms`,
+        without their caps and with the atoms of the buffers renumbered
+
+        Parameters
+        ----------
+        is_untouched : numpy.ndarray
+            Whether each fragment is kept
+        new_index : numpy.ndarray
+            New index of each atom, -1 for removed atoms
+        removed : numpy.ndarray
+            Removed atoms
+
+        Returns
+        -------
+        untouched : list
+        """
+        if removed.size > 0:
+            for buffer in self._buffers:
+                buffer.indices = np.where(
+                    buffer.indices >= 0, new_index[buffer.indices], -1
+                )
+
+        untouched = list(self.g.vertices)
+        for v in {v for v, _, _ in self.added_H}:
+            fragment = untouched[v]
+            untouched[v] = FragmentView(fragment.parent, fragment.atoms)
+            if fragment.bond_factor != fragment.parent.bond_factor:
+                untouched[v].bond_factor = fragment.bond_factor
+
+        return list(compress(untouched, is_untouched))
+
+    @timed("bonds")
+    def _get_bonds(self):
+        """Determines the bonds, with the atoms ordered along a space-filling curve
+        if ``atom_order`` is given
+
+        The ordered atoms are always binned with the linked-cell algorithm, since
+        the dense distance matrix does not profit from the order.
+
+        Returns
+        -------
+        bonds : list
+            List of bonds, given as ``[atom_1_index, atom_2_index, distance]``,
+            with the atom indices in the input order.
+        """
+        if self._atom_order is None:
+            return self.m.get_bonds(self._n_workers)
+
+        order = get_space_filling_curve_order(self.m.xyz, self._atom_order)
+        m = Molecule(
+            self.m.Z[order], self.m.xyz[order], self.m.bond_factor, self.m.cell
+        )
+
+        if self._n_workers is None:
+            rows, cols, distances = get_bonded_pairs(
+                m.xyz, m._get_bonding_radii(), m.cell
+            )
+        else:
+            bonds = np.reshape(
+                np.array(m.get_bonds(self._n_workers), dtype=float), (-1, 3)
+            )
+            rows, cols, distances = bonds[:, 0], bonds[:, 1], bonds[:, 2]
+
+        atoms = np.sort(order[np.column_stack((rows, cols)).astype(int)], axis=1)
+        sorted_bonds = np.lexsort((atoms[:, 1], atoms[:, 0]))
+
+        return [
+            [a1, a2, distance]
+            for (a1, a2), distance in zip(
+                atoms[sorted_bonds].tolist(), distances[sorted_bonds].tolist()
+            )
+        ]
+
+    def _get_bonds_to_atoms(self, atoms):
+        """Determines the bonds of the given atoms to all atoms in the molecule with a
+        linked-cell search around the atoms, see
+        :func:`fragmentino.neighbor_search.get_bonded_pairs_of`
+
+        Returns
+        -------
+        bonds : numpy.ndarray
+            Pairs of atom indices (in ascending order), sorted
+        bond_lengths : numpy.ndarray
+        """
+        rows, cols, distances = get_bonded_pairs_of(
+            self.m.xyz, self.m._get_bonding_radii(), atoms, self.m.cell
+        )
+        return np.column_stack((rows, cols)), distances
+
+    def _set_capped_bonds(self, labels=None, bonds=None, edges=None, weights=None):
+        """Sets the edges of the graph from the bonds between atoms of different fragments.
+        The weight of an edge is the length of the shortest bond between the fragments.
+
+        Parameters
+        ----------
+        labels : numpy.ndarray, optional
+            Fragment of each atom. Default is ``None``, in which case
+            :attr:`fragment_labels` is used.
+        bonds : numpy.ndarray, optional
+            Mask of the bonds that are considered. Default is ``None`` (all bonds).
+        edges, weights : numpy.ndarray, optional
+            Known edges (whose fragments have no other bonds) and their weights,
+            which are kept. Default is ``None`` (no known edges).
+        """
+        if labels is None:
+            labels = self.fragment_labels
+
+        if bonds is None:
+            pairs = np.sort(labels[self._bonds], axis=1)
+            bond_lengths = self._bond_lengths
+        else:
+            pairs = np.sort(labels[self._bonds[bonds]], axis=1)
+            bond_lengths = self._bond_lengths[bonds]
+
+        capped = pairs[:, 0] != pairs[:, 1]
+        pairs = pairs[capped]
+        bond_lengths = bond_lengths[capped]
+
+        order = np.lexsort((bond_lengths, pairs[:, 1], pairs[:, 0]))
+        pairs, first = np.unique(pairs[order], axis=0, return_index=True)
+        pairs = np.reshape(pairs, (-1, 2))
+        weights_ = bond_lengths[order][first]
+
+        if edges is not None:
+            pairs = np.vstack((np.reshape(edges, (-1, 2)), pairs))
+            weights_ = np.hstack((weights, weights_))
+
+        order = np.lexsort((pairs[:, 1], pairs[:, 0], weights_))
+        self.g.edges = pairs[order]
+        self.g.weights = weights_[order]
+
+    def _get_graph(self):
+        """Returns an empty graph with the maximal fragment size (or cost)"""
+        if self._cost_model is None:
+            return ContractableWeightedGraph(
+                self._max_fragment_size, profiler=self.profiler
+            )
+
+        return ContractableWeightedGraph(
+            self._max_fragment_size, self._get_merged_cost, self.profiler
+        )
+
+    def _get_merged_cost(self, m1, m2):
+        """Estimated cost of the fragment obtained by merging two fragments"""
+        return self._cost_model(np.hstack((m1.Z, m2.Z)))
+
+    def _get_merged_atoms_cost(self, v1, v2):
+        """Estimated cost of the fragment obtained by merging two vertices with atom indices"""
+        return self._cost_model(self.m.Z[np.hstack((v1.atoms, v2.atoms))])
+
+    @timed("initial_labels")
+    def _get_initial_labels(self, atoms=None, max_size=None):
+        """Labels of the initial vertices, i.e. single atoms, small isolated molecules
+        (see ``max_motif_size``) and small ring systems (see ``max_ring_size``)
+
+        Parameters
+        ----------
+        atoms : numpy.ndarray, optional
+            Atoms (in ascending order) to which the search is restricted, molecules
+            with bonds to other atoms are not grouped. Default is ``None`` (all atoms).
+        max_size : int, float, optional
+            Maximal size (or cost) of an initial vertex. Default is ``None``
+            (``max_fragment_size``).
+
+        Returns
+        -------
+        labels : numpy.ndarray
+            Label of the initial vertex of each (given) atom, numbered in
+            order of first appearance.
         """
-        for n, coord in zip(self.m.Z, self.m.xyz):
-            m = Molecule(n, coord)
-            self.g.add_vertex(m)
+        if max_size is None:
+            max_size = self._max_fragment_size
+
+        if atoms is None:
+            Z = self.m.Z
+            bonds = self._bonds
+            bond_lengths = self._bond_lengths
+            is_open = None
+        else:
+            local_index = np.full(self.m.size, -1)
+            local_index[atoms] = np.arange(atoms.size)
+            local_bonds = local_index[self._bonds]
+
+            inside = np.all(local_bonds >= 0, axis=1)
+            crossing = np.any(local_bonds >= 0, axis=1) & ~inside
+
+            Z = self.m.Z[atoms]
+            bonds = local_bonds[inside]
+            bond_lengths = self._bond_lengths[inside]
+            is_open = np.zeros(atoms.size, dtype=bool)
+            is_open[np.max(local_bonds[crossing], axis=1)] = True
+
+        if self._max_motif_size is None:
+            labels = np.arange(Z.size)
+        else:
+            labels = self._group_small_components(
+                Z, np.column_stack((bonds, bond_lengths)), max_size, is_open
+            )
+
+        if self._max_ring_size is not None:
+            labels = self._group_small_rings(labels, Z, bonds, max_size)
+
+        return labels
+
+    def _group_small_rings(self, labels, Z, bonds, max_size):
+        r"""Merges the initial vertices that share a bond in a small ring system
+        in :math:`\mathcal{O}(N)`. Merged vertices that would exceed the maximal
+        size are not merged.
+
+        Parameters
+        ----------
+        labels : numpy.ndarray
+            Label of the initial vertex of each atom
+        Z : numpy.ndarray
+            Atomic numbers
+        bonds : numpy.ndarray
+            Pairs of bonded atoms
+        max_size : int, float
+            Maximal size (or cost) of a merged vertex
+
+        Returns
+        -------
+        labels : numpy.ndarray
+            Label of the initial vertex of each atom, numbered in
+            order of first appearance.
+        """
+        in_ring, _ = get_ring_bonds(Z.size, bonds, self._max_ring_size)
+        n_labels = np.max(labels, initial=-1) + 1
+
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+
+        ring_edges = labels[bonds[in_ring]]
+        adjacency = coo_matrix(
+            (np.ones(len(ring_edges)), (ring_edges[:, 0], ring_edges[:, 1])),
+            shape=(n_labels, n_labels),
+        )
+        n_units, units = connected_components(adjacency, directed=False)
+
+        units = units[labels]
+        unit_sizes = np.bincount(units, minlength=n_units)
+
+        if self._cost_model is None:
+            fits = unit_sizes <= max_size
+        else:
+            fits = np.ones(n_units, dtype=bool)
+            order = np.argsort(units, kind="stable")
+            atoms = np.split(order, np.cumsum(unit_sizes)[:-1])
+            for u in np.flatnonzero(unit_sizes > 1):
+                fits[u] = self._cost_model(Z[atoms[u]]) <= max_size
+
+        keys = np.where(fits[units], units, n_units + labels)
+
+        _, first_atom, labels = np.unique(keys, return_index=True, return_inverse=True)
+        rank = np.empty(first_atom.size, dtype=int)
+        rank[np.argsort(first_atom)] = np.arange(first_atom.size)
+
+        return rank[labels.ravel()]
+
+    def _group_small_components(self, Z, bonds, max_size, is_open=None):
+        r"""Groups the atoms of small isolated molecules in :math:`\mathcal{O}(N)`
+
+        A connected component of the bond graph with at most ``max_motif_size``
+        atoms (and no more than ``max_size``) would be contracted
+        into a single fragment anyway, so it is assigned a single label.
+
+        Parameters
+        ----------
+        Z : numpy.ndarray
+            Atomic numbers
+        bonds : list
+            List of bonds, given as ``[atom_1_index, atom_2_index, distance]``.
+        max_size : int, float
+            Maximal size (or cost) of a fragment
+        is_open : numpy.ndarray, optional
+            Whether an atom has bonds that are not given, its component is then not
+            grouped. Default is ``None`` (all bonds are given).
+
+        Returns
+        -------
+        labels : numpy.ndarray
+            Label of the initial vertex of each atom, numbered in
+            order of first appearance.
+        """
+        n_components, components = _get_connected_components(Z.size, bonds)
+
+        component_sizes = np.bincount(components, minlength=n_components)
+
+        if self._cost_model is None:
+            max_motif_size = min(self._max_motif_size, max_size)
+            is_small = component_sizes <= max_motif_size
+        else:
+            is_small = component_sizes <= self._max_motif_size
+            order = np.argsort(components, kind="stable")
+            atoms = np.split(order, np.cumsum(component_sizes)[:-1])
+            for c in np.flatnonzero(is_small):
+                is_small[c] = self._cost_model(Z[atoms[c]]) <= max_size
+
+        if is_open is not None:
+            is_small[components[is_open]] = False
+
+        in_motif = is_small[components]
+        keys = np.where(in_motif, components, n_components + np.arange(Z.size))
+
+        _, first_atom, labels = np.unique(keys, return_index=True, return_inverse=True)
+        rank = np.empty(first_atom.size, dtype=int)
+        rank[np.argsort(first_atom)] = np.arange(first_atom.size)
+
+        return rank[labels.ravel()]
+
+    def _add_vertices_from_labels(self, labels, atoms=None, g=None):
+        """Adds a vertex to the graph for each label, containing the atoms with that label
+
+        Parameters
+        ----------
+        labels : numpy.ndarray
+            Label of each atom, the labels must be ``0, 1, ..., n_vertices - 1``
+        atoms : numpy.ndarray, optional
+            Atoms to which the labels belong. Default is ``None`` (all atoms).
+        g : ContractableWeightedGraph, optional
+            Graph to which the vertices are added. Default is ``None`` (``self.g``).
+        """
+        if atoms is None:
+            atoms = np.arange(self.m.size)
+        if g is None:
+            g = self.g
+
+        if atoms.size == 0:
+            return
+
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels)
+
+        for vertex_atoms in np.split(atoms[order], np.cumsum(counts)[:-1]):
+            g.add_vertex(self.m[vertex_atoms])
+
+
+def _insert_bonds(bonds, bond_lengths, new_bonds, new_bond_lengths):
+    """Inserts bonds into bonds that are sorted by the first and then by the second atom
+
+    Returns
+    -------
+    bonds : numpy.ndarray
+    bond_lengths : numpy.ndarray
+    """
+    bonds = np.reshape(bonds, (-1, 2))
+    new_bonds = np.reshape(new_bonds, (-1, 2))
+    order = np.lexsort((new_bonds[:, 1], new_bonds[:, 0]))
+
+    n = max(np.max(bonds, initial=0), np.max(new_bonds, initial=0)) + 1
+    keys = bonds[:, 0].astype(np.int64) * n + bonds[:, 1]
+    new_keys = new_bonds[order, 0].astype(np.int64) * n + new_bonds[order, 1]
+    positions = np.searchsorted(keys, new_keys)
+
+    return (
+        np.insert(bonds, positions, new_bonds[order], axis=0),
+        np.insert(bond_lengths, positions, np.asarray(new_bond_lengths)[order]),
+    )
+
+
+def _cluster_by_distance(points, sizes, max_cluster_size, get_cost=None):
+    """Greedy clustering of points into size-capped clusters
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        Cartesian coordinates of the points to cluster
+    sizes : numpy.ndarray
+        Size of each point
+    max_cluster_size : int, float
+        Maximal size of a cluster
+    get_cost : callable, optional
+        Function returning the size of a cluster, given the list of its points.
+        Default is ``None``, in which case the sizes are added.
+
+    Returns
+    -------
+    clusters : numpy.ndarray
+        Cluster index of each point
+    """
+    from scipy.spatial import cKDTree
+
+    n_points = sizes.size
+    tree = cKDTree(points)
+
+    extent = np.ptp(points, axis=0)
+    seeds = np.argsort(points[:, np.argmax(extent)], kind="stable")
+
+    n_neighbors = min(
+        n_points, 2 * max(1, int(max_cluster_size // max(1, sizes.min())))
+    )
+
+    clusters = np.full(n_points, -1, dtype=int)
+    n_clusters = 0
+
+    for seed in seeds:
+        if clusters[seed] != -1:
+            continue
+
+        clusters[seed] = n_clusters
+        cluster = [seed]
+        cluster_size = sizes[seed]
+
+        _, neighbors = tree.query(points[seed], k=n_neighbors)
+        for neighbor in np.atleast_1d(neighbors):
+            if cluster_size >= max_cluster_size:
+                break
+            if clusters[neighbor] != -1:
+                continue
+
+            if get_cost is None:
+                new_size = cluster_size + sizes[neighbor]
+            else:
+                new_size = get_cost(cluster + [neighbor])
+
+            if new_size <= max_cluster_size:
+                clusters[neighbor] = n_clusters
+                cluster.append(neighbor)
+                cluster_size = new_size
+
+        n_clusters += 1
+
+    return clusters
+
+
+def _get_connected_components(n_atoms, bonds):
+    r"""Determines the connected components of the bond graph in :math:`\mathcal{O}(N)`
+
+    Parameters
+    ----------
+    n_atoms : int
+        Number of atoms
+    bonds : list
+        List of bonds, given as ``[atom_1_index, atom_2_index, distance]``.
+
+    Returns
+    -------
+    n_components : int
+        Number of connected components
+    labels : numpy.ndarray
+        Component index of each atom
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
 
-        bonds = self.m.get_bonds()
-        for a1, a2, bond_length in bonds:
-            self.g.add_edge(a1, a2, bond_length)
+    bonds = np.reshape(np.array(bonds), (-1, 3))
+    rows = bonds[:, 0].astype(int)
+    cols = bonds[:, 1].astype(int)
 
-        self.g.contract_by_smallest_weight()
+    adjacency = coo_matrix((np.ones(rows.size), (rows, cols)), shape=(n_atoms, n_atoms))
+    return connected_components(adjacency, directed=False)
@@ -6,10 +6,10 @@
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
 import numpy as np
-from scipy.spatial import distance_matrix
 
 
 from fragmentino.io import FileHandlerXYZ
+from fragmentino.neighbor_search import get_bonded_pairs, get_cell, minimum_image
 from fragmentino.periodic_table import (
     symbol_to_Z,
     Z_to_symbol,
@@ -22,7 +22,7 @@ from fragmentino.periodic_table import (
 class Molecule:
     """Stores the molecule and its properties"""
 
-    def __init__(self, Z, xyz, bond_factor=1.3):
+    def __init__(self, Z, xyz, bond_factor=1.3, cell=None, indices=None):
         """Creates a molecule
 
         Parameters
@@ -37,13 +37,24 @@ class Molecule:
             Factor used to determine bonds. Default is ``bond_factor=1.3`` according to
             J. Chem. Phys. 117, 9160 (2002); https://doi.org/10.1063/1.1515483
 
+        cell : numpy.ndarray, optional
+            Lattice vectors (rows of a 3x3 array) or side lengths of an orthorhombic
+            cell for periodic systems. Bonds are then determined with the minimum image
+            convention. Default is ``None`` (not periodic).
+
+        indices : numpy.ndarray, optional
+            Indices of the atoms in a parent molecule, ``-1`` for atoms that are
+            not in the parent (e.g. capping hydrogens). Default is ``None``.
+
         """
         self.xyz = np.atleast_2d(xyz)
         self.Z = np.atleast_1d(Z)
         self.bond_factor = bond_factor
+        self.cell = get_cell(cell)
+        self.indices = None if indices is None else np.atleast_1d(indices)
 
     @classmethod
-    def from_xyz_file(cls, file_name, bond_factor=1.3):
+    def from_xyz_file(cls, file_name, bond_factor=1.3, cell=None, profiler=None):
         """Creates a molecule by reading an xyz-file.
 
         Parameters
@@ -53,16 +64,21 @@ class Molecule:
         bond_factor : float
             Factor used to determine bonds. Default is ``bond_factor=1.3`` according to
             J. Chem. Phys. 117, 9160 (2002); https://doi.org/10.1063/1.1515483
+        cell : numpy.ndarray, optional
+            Lattice vectors or side lengths of the periodic cell. Default is ``None``.
+        profiler : fragmentino.profiling.Profiler, optional
+            Profiler of the file reading, see :class:`fragmentino.FileHandlerXYZ`.
+            Default is ``None``.
 
         Returns
         -------
         molecule : Molecule
 
         """
-        fh = FileHandlerXYZ(file_name)
+        fh = FileHandlerXYZ(file_name, profiler)
         symbols, xyz = fh.read()
         Z = np.fromiter(map(symbol_to_Z, np.atleast_1d(symbols)), dtype=int)
-        return cls(Z, xyz, bond_factor)
+        return cls(Z, xyz, bond_factor, cell)
 
     @classmethod
     def from_molecules(cls, m1, m2, bond_factor=1.3):
@@ -86,7 +102,7 @@ class Molecule:
 
         Z = np.hstack((m1.Z, m2.Z))
         xyz = np.vstack((m1.xyz, m2.xyz))
-        return cls(Z, xyz, bond_factor)
+        return cls(Z, xyz, bond_factor, m1.cell, _merge_indices(m1, m2))
 
     def __repr__(self):
         return f"{self.__class__.__name__} {self.size}"
@@ -95,7 +111,16 @@ class Molecule:
         return self.size
 
     def __getitem__(self, key):
-        return Molecule(self.Z[key], self.xyz[key])
+        """Returns the atoms given by ``key`` as a molecule, the indices of the
+        atoms (in the parent of this molecule, if any) are stored in its ``indices``"""
+        if self.indices is None:
+            indices = np.arange(self.size)[key]
+        else:
+            indices = self.indices[key]
+
+        return Molecule(
+            self.Z[key], self.xyz[key], self.bond_factor, self.cell, indices
+        )
 
     def __iter__(self):
         for Z, xyz in zip(self.Z, self.xyz):
@@ -104,6 +129,11 @@ class Molecule:
     @property
     def distances(self):
         """Distances between atoms in molecule"""
+        if self.cell is not None:
+            return np.linalg.norm(self._get_displacements_to(self), axis=-1)
+
+        from scipy.spatial import distance_matrix
+
         return distance_matrix(self.xyz, self.xyz)
 
     @property
@@ -132,15 +162,18 @@ class Molecule:
     def symbols(self):
         return list(map(Z_to_symbol, self.Z))
 
-    def write_xyz(self, file_name, comment=""):
+    def write_xyz(self, file_name, comment="", profiler=None):
         """Writes the molecular geometry to an xyz-file.
 
         Parameters
         ----------
         file_name : str
             File name with full or relative path
+        profiler : fragmentino.profiling.Profiler, optional
+            Profiler of the file writing, see :class:`fragmentino.FileHandlerXYZ`.
+            Default is ``None``.
         """
-        fh = FileHandlerXYZ(file_name)
+        fh = FileHandlerXYZ(file_name, profiler)
         fh.write(self.symbols, self.xyz, comment=comment)
 
     def merge(self, other):
@@ -152,6 +185,7 @@ class Molecule:
             The other molecule to merge with
 
         """
+        self.indices = _merge_indices(self, other)
         self.Z = np.hstack((self.Z, other.Z))
         self.xyz = np.vstack((self.xyz, other.xyz))
 
@@ -195,14 +229,41 @@ class Molecule:
         self.Z = np.append(self.Z, atomic_number)
         self.xyz = np.vstack((self.xyz, xyz))
 
-    def get_bonds(self):
+        if self.indices is not None:
+            self.indices = np.append(self.indices, -1)
+
+    def get_bonds(self, n_workers=None):
         """Determines the bonds of the molecule
 
+        For periodic molecules, the bonds are determined with a linked-cell
+        algorithm under the minimum image convention.
+
+        Parameters
+        ----------
+        n_workers : int, optional
+            Number of processes used to determine the bonds in parallel, see
+            :func:`fragmentino.parallel_bonds.get_bonded_pairs_parallel`.
+            Default is ``None``, in which case the bonds are determined serially.
+
         Returns
         -------
         bonds : list
             List of bonds, given as ``[atom_1_index, atom_2_index, distance]``.
         """
+        if n_workers is not None:
+            from fragmentino.parallel_bonds import get_bonded_pairs_parallel
+
+            rows, cols, distances = get_bonded_pairs_parallel(
+                self.xyz, self.Z, self.bond_factor, self.cell, n_workers
+            )
+            return [list(bond) for bond in zip(rows, cols, distances)]
+
+        if self.cell is not None:
+            rows, cols, distances = get_bonded_pairs(
+                self.xyz, self._get_bonding_radii(), self.cell
+            )
+            return [list(bond) for bond in zip(rows, cols, distances)]
+
         theoretical_bond_lengths = self._get_theoretical_covalent_bond_lengths()
         distances = self.distances
 
@@ -228,7 +289,12 @@ class Molecule:
         bonds : list
             List of bonds, given as ``[atom_1_index, atom_2_index, distance]``.
         """
-        distances = distance_matrix(self.xyz, other.xyz)
+        if self.cell is not None:
+            distances = np.linalg.norm(self._get_displacements_to(other), axis=-1)
+        else:
+            from scipy.spatial import distance_matrix
+
+            distances = distance_matrix(self.xyz, other.xyz)
 
         theoretical_bond_lengths = np.zeros((self.size, other.size))
         for i, Z in enumerate(self.Z):
@@ -245,6 +311,93 @@ class Molecule:
 
         return bonds
 
+    def minimum_image(self, vectors):
+        """Applies the minimum image convention to displacement vectors.
+        For molecules without a cell, the vectors are returned unchanged.
+
+        Parameters
+        ----------
+        vectors : numpy.ndarray
+            Cartesian displacement vectors, the last axis has length 3
+
+        Returns
+        -------
+        vectors : numpy.ndarray
+        """
+        return minimum_image(vectors, self.cell)
+
+    def unwrap(self):
+        r"""Translates atoms by lattice vectors, such that bonded atoms are
+        placed next to each other, i.e. molecules split by the cell boundary are made whole.
+
+        The atoms are visited in breadth first order over the bonds and the accumulated
+        lattice translations are summed up the tree by pointer jumping,
+        which is :math:`\mathcal{O}(N \log N)` scaling.
+
+        Note
+        ----
+
+        Changes the instance of the molecule. Covalent networks that extend
+        through the cell (e.g. covalent crystals) cannot be made whole.
+
+        """
+        if self.cell is None or self.size < 2:
+            return
+
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import breadth_first_order, connected_components
+
+        bonds = np.reshape(np.array(self.get_bonds()), (-1, 3))
+        rows = bonds[:, 0].astype(int)
+        cols = bonds[:, 1].astype(int)
+
+        # a virtual root connects to the first atom of each connected component
+        n_components, labels = connected_components(
+            coo_matrix((np.ones(rows.size), (rows, cols)), shape=(self.size,) * 2),
+            directed=False,
+        )
+        _, roots = np.unique(labels, return_index=True)
+
+        rows = np.concatenate((rows, np.full(n_components, self.size)))
+        cols = np.concatenate((cols, roots))
+        adjacency = coo_matrix(
+            (np.ones(rows.size), (rows, cols)), shape=(self.size + 1,) * 2
+        )
+        _, parent = breadth_first_order(
+            adjacency, self.size, directed=False, return_predecessors=True
+        )
+        parent[self.size] = self.size
+        parent[roots] = self.size
+
+        fractional = np.zeros((self.size + 1, 3))
+        fractional[: self.size] = self.xyz @ np.linalg.inv(self.cell)
+
+        translations = -np.round(fractional - fractional[parent])
+        translations[roots] = 0
+
+        ancestor = parent
+        while np.any(ancestor != self.size):
+            translations = translations + translations[ancestor]
+            ancestor = ancestor[ancestor]
+
+        self.xyz = self.xyz + translations[: self.size] @ self.cell
+
+    def _get_bonding_radii(self):
+        """Returns the covalent radii scaled by the bond factor"""
+        return Z_to_covalent_radius(np.asarray(self.Z, dtype=int)) * self.bond_factor
+
+    def _get_displacements_to(self, other):
+        """Returns the minimum image displacement vectors to the atoms of another molecule"""
+        return self.minimum_image(other.xyz[None, :, :] - self.xyz[:, None, :])
+
     def same_size(self, other):
         """Checks if two molecules are of the same size"""
         return self.size == other.size
+
+
+def _merge_indices(m1, m2):
+    """Indices of the atoms of two merged molecules, ``None`` unless both molecules have indices"""
+    if m1.indices is None or m2.indices is None:
+        return None
+
+    return np.hstack((m1.indices, m2.indices))
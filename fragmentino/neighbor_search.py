@@ -0,0 +1,250 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+from itertools import product
+
+
+def get_bonded_pairs(xyz, radii, cell=None):
+    r"""Determines the bonded pairs of atoms with a linked-cell algorithm
+
+    Two atoms :math:`i` and :math:`j` are bonded if their distance is smaller
+    than :math:`r_i + r_j`. The atoms are sorted into bins that are at least
+    as wide as the largest possible bond, such that only atoms in neighboring
+    bins have to be considered, and the procedure is :math:`\mathcal{O}(N)` scaling.
+
+    Parameters
+    ----------
+    xyz : numpy.ndarray
+        Cartesian coordinates in Angstrom
+    radii : numpy.ndarray
+        Bonding radius of each atom, i.e. the covalent radius scaled by the bond factor
+    cell : numpy.ndarray, optional
+        Lattice vectors (rows) of the periodic cell. Distances are then evaluated
+        with the minimum image convention, which requires that bonds are shorter than
+        half the perpendicular widths of the cell. Default is ``None`` (not periodic).
+
+    Returns
+    -------
+    rows : numpy.ndarray
+        Index of first atom of each bond
+    cols : numpy.ndarray
+        Index of second atom of each bond, ``rows < cols``
+    distances : numpy.ndarray
+        Bond lengths
+
+    Note
+    ----
+    The bonds are ordered by ascending ``rows`` and then by ascending ``cols``.
+    """
+    xyz = np.asarray(xyz, dtype=float)
+    radii = np.asarray(radii, dtype=float)
+
+    if xyz.shape[0] < 2:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros(0)
+
+    cutoff = 2 * np.max(radii)
+    bins, n_bins, offsets = _get_bins(xyz, cutoff, cell)
+    periodic = cell is not None
+
+    bin_index = np.ravel_multi_index(bins.T, n_bins)
+    atoms_sorted = np.argsort(bin_index, kind="stable")
+    counts = np.bincount(bin_index, minlength=np.prod(n_bins))
+    starts = np.cumsum(counts) - counts
+
+    rows, cols, distances = [], [], []
+    for offset in offsets:
+        neighbor_bins = bins + offset
+        if periodic:
+            neighbor_bins = neighbor_bins % n_bins
+            atoms = np.arange(xyz.shape[0])
+        else:
+            inside = np.all((neighbor_bins >= 0) & (neighbor_bins < n_bins), axis=1)
+            atoms = np.flatnonzero(inside)
+            neighbor_bins = neighbor_bins[inside]
+
+        neighbor_index = np.ravel_multi_index(neighbor_bins.T, n_bins)
+        n_neighbors = counts[neighbor_index]
+
+        i = np.repeat(atoms, n_neighbors)
+        first = np.repeat(starts[neighbor_index], n_neighbors)
+        position = np.arange(i.size) - np.repeat(
+            np.cumsum(n_neighbors) - n_neighbors, n_neighbors
+        )
+        j = atoms_sorted[first + position]
+
+        keep = i < j
+        i, j = i[keep], j[keep]
+
+        d = np.linalg.norm(minimum_image(xyz[j] - xyz[i], cell), axis=1)
+        bonded = d < radii[i] + radii[j]
+
+        rows.append(i[bonded])
+        cols.append(j[bonded])
+        distances.append(d[bonded])
+
+    rows = np.concatenate(rows)
+    cols = np.concatenate(cols)
+    distances = np.concatenate(distances)
+
+    order = np.lexsort((cols, rows))
+    return rows[order], cols[order], distances[order]
+
+
+def get_bonded_pairs_of(xyz, radii, atoms, cell=None):
+    r"""Determines the bonds of the given atoms to all atoms with linked cells
+
+    Only the atoms in the bins around the given atoms are searched for bonds, such
+    that, apart from binning the atoms, the cost scales with the number of given atoms.
+
+    Parameters
+    ----------
+    xyz : numpy.ndarray
+        Cartesian coordinates in Angstrom
+    radii : numpy.ndarray
+        Bonding radius of each atom, i.e. the covalent radius scaled by the bond factor
+    atoms : numpy.ndarray
+        Indices of the atoms whose bonds are determined
+    cell : numpy.ndarray, optional
+        Lattice vectors (rows) of the periodic cell. Default is ``None`` (not periodic).
+
+    Returns
+    -------
+    rows : numpy.ndarray
+        Index of first atom of each bond
+    cols : numpy.ndarray
+        Index of second atom of each bond, ``rows < cols``
+    distances : numpy.ndarray
+        Bond lengths
+
+    Note
+    ----
+    The bonds are ordered by ascending ``rows`` and then by ascending ``cols``.
+    """
+    xyz = np.asarray(xyz, dtype=float)
+    radii = np.asarray(radii, dtype=float)
+    atoms = np.unique(np.asarray(atoms, dtype=int))
+
+    if atoms.size == 0 or xyz.shape[0] < 2:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros(0)
+
+    bins, n_bins, offsets = _get_bins(xyz, 2 * np.max(radii), cell)
+
+    neighbor_bins = []
+    for offset in offsets:
+        shifted = bins[atoms] + offset
+        if cell is not None:
+            shifted = shifted % n_bins
+        else:
+            inside = np.all((shifted >= 0) & (shifted < n_bins), axis=1)
+            shifted = shifted[inside]
+        neighbor_bins.append(np.ravel_multi_index(shifted.T, n_bins))
+
+    bin_index = np.ravel_multi_index(bins.T, n_bins)
+    candidates = np.flatnonzero(np.isin(bin_index, np.concatenate(neighbor_bins)))
+
+    rows, cols, distances = get_bonded_pairs(xyz[candidates], radii[candidates], cell)
+    rows, cols = candidates[rows], candidates[cols]
+
+    is_given = np.zeros(xyz.shape[0], dtype=bool)
+    is_given[atoms] = True
+    keep = is_given[rows] | is_given[cols]
+
+    return rows[keep], cols[keep], distances[keep]
+
+
+def minimum_image(vectors, cell=None):
+    """Applies the minimum image convention to displacement vectors
+
+    Parameters
+    ----------
+    vectors : numpy.ndarray
+        Cartesian displacement vectors, the last axis has length 3
+    cell : numpy.ndarray, optional
+        Lattice vectors (rows) of the periodic cell. Default is ``None``,
+        in which case the vectors are returned unchanged.
+
+    Returns
+    -------
+    vectors : numpy.ndarray
+        The shortest periodic images of the displacement vectors
+    """
+    if cell is None:
+        return vectors
+
+    fractional = vectors @ np.linalg.inv(cell)
+    fractional -= np.round(fractional)
+    return fractional @ cell
+
+
+def get_cell(cell):
+    """Returns the lattice vectors of a cell as rows of a 3x3 array
+
+    Parameters
+    ----------
+    cell : numpy.ndarray
+        Either the three lattice vectors (rows of a 3x3 array), or the
+        three side lengths of an orthorhombic cell. ``None`` is passed through.
+
+    Returns
+    -------
+    cell : numpy.ndarray
+    """
+    if cell is None:
+        return None
+
+    cell = np.asarray(cell, dtype=float)
+    if cell.shape == (3,):
+        cell = np.diag(cell)
+
+    if cell.shape != (3, 3):
+        raise ValueError("Cell must be given by three lattice vectors or lengths")
+
+    return cell
+
+
+def _get_bins(xyz, bin_width, cell):
+    """Assigns atoms to bins of at least ``bin_width`` width
+
+    Returns
+    -------
+    bins : numpy.ndarray
+        Bin of each atom along each axis
+    n_bins : numpy.ndarray
+        Number of bins along each axis
+    offsets : list
+        Offsets to the neighboring bins (without duplicates)
+    """
+    if cell is None:
+        origin = np.min(xyz, axis=0)
+        widths = np.ptp(xyz, axis=0)
+
+        # avoid an excessive number of (mostly empty) bins for sparse systems
+        volume = np.prod(np.maximum(widths, bin_width))
+        bin_width = max(bin_width, (volume / (4 * xyz.shape[0])) ** (1 / 3))
+
+        n_bins = np.maximum(1, np.floor(widths / bin_width)).astype(int)
+        fractional = (xyz - origin) / np.maximum(widths, bin_width)
+
+        axis_offsets = [[-1, 0, 1]] * 3
+    else:
+        fractional = xyz @ np.linalg.inv(cell)
+        fractional -= np.floor(fractional)
+
+        volume = abs(np.linalg.det(cell))
+        heights = volume / np.linalg.norm(
+            np.cross(cell[[1, 2, 0]], cell[[2, 0, 1]]), axis=1
+        )
+
+        n_bins = np.maximum(1, np.floor(heights / bin_width)).astype(int)
+
+        axis_offsets = [sorted(set([-1 % n, 0, 1 % n])) for n in n_bins]
+
+    bins = np.minimum(np.floor(fractional * n_bins).astype(int), n_bins - 1)
+    offsets = [np.array(offset) for offset in product(*axis_offsets)]
+
+    return bins, n_bins, offsets
@@ -0,0 +1,402 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+import os
+import warnings
+from itertools import islice
+from numpy.lib.format import open_memmap
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+
+from fragmentino.molecule import Molecule
+from fragmentino.molecular_fragmenter import MolecularFragmenter
+from fragmentino.neighbor_search import get_bonded_pairs
+from fragmentino.periodic_table import symbol_to_Z, Z_to_covalent_radius
+
+
+class OutOfCoreFragmenter:
+    """Fragments molecules that are too large to be held in memory
+
+    The coordinates, bonds and results are stored in memory-mapped ``.npy`` files
+    in a working directory, and are processed in pieces of at most about
+    ``max_slab_size`` atoms:
+
+    - The xyz-file is read in chunks into memory-mapped arrays.
+    - Space is split into slabs along the longest axis. The bonds of the atoms
+      in a slab are determined together with a halo of atoms from the neighboring slabs,
+      as wide as the longest possible bond, and each bond is kept by the slab that
+      contains its first atom.
+    - The slabs are stitched by determining the connected components of the bond
+      graph with a union-find over chunks of bonds.
+    - The connected components are fragmented in batches with
+      :class:`fragmentino.MolecularFragmenter`. No contraction crosses a component,
+      so the fragments are the same as those of an in-memory run.
+
+    Attributes
+    ----------
+    Z : numpy.memmap
+        Atomic numbers
+    xyz : numpy.memmap
+        Cartesian coordinates in Angstrom
+    bonds : numpy.memmap
+        Pairs of bonded atoms
+    bond_lengths : numpy.memmap
+        Length of each bond
+    labels : numpy.memmap
+        Fragment of each atom, the fragments are numbered in order of their first atom
+    capped_bonds : numpy.memmap
+        Pairs of bonded fragments
+
+    Note
+    ----
+    Periodic systems are not supported. Index arrays with one entry per atom or bond
+    are sorted in memory, and a single connected component is always fragmented in
+    memory, with a warning if it has more than ``max_slab_size`` atoms.
+    """
+
+    def __init__(
+        self,
+        max_fragment_size,
+        file_name,
+        directory,
+        max_slab_size=1000000,
+        bond_factor=1.3,
+        max_motif_size=None,
+        cost_model=None,
+        engine="greedy",
+        max_ring_size=None,
+    ):
+        """Creates the out-of-core fragmenter and fragments the molecule
+
+        Parameters
+        ----------
+        max_fragment_size : int, float
+           Maximal number of atoms in a fragment,
+           or maximal cost of a fragment if ``cost_model`` is given.
+        file_name : str
+           Name xyz file to read (with full or relative path).
+        directory : str
+           Working directory for the memory-mapped arrays, preferably on a local disk.
+        max_slab_size : int, optional
+           Approximate number of atoms that are processed at once. Default is 10⁶.
+        bond_factor : float, optional
+           Factor used to determine bonds. Default is ``bond_factor=1.3``.
+
+        See :class:`fragmentino.MolecularFragmenter` for the other parameters.
+        """
+        self.directory = os.path.expanduser(directory)
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.max_fragment_size = max_fragment_size
+        self.max_slab_size = max_slab_size
+        self.bond_factor = bond_factor
+        self._options = {
+            "max_motif_size": max_motif_size,
+            "cost_model": cost_model,
+            "engine": engine,
+            "max_ring_size": max_ring_size,
+        }
+
+        self._read(file_name)
+        self._find_bonds()
+        self._find_components()
+        self._fragment()
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}"
+            + f" Fragments: {self.n_fragments}"
+            + f" Capped bonds: {self.n_capped_bonds}"
+        )
+
+    @property
+    def n_atoms(self):
+        return self.Z.size
+
+    @property
+    def n_fragments(self):
+        return int(np.max(self.labels, initial=-1)) + 1
+
+    @property
+    def n_capped_bonds(self):
+        return self.capped_bonds.shape[0]
+
+    def get_fragment(self, i):
+        """Returns a fragment (without hydrogen caps) as a molecule
+
+        The fragment is found by scanning the labels in chunks.
+
+        Parameters
+        ----------
+        i : int
+            Index of the fragment
+
+        Returns
+        -------
+        fragment : Molecule
+            The ``indices`` of the fragment give its atoms in the input
+        """
+        atoms = np.hstack(
+            [
+                start
+                + np.flatnonzero(self.labels[start : start + self.max_slab_size] == i)
+                for start in range(0, self.n_atoms, self.max_slab_size)
+            ]
+        )
+        return Molecule(self.Z[atoms], self.xyz[atoms], self.bond_factor, indices=atoms)
+
+    def _get_path(self, name):
+        return os.path.join(self.directory, f"{name}.npy")
+
+    def _read(self, file_name):
+        """Reads the xyz-file in chunks into memory-mapped arrays"""
+        with open(os.path.expanduser(file_name.strip()), encoding="utf-8") as f:
+            n_atoms = int(f.readline())
+            f.readline()
+
+            self.Z = open_memmap(
+                self._get_path("Z"), mode="w+", dtype=int, shape=(n_atoms,)
+            )
+            self.xyz = open_memmap(
+                self._get_path("xyz"), mode="w+", dtype=np.float32, shape=(n_atoms, 3)
+            )
+
+            for chunk in self._iter_chunks(n_atoms):
+                start, stop = chunk.start, chunk.stop
+                lines = islice(f, stop - start)
+                fields = [line.replace("\u200b", "").split() for line in lines]
+
+                self.Z[start:stop] = [symbol_to_Z(field[0][:2]) for field in fields]
+                self.xyz[start:stop] = np.array(
+                    [field[1:4] for field in fields], dtype=np.float32
+                )
+
+    def _get_radii(self, Z):
+        """Covalent radii scaled by the bond factor"""
+        radii = np.fromiter(map(Z_to_covalent_radius, np.unique(Z)), dtype=float)
+        return radii[np.searchsorted(np.unique(Z), Z)] * self.bond_factor
+
+    def _iter_chunks(self, n):
+        for start in range(0, n, self.max_slab_size):
+            yield slice(start, min(start + self.max_slab_size, n))
+
+    def _get_slabs(self, halo):
+        """Slab boundaries along the longest axis, such that each slab contains
+        about ``max_slab_size`` atoms"""
+        lower = np.full(3, np.inf)
+        upper = np.full(3, -np.inf)
+        for chunk in self._iter_chunks(self.n_atoms):
+            lower = np.minimum(lower, np.min(self.xyz[chunk], axis=0))
+            upper = np.maximum(upper, np.max(self.xyz[chunk], axis=0))
+
+        axis = int(np.argmax(upper - lower))
+
+        n_bins = max(1, min(4096, int((upper[axis] - lower[axis]) / halo)))
+        edges = np.linspace(lower[axis], upper[axis], n_bins + 1)
+        counts = np.zeros(n_bins, dtype=int)
+        for chunk in self._iter_chunks(self.n_atoms):
+            counts += np.histogram(self.xyz[chunk, axis], edges)[0]
+
+        cumulative = np.cumsum(counts)
+        targets = np.arange(self.max_slab_size, self.n_atoms, self.max_slab_size)
+        cuts = np.unique(np.searchsorted(cumulative, targets, side="right"))
+        cuts = cuts[(cuts > 0) & (cuts < n_bins)]
+
+        boundaries = np.hstack(([-np.inf], edges[cuts], [np.inf]))
+        return axis, boundaries
+
+    def _find_bonds(self):
+        """Determines the bonds slab by slab"""
+        max_radius = np.max(self._get_radii(np.unique(self.Z)), initial=0.0)
+        halo = 2 * max_radius
+        axis, boundaries = self._get_slabs(halo)
+
+        slab_bonds, slab_lengths = [], []
+        for lower, upper in zip(boundaries[:-1], boundaries[1:]):
+            atoms = []
+            for chunk in self._iter_chunks(self.n_atoms):
+                c = self.xyz[chunk, axis]
+                atoms.append(
+                    chunk.start
+                    + np.flatnonzero((c >= lower - halo) & (c < upper + halo))
+                )
+            atoms = np.hstack(atoms)
+
+            c = self.xyz[atoms, axis]
+            in_slab = (c >= lower) & (c < upper)
+
+            rows, cols, lengths = get_bonded_pairs(
+                self.xyz[atoms], self._get_radii(self.Z[atoms])
+            )
+            keep = in_slab[rows]
+
+            bonds = np.column_stack((atoms[rows], atoms[cols]))[keep]
+            slab_bonds.append(self._store(f"slab_bonds_{len(slab_bonds)}", bonds))
+            slab_lengths.append(
+                self._store(f"slab_bond_lengths_{len(slab_lengths)}", lengths[keep])
+            )
+
+        self.bonds = self._concatenate("bonds", slab_bonds, (0, 2), int)
+        self.bond_lengths = self._concatenate("bond_lengths", slab_lengths, (0,), float)
+
+    def _store(self, name, array):
+        """Stores an intermediate array on disk"""
+        path = self._get_path(name)
+        np.save(path, array)
+        return path
+
+    def _concatenate(self, name, paths, empty_shape, dtype):
+        """Concatenates intermediate arrays on disk into a memory-mapped array"""
+        parts = [np.load(path, mmap_mode="r") for path in paths]
+        n = sum(part.shape[0] for part in parts)
+
+        result = open_memmap(
+            self._get_path(name),
+            mode="w+",
+            dtype=dtype,
+            shape=(n,) + empty_shape[1:],
+        )
+
+        start = 0
+        for part, path in zip(parts, paths):
+            result[start : start + part.shape[0]] = part
+            start += part.shape[0]
+            del part
+            os.remove(path)
+
+        return result
+
+    def _find_components(self):
+        """Labels the connected components by their first atom, with a union-find
+        over chunks of bonds"""
+        parent = open_memmap(
+            self._get_path("components"), mode="w+", dtype=int, shape=(self.n_atoms,)
+        )
+        for chunk in self._iter_chunks(self.n_atoms):
+            parent[chunk] = np.arange(chunk.start, chunk.stop)
+
+        for chunk in self._iter_chunks(self.bonds.shape[0]):
+            roots, inverse = np.unique(
+                _find_roots(parent, self.bonds[chunk].ravel()), return_inverse=True
+            )
+            edges = np.reshape(inverse, (-1, 2))
+
+            adjacency = coo_matrix(
+                (np.ones(edges.shape[0]), (edges[:, 0], edges[:, 1])),
+                shape=(roots.size, roots.size),
+            )
+            _, local_components = connected_components(adjacency, directed=False)
+
+            # link each root to the smallest root of its component
+            new_roots = np.full(roots.size, self.n_atoms)
+            np.minimum.at(new_roots, local_components, roots)
+            parent[roots] = new_roots[local_components]
+
+        for chunk in self._iter_chunks(self.n_atoms):
+            parent[chunk] = _find_roots(parent, parent[chunk])
+
+        self.components = parent
+
+    def _fragment(self):
+        """Fragments the connected components in batches"""
+        atom_order = np.argsort(self.components, kind="stable")
+        sorted_components = self.components[atom_order]
+
+        # a component is fragmented as a whole, however large it is
+        starts = np.flatnonzero(np.diff(sorted_components)) + 1
+        component_sizes = np.diff(np.hstack(([0], starts, [self.n_atoms])))
+        largest = int(np.max(component_sizes, initial=0))
+        if largest > self.max_slab_size:
+            warnings.warn(
+                f"A connected component of {largest} atoms exceeds max_slab_size "
+                f"({self.max_slab_size}) and is fragmented in memory",
+                RuntimeWarning,
+            )
+
+        bond_components = self.components[self.bonds[:, 0]]
+        bond_order = np.argsort(bond_components, kind="stable")
+        sorted_bond_components = bond_components[bond_order]
+
+        self.labels = open_memmap(
+            self._get_path("labels"), mode="w+", dtype=int, shape=(self.n_atoms,)
+        )
+
+        first_atoms = []
+        capped_bonds = []
+        n_fragments = 0
+
+        start = 0
+        while start < self.n_atoms:
+            stop = min(start + self.max_slab_size, self.n_atoms)
+            stop = int(
+                np.searchsorted(sorted_components, sorted_components[stop - 1], "right")
+            )
+
+            atoms = atom_order[start:stop]
+            bond_start = np.searchsorted(
+                sorted_bond_components, sorted_components[start], "left"
+            )
+            bond_stop = np.searchsorted(
+                sorted_bond_components, sorted_components[stop - 1], "right"
+            )
+            bonds = bond_order[bond_start:bond_stop]
+
+            fragmenter = self._fragment_batch(atoms, bonds)
+
+            for i, fragment in enumerate(fragmenter):
+                self.labels[atoms[fragment.indices]] = n_fragments + i
+                first_atoms.append(np.min(atoms[fragment.indices]))
+
+            capped_bonds.append(
+                n_fragments + np.reshape(fragmenter.g.edges, (-1, 2)).astype(int)
+            )
+            n_fragments += fragmenter.n_fragments
+            start = stop
+
+        # number the fragments in order of their first atom
+        rank = np.empty(n_fragments, dtype=int)
+        rank[np.argsort(first_atoms)] = np.arange(n_fragments)
+
+        for chunk in self._iter_chunks(self.n_atoms):
+            self.labels[chunk] = rank[self.labels[chunk]]
+
+        capped_bonds = rank[np.vstack([np.zeros((0, 2), dtype=int)] + capped_bonds)]
+        self.capped_bonds = open_memmap(
+            self._get_path("capped_bonds"),
+            mode="w+",
+            dtype=int,
+            shape=capped_bonds.shape,
+        )
+        self.capped_bonds[:] = capped_bonds
+
+    def _fragment_batch(self, atoms, bonds):
+        """Fragments the atoms of a batch of connected components in memory"""
+        order = np.argsort(atoms)
+        local = order[np.searchsorted(atoms[order], self.bonds[bonds])]
+        local = np.sort(local, axis=1)
+
+        bond_order = np.lexsort((local[:, 1], local[:, 0]))
+        local_bonds = np.column_stack(
+            (local[bond_order], self.bond_lengths[bonds][bond_order])
+        )
+
+        m = Molecule(self.Z[atoms], self.xyz[atoms], self.bond_factor)
+        return MolecularFragmenter.from_molecule(
+            self.max_fragment_size, m, bonds=local_bonds, **self._options
+        )
+
+
+def _find_roots(parent, vertices):
+    """Follows the parent pointers of a union-find to the roots"""
+    roots = np.asarray(parent[vertices])
+    while True:
+        grandparents = np.asarray(parent[roots])
+        if np.all(grandparents == roots):
+            return roots
+        roots = grandparents
@@ -0,0 +1,205 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+import os
+
+
+from fragmentino.neighbor_search import get_bonded_pairs, get_cell
+from fragmentino.periodic_table import Z_to_covalent_radius
+
+
+def get_bonded_pairs_parallel(xyz, Z, bond_factor=1.3, cell=None, n_workers=None):
+    r"""Determines the bonded pairs of atoms in parallel by spatial domain decomposition
+
+    Space is split into slabs (domains) with about the same number of atoms along
+    the longest axis (a lattice vector for periodic systems). Each worker process
+    determines the bonds of a domain with :func:`fragmentino.neighbor_search.get_bonded_pairs`,
+    including a halo of atoms from the neighboring domains that is as wide as the longest
+    possible bond. A bond is only kept by the domain that contains its first atom,
+    such that no bond is found twice. The workers read the coordinates and atomic
+    numbers from shared memory, without copying them.
+
+    Parameters
+    ----------
+    xyz : numpy.ndarray
+        Cartesian coordinates in Angstrom
+    Z : numpy.ndarray
+        Atomic numbers
+    bond_factor : float, optional
+        Factor used to determine bonds. Default is ``bond_factor=1.3``.
+    cell : numpy.ndarray, optional
+        Lattice vectors (rows) of the periodic cell. Default is ``None`` (not periodic).
+    n_workers : int, optional
+        Number of worker processes. Default is ``None``, in which case
+        the number of CPUs is used.
+
+    Returns
+    -------
+    rows : numpy.ndarray
+        Index of first atom of each bond
+    cols : numpy.ndarray
+        Index of second atom of each bond, ``rows < cols``
+    distances : numpy.ndarray
+        Bond lengths
+
+    Note
+    ----
+    The bonds are the same, and in the same order, as those of
+    :func:`fragmentino.neighbor_search.get_bonded_pairs`. The workers need Python 3.8
+    or later (:mod:`multiprocessing.shared_memory`), otherwise the bonds are
+    determined serially.
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count()
+
+    if n_workers < 1:
+        raise ValueError("Number of workers must be positive")
+
+    xyz = np.ascontiguousarray(xyz, dtype=float)
+    Z = np.asarray(Z, dtype=int)
+    cell = get_cell(cell)
+    radii = bond_factor * Z_to_covalent_radius(Z)
+
+    try:
+        import multiprocessing.shared_memory  # noqa: F401
+    except ImportError:
+        # Python 3.7
+        return get_bonded_pairs(xyz, radii, cell)
+
+    if xyz.shape[0] < 2:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros(0)
+
+    # the atoms of a domain, and of its halo, are contiguous in the sorted positions
+    positions, scale = _get_positions(xyz, cell)
+    order = np.argsort(positions, kind="stable")
+    positions = positions[order]
+    halo = 2 * np.max(radii) * scale
+
+    shared_xyz = _to_shared_memory(xyz[order])
+    shared_radii = _to_shared_memory(radii[order])
+    try:
+        tasks = [
+            (
+                (shared_xyz.name, xyz.shape),
+                (shared_radii.name, radii.shape),
+                cell,
+                start,
+                stop,
+                _get_halo_ranges(positions, start, stop, halo, cell is not None),
+            )
+            for start, stop in _get_domains(xyz.shape[0], n_workers)
+        ]
+
+        if n_workers == 1:
+            results = list(map(_get_domain_bonds, tasks))
+        else:
+            from multiprocessing import Pool
+
+            with Pool(n_workers) as pool:
+                results = pool.map(_get_domain_bonds, tasks)
+    finally:
+        for shared in [shared_xyz, shared_radii]:
+            shared.close()
+            shared.unlink()
+
+    rows, cols, distances = [np.concatenate(result) for result in zip(*results)]
+    atoms = np.sort(order[np.column_stack((rows, cols))], axis=1)
+
+    bond_order = np.lexsort((atoms[:, 1], atoms[:, 0]))
+    return atoms[bond_order, 0], atoms[bond_order, 1], distances[bond_order]
+
+
+def _get_positions(xyz, cell):
+    """Positions of the atoms along the axis that is split into domains, and the
+    scaling of lengths to these positions (fractional coordinates for periodic systems)
+    """
+    if cell is None:
+        axis = np.argmax(np.ptp(xyz, axis=0))
+        return xyz[:, axis], 1.0
+
+    volume = abs(np.linalg.det(cell))
+    heights = volume / np.linalg.norm(
+        np.cross(cell[[1, 2, 0]], cell[[2, 0, 1]]), axis=1
+    )
+    axis = np.argmax(heights)
+
+    fractional = (xyz @ np.linalg.inv(cell))[:, axis]
+    return fractional - np.floor(fractional), 1.0 / heights[axis]
+
+
+def _get_domains(n_atoms, n_workers):
+    """Splits the sorted atoms into ranges with about the same number of atoms"""
+    bounds = np.linspace(0, n_atoms, n_workers + 1).astype(int)
+    return [
+        (start, stop) for start, stop in zip(bounds[:-1], bounds[1:]) if start < stop
+    ]
+
+
+def _get_halo_ranges(positions, start, stop, halo, periodic):
+    """Ranges of the sorted atoms within the halo of a domain (including the domain),
+    which wrap around the periodic boundary for periodic systems"""
+    lower = positions[start] - halo
+    upper = positions[stop - 1] + halo
+    n_atoms = positions.size
+
+    ranges = [
+        (
+            np.searchsorted(positions, lower, side="left"),
+            np.searchsorted(positions, upper, side="right"),
+        )
+    ]
+    if periodic and lower < 0:
+        ranges.append((np.searchsorted(positions, lower + 1, side="left"), n_atoms))
+    if periodic and upper >= 1:
+        ranges.append((0, np.searchsorted(positions, upper - 1, side="right")))
+
+    return ranges
+
+
+def _to_shared_memory(array):
+    """Copies an array into a new shared memory block"""
+    # needs Python 3.8, so it is only imported when bonds are determined in parallel
+    from multiprocessing.shared_memory import SharedMemory
+
+    shared = SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shared.buf)[...] = array
+    return shared
+
+
+def _get_domain_bonds(task):
+    """Determines the bonds of the atoms in a domain, run by a worker process.
+    Only the slices of the domain and its halo are read from the sorted atoms."""
+    (xyz_name, xyz_shape), (radii_name, radii_shape), *options = task
+    cell, start, stop, ranges = options
+
+    from multiprocessing.shared_memory import SharedMemory
+
+    shared_xyz = SharedMemory(name=xyz_name)
+    shared_radii = SharedMemory(name=radii_name)
+    try:
+        xyz = np.ndarray(xyz_shape, dtype=float, buffer=shared_xyz.buf)
+        radii = np.ndarray(radii_shape, dtype=float, buffer=shared_radii.buf)
+
+        if len(ranges) == 1:
+            atoms = np.arange(*ranges[0])
+        else:
+            # the ranges overlap if the halo is wider than the cell
+            atoms = np.unique(np.concatenate([np.arange(*bounds) for bounds in ranges]))
+
+        rows, cols, distances = get_bonded_pairs(xyz[atoms], radii[atoms], cell)
+
+        # a bond is kept by the domain of its first atom
+        first = np.minimum(atoms[rows], atoms[cols])
+        keep = (first >= start) & (first < stop)
+        result = atoms[rows[keep]], atoms[cols[keep]], distances[keep]
+        del xyz, radii
+    finally:
+        shared_xyz.close()
+        shared_radii.close()
+
+    return result
@@ -0,0 +1,447 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+
+
+def partition_multilevel(
+    n_vertices, edges, weights, max_part_size, vertex_sizes=None, n_passes=10
+):
+    r"""Partitions a graph into parts of limited size with a multilevel scheme,
+    in the style of METIS:
+
+    - Coarsening: the graph is repeatedly coarsened by contracting a heavy-edge matching,
+      where only vertices with a combined size below ``max_part_size`` are matched.
+      The coarsening stops when no more vertices can be matched.
+    - Initial partitioning: each vertex of the coarsest graph is a part.
+    - Uncoarsening: the partition is projected back to the finer graphs, and on each level
+      boundary vertices are moved to neighboring parts whenever this reduces the
+      weight of the cut edges without exceeding ``max_part_size``.
+
+    Finally, parts that are not connected are split into their connected components.
+    Each level is :math:`\mathcal{O}(N + E)` scaling.
+
+    Parameters
+    ----------
+    n_vertices : int
+        Number of vertices
+    edges : numpy.ndarray
+        Pairs of vertex indices
+    weights : numpy.ndarray
+        Edge weights, heavy edges are preferably not cut
+    max_part_size : int, float
+        Maximal size of a part
+    vertex_sizes : numpy.ndarray, optional
+        Size of each vertex. Default is ``None``, in which case all vertices have size 1.
+    n_passes : int, optional
+        Maximal number of refinement passes on each level. Default is ``n_passes=10``.
+
+    Returns
+    -------
+    labels : numpy.ndarray
+        Part of each vertex, numbered in order of first appearance
+    """
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    if vertex_sizes is None:
+        vertex_sizes = np.ones(n_vertices)
+
+    sizes = np.asarray(vertex_sizes, dtype=float)
+    if np.any(sizes > max_part_size):
+        raise ValueError("Vertex sizes cannot exceed the maximal part size")
+
+    adjacency = get_adjacency_matrix(n_vertices, edges, weights)
+    finest = adjacency
+
+    levels = []
+    while adjacency.shape[0] > 1:
+        coarse_map = _match_heavy_edges(adjacency, sizes, max_part_size)
+        n_coarse = np.max(coarse_map, initial=-1) + 1
+        if n_coarse == adjacency.shape[0]:
+            break
+
+        levels.append((adjacency, sizes, coarse_map))
+
+        projection = csr_matrix(
+            (np.ones(coarse_map.size), (np.arange(coarse_map.size), coarse_map)),
+            shape=(coarse_map.size, n_coarse),
+        )
+        adjacency = (projection.T @ adjacency @ projection).tocsr()
+        adjacency.setdiag(0)
+        adjacency.eliminate_zeros()
+        sizes = np.bincount(coarse_map, weights=sizes, minlength=n_coarse)
+
+    labels = np.arange(adjacency.shape[0])
+
+    for adjacency, sizes, coarse_map in reversed(levels):
+        labels = labels[coarse_map]
+        labels = refine_boundary(adjacency, sizes, labels, max_part_size, n_passes)
+
+    _, components = connected_components(_get_internal_edges(finest, labels))
+
+    return _number_by_first_appearance(components)
+
+
+def refine_boundary(adjacency, sizes, labels, max_part_size, n_passes=10):
+    """Reduces the weight of the cut edges of a partition by moving boundary vertices
+    to the neighboring part to which they are most strongly connected
+
+    Each pass moves, in order of decreasing gain, boundary vertices with a positive gain,
+    as long as the size of the receiving part does not exceed ``max_part_size``.
+    A vertex is not moved if one of its neighbors has already moved in the same pass.
+
+    Parameters
+    ----------
+    adjacency : scipy.sparse.csr_matrix
+        Symmetric weighted adjacency matrix
+    sizes : numpy.ndarray
+        Size of each vertex
+    labels : numpy.ndarray
+        Part of each vertex
+    max_part_size : int, float
+        Maximal size of a part
+    n_passes : int, optional
+        Maximal number of passes. Default is ``n_passes=10``.
+
+    Returns
+    -------
+    labels : numpy.ndarray
+    """
+    from scipy.sparse import csr_matrix
+
+    labels = np.array(labels)
+    n_vertices = labels.size
+
+    for _ in range(n_passes):
+        n_parts = np.max(labels, initial=-1) + 1
+        part_sizes = np.bincount(labels, weights=sizes, minlength=n_parts)
+
+        membership = csr_matrix(
+            (np.ones(n_vertices), (np.arange(n_vertices), labels)),
+            shape=(n_vertices, n_parts),
+        )
+        connections = (adjacency @ membership).tocoo()
+        vertices, parts, weights = connections.row, connections.col, connections.data
+
+        internal = np.zeros(n_vertices)
+        own = parts == labels[vertices]
+        internal[vertices[own]] = weights[own]
+
+        gains = weights - internal[vertices]
+        candidates = (~own) & (gains > 0)
+        candidates &= part_sizes[parts] + sizes[vertices] <= max_part_size
+
+        order = np.argsort(-gains[candidates], kind="stable")
+        vertices = vertices[candidates][order]
+        parts = parts[candidates][order]
+
+        moved = np.zeros(n_vertices, dtype=bool)
+        n_moves = 0
+        for vertex, part in zip(vertices.tolist(), parts.tolist()):
+            if moved[vertex]:
+                continue
+
+            neighbors = adjacency.indices[
+                adjacency.indptr[vertex] : adjacency.indptr[vertex + 1]
+            ]
+            if np.any(moved[neighbors]):
+                continue
+
+            if part_sizes[part] + sizes[vertex] > max_part_size:
+                continue
+
+            part_sizes[labels[vertex]] -= sizes[vertex]
+            part_sizes[part] += sizes[vertex]
+            labels[vertex] = part
+            moved[vertex] = True
+            n_moves += 1
+
+        if n_moves == 0:
+            break
+
+    return labels
+
+
+def refine_fiduccia_mattheyses(
+    adjacency, sizes, labels, max_part_size, n_passes=10, max_uphill_moves=50
+):
+    """Reduces the weight of the cut edges of a partition with the Fiduccia-Mattheyses heuristic
+
+    In each pass, the boundary vertices are kept in buckets according to their gain, i.e.,
+    the reduction in the weight of the cut edges when moving them to the best neighboring part
+    (that can receive them without exceeding ``max_part_size``). The vertex with the
+    highest gain is moved and locked, and the gains of its neighbors are updated.
+    Moves with negative gain are allowed, to escape local minima, and the pass is
+    rolled back to the best partition seen. The boundary vertices are found once and
+    updated around the moved vertices, such that each pass is linear in the boundary
+    size and the number of edges of the moved vertices.
+
+    Parameters
+    ----------
+    adjacency : scipy.sparse.csr_matrix
+        Symmetric adjacency matrix with integer edge weights, e.g. the number of bonds
+        between two vertices
+    sizes : numpy.ndarray
+        Size of each vertex
+    labels : numpy.ndarray
+        Part of each vertex
+    max_part_size : int, float
+        Maximal size of a part
+    n_passes : int, optional
+        Maximal number of passes. Default is ``n_passes=10``.
+    max_uphill_moves : int, optional
+        A pass stops after this many moves without improvement. Default is 50.
+
+    Returns
+    -------
+    labels : numpy.ndarray
+    """
+    labels = np.array(labels).tolist()
+    sizes = np.asarray(sizes, dtype=float).tolist()
+    indptr = adjacency.indptr.tolist()
+    neighbors = adjacency.indices.tolist()
+    weights = np.rint(adjacency.data).astype(int).tolist()
+
+    n_parts = max(labels, default=-1) + 1
+    part_sizes = np.bincount(labels, weights=sizes, minlength=n_parts).tolist()
+    degrees = np.bincount(
+        np.repeat(np.arange(len(labels)), np.diff(adjacency.indptr)),
+        weights=np.abs(weights),
+        minlength=len(labels),
+    )
+    max_degree = int(np.max(degrees, initial=0))
+
+    rows = np.repeat(np.arange(len(labels)), np.diff(adjacency.indptr))
+    label_array = np.asarray(labels, dtype=int)
+    boundary = set(
+        np.unique(rows[label_array[rows] != label_array[adjacency.indices]]).tolist()
+    )
+
+    def is_boundary(v):
+        return any(labels[u] != labels[v] for u in neighbors[indptr[v] : indptr[v + 1]])
+
+    def get_move(v):
+        """Best feasible move (gain, part) of vertex v, None if there is none"""
+        connections = {}
+        for k in range(indptr[v], indptr[v + 1]):
+            part = labels[neighbors[k]]
+            connections[part] = connections.get(part, 0) + weights[k]
+
+        internal = connections.pop(labels[v], 0)
+        best = None
+        for part, n_connections in connections.items():
+            if part_sizes[part] + sizes[v] > max_part_size:
+                continue
+            if best is None or n_connections - internal > best[0]:
+                best = (n_connections - internal, part)
+
+        return best
+
+    for _ in range(n_passes):
+        buckets = [dict() for _ in range(2 * max_degree + 1)]
+        gains = {}
+        top = -1
+
+        def insert(v):
+            nonlocal top
+            move = get_move(v)
+            if move is not None:
+                gains[v] = move[0]
+                buckets[move[0] + max_degree][v] = None
+                top = max(top, move[0] + max_degree)
+
+        def remove(v):
+            if v in gains:
+                del buckets[gains.pop(v) + max_degree][v]
+
+        for v in sorted(boundary):
+            insert(v)
+
+        locked = set()
+        moves = []
+        gain_sum = 0
+        best_gain_sum = 0
+        n_best_moves = 0
+
+        while top >= 0:
+            if not buckets[top]:
+                top -= 1
+                continue
+
+            v = next(iter(buckets[top]))
+            remove(v)
+
+            move = get_move(v)
+            if move is None:
+                continue
+            if move[0] + max_degree != top:
+                insert(v)
+                continue
+
+            gain, part = move
+            part_sizes[labels[v]] -= sizes[v]
+            part_sizes[part] += sizes[v]
+            moves.append((v, labels[v]))
+            labels[v] = part
+            locked.add(v)
+
+            gain_sum += gain
+            if gain_sum > best_gain_sum:
+                best_gain_sum = gain_sum
+                n_best_moves = len(moves)
+            elif len(moves) - n_best_moves >= max_uphill_moves:
+                break
+
+            for u in neighbors[indptr[v] : indptr[v + 1]]:
+                if u not in locked:
+                    remove(u)
+                    insert(u)
+
+        for v, part in reversed(moves[n_best_moves:]):
+            part_sizes[labels[v]] -= sizes[v]
+            part_sizes[part] += sizes[v]
+            labels[v] = part
+
+        for v, _ in moves[:n_best_moves]:
+            for u in [v] + neighbors[indptr[v] : indptr[v + 1]]:
+                if is_boundary(u):
+                    boundary.add(u)
+                else:
+                    boundary.discard(u)
+
+        if best_gain_sum <= 0:
+            break
+
+    return np.array(labels, dtype=int)
+
+
+def split_disconnected_parts(adjacency, labels):
+    """Splits parts that are not connected into their connected components
+
+    The new parts are ordered by the part they came from, such that the order
+    of parts that are not split is kept.
+
+    Parameters
+    ----------
+    adjacency : scipy.sparse.csr_matrix
+        Symmetric adjacency matrix
+    labels : numpy.ndarray
+        Part of each vertex
+
+    Returns
+    -------
+    labels : numpy.ndarray
+        Part of each vertex, numbered consecutively
+    """
+    from scipy.sparse.csgraph import connected_components
+
+    labels = np.asarray(labels)
+    _, components = connected_components(_get_internal_edges(adjacency, labels))
+
+    first = np.unique(components, return_index=True)[1]
+    order = np.lexsort((first, labels[first]))
+
+    rank = np.empty(first.size, dtype=int)
+    rank[order] = np.arange(first.size)
+    return rank[components]
+
+
+def get_adjacency_matrix(n_vertices, edges, weights):
+    """Returns the symmetric weighted adjacency matrix of a graph
+
+    Parameters
+    ----------
+    n_vertices : int
+        Number of vertices
+    edges : numpy.ndarray
+        Pairs of vertex indices
+    weights : numpy.ndarray
+        Edge weights
+
+    Returns
+    -------
+    adjacency : scipy.sparse.csr_matrix
+    """
+    from scipy.sparse import coo_matrix
+
+    edges = np.reshape(np.array(edges, dtype=int), (-1, 2))
+    weights = np.asarray(weights, dtype=float)
+
+    rows = np.hstack((edges[:, 0], edges[:, 1]))
+    cols = np.hstack((edges[:, 1], edges[:, 0]))
+
+    return coo_matrix(
+        (np.hstack((weights, weights)), (rows, cols)), shape=(n_vertices, n_vertices)
+    ).tocsr()
+
+
+def count_cut_edges(edges, labels):
+    """Number of edges between vertices in different parts"""
+    edges = np.reshape(np.array(edges, dtype=int), (-1, 2))
+    return int(np.count_nonzero(labels[edges[:, 0]] != labels[edges[:, 1]]))
+
+
+def _match_heavy_edges(adjacency, sizes, max_part_size, max_rounds=20):
+    """Heavy-edge matching by handshaking: every unmatched vertex points to the neighbor
+    with the heaviest edge (that it can be merged with), and vertices that point to each
+    other are matched.
+
+    Returns
+    -------
+    coarse_map : numpy.ndarray
+        Index of the coarse vertex of each vertex
+    """
+    n_vertices = adjacency.shape[0]
+    edges = adjacency.tocoo()
+    u, v, w = edges.row, edges.col, edges.data
+
+    matched = np.full(n_vertices, -1)
+    for _ in range(max_rounds):
+        free = (matched[u] < 0) & (matched[v] < 0) & (u != v)
+        free &= sizes[u] + sizes[v] <= max_part_size
+        if not np.any(free):
+            break
+
+        order = np.lexsort((v[free], -w[free], u[free]))
+        u_free, v_free = u[free][order], v[free][order]
+        first = np.ones(u_free.size, dtype=bool)
+        first[1:] = u_free[1:] != u_free[:-1]
+
+        best = np.full(n_vertices, -1)
+        best[u_free[first]] = v_free[first]
+
+        pointing = np.flatnonzero(best >= 0)
+        mutual = pointing[best[best[pointing]] == pointing]
+        matched[mutual] = best[mutual]
+
+    vertices = np.arange(n_vertices)
+    representative = np.where(matched >= 0, np.minimum(vertices, matched), vertices)
+    _, coarse_map = np.unique(representative, return_inverse=True)
+
+    return coarse_map.ravel()
+
+
+def _get_internal_edges(adjacency, labels):
+    """Adjacency matrix without the edges between vertices in different parts"""
+    from scipy.sparse import coo_matrix
+
+    edges = adjacency.tocoo()
+    internal = labels[edges.row] == labels[edges.col]
+
+    return coo_matrix(
+        (edges.data[internal], (edges.row[internal], edges.col[internal])),
+        shape=adjacency.shape,
+    )
+
+
+def _number_by_first_appearance(labels):
+    """Renumbers labels in order of first appearance"""
+    _, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    rank = np.empty(first.size, dtype=int)
+    rank[np.argsort(first)] = np.arange(first.size)
+    return rank[inverse.ravel()]
@@ -0,0 +1,185 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""Lightweight instrumentation of the fragmentation stages.
+
+A :class:`Profiler` is passed to e.g. :class:`fragmentino.MolecularFragmenter`,
+which times its stages (reading, bond perception, contraction, capping, writing)
+and counts events (contractions, scanned edges, deep copies, allocated bytes)::
+
+    profiler = Profiler()
+    f = MolecularFragmenter(30, "molecule.xyz", profiler=profiler)
+    print(profiler.to_json())
+
+Without a profiler, :data:`null_profiler` is used, whose timers and counters
+do nothing.
+"""
+
+import functools
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class Profiler:
+    """Collects the wall time of named stages and named counters
+
+    Attributes
+    ----------
+    timings : dict
+        Accumulated wall time (s) of each stage
+    calls : dict
+        Number of times each stage was timed
+    counters : dict
+        Value of each counter
+    """
+
+    enabled = True
+
+    def __init__(self, callback=None, logger=None):
+        """Creates the profiler
+
+        Parameters
+        ----------
+        callback : callable, optional
+            Function ``callback(name, elapsed)`` called when a stage is done.
+            Default is ``None``.
+        logger : logging.Logger, optional
+            Logger to which the time of each stage is written (at debug level).
+            Default is ``None``.
+        """
+        self.callback = callback
+        self.logger = logger
+        self.reset()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__} {self.get_report()}"
+
+    def reset(self):
+        """Removes all timings and counters"""
+        self.timings = {}
+        self.calls = {}
+        self.counters = {}
+
+    @contextmanager
+    def timer(self, name):
+        """Context manager that adds the wall time of its body to stage ``name``
+
+        Parameters
+        ----------
+        name : str
+            Name of the stage
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+            if self.callback is not None:
+                self.callback(name, elapsed)
+
+            if self.logger is not None:
+                self.logger.debug("%s: %.6f s", name, elapsed)
+
+    def count(self, name, n=1):
+        """Adds ``n`` to counter ``name``
+
+        Parameters
+        ----------
+        name : str
+            Name of the counter
+        n : int, optional
+            Default is ``n=1``.
+        """
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def get_report(self):
+        """Returns the timings and counters
+
+        Returns
+        -------
+        report : dict
+            ``{"timings": {name: {"time": seconds, "calls": n}}, "counters": {name: n}}``
+        """
+        return {
+            "timings": {
+                name: {"time": self.timings[name], "calls": self.calls[name]}
+                for name in self.timings
+            },
+            "counters": {name: int(n) for name, n in self.counters.items()},
+        }
+
+    def to_json(self, file_name=None):
+        """Returns the report (see :meth:`get_report`) as JSON,
+        and writes it to a file if ``file_name`` is given
+
+        Parameters
+        ----------
+        file_name : str, optional
+            File name with full or relative path. Default is ``None``.
+
+        Returns
+        -------
+        report : str
+        """
+        report = json.dumps(self.get_report(), indent=1)
+
+        if file_name is not None:
+            with open(file_name, "w") as f:
+                f.write(report)
+
+        return report
+
+
+class NullProfiler:
+    """Profiler that does nothing, used when profiling is disabled"""
+
+    enabled = False
+
+    _null_timer = nullcontext()
+
+    def __repr__(self):
+        return self.__class__.__name__
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def timer(self, name):
+        return self._null_timer
+
+    def count(self, name, n=1):
+        pass
+
+    def get_report(self):
+        return {"timings": {}, "counters": {}}
+
+
+null_profiler = NullProfiler()
+
+
+def timed(name):
+    """Decorator that times a method with the profiler of its instance (``self.profiler``)
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.timer(name):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
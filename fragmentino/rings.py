@@ -0,0 +1,138 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+
+
+def get_biconnected_components(n_vertices, edges):
+    r"""Determines the biconnected components (blocks) of a graph with an iterative
+    version of Tarjan's algorithm in :math:`\mathcal{O}(N + E)`
+
+    Every edge belongs to exactly one block. A block with more than one edge
+    contains all the cycles through its edges, e.g. a ring or a system of fused rings,
+    while a block with a single edge is a bridge, i.e. an edge that is in no cycle.
+
+    Parameters
+    ----------
+    n_vertices : int
+        Number of vertices
+    edges : numpy.ndarray
+        Pairs of vertex indices
+
+    Returns
+    -------
+    n_components : int
+        Number of biconnected components
+    components : numpy.ndarray
+        Biconnected component of each edge
+    """
+    edges = np.reshape(np.array(edges, dtype=int), (-1, 2))
+    n_edges = edges.shape[0]
+
+    ends = np.hstack((edges[:, 0], edges[:, 1]))
+    order = np.argsort(ends, kind="stable")
+    neighbors = np.hstack((edges[:, 1], edges[:, 0]))[order].tolist()
+    edge_indices = np.tile(np.arange(n_edges), 2)[order].tolist()
+    indptr = np.hstack(
+        ([0], np.cumsum(np.bincount(ends, minlength=n_vertices)))
+    ).tolist()
+
+    discovery = [-1] * n_vertices
+    low = [0] * n_vertices
+    components = [-1] * n_edges
+    n_components = 0
+    time = 0
+
+    edge_stack = []
+    for root in range(n_vertices):
+        if discovery[root] >= 0:
+            continue
+
+        discovery[root] = low[root] = time
+        time += 1
+
+        # depth-first search stack of (vertex, edge to parent, next adjacency position)
+        stack = [(root, -1, indptr[root])]
+        while stack:
+            v, parent_edge, k = stack[-1]
+
+            if k < indptr[v + 1]:
+                stack[-1] = (v, parent_edge, k + 1)
+                u, e = neighbors[k], edge_indices[k]
+
+                if e == parent_edge:
+                    continue
+
+                if discovery[u] < 0:
+                    edge_stack.append(e)
+                    discovery[u] = low[u] = time
+                    time += 1
+                    stack.append((u, e, indptr[u]))
+                elif discovery[u] < discovery[v]:
+                    edge_stack.append(e)
+                    low[v] = min(low[v], discovery[u])
+
+                continue
+
+            stack.pop()
+            if not stack:
+                continue
+
+            parent = stack[-1][0]
+            low[parent] = min(low[parent], low[v])
+
+            if low[v] >= discovery[parent]:
+                while True:
+                    e = edge_stack.pop()
+                    components[e] = n_components
+                    if e == parent_edge:
+                        break
+
+                n_components += 1
+
+    return n_components, np.array(components, dtype=int)
+
+
+def get_ring_bonds(n_atoms, bonds, max_ring_size=None):
+    r"""Determines the bonds that are part of a ring in :math:`\mathcal{O}(N + E)`
+
+    A ring system is a biconnected component of the bond graph with more than one bond,
+    e.g. a single ring or several fused rings.
+
+    Parameters
+    ----------
+    n_atoms : int
+        Number of atoms
+    bonds : numpy.ndarray
+        Pairs of bonded atoms
+    max_ring_size : int, optional
+        Only bonds in ring systems with at most ``max_ring_size`` atoms are considered.
+        Default is ``None``, in which case all ring bonds are considered.
+
+    Returns
+    -------
+    in_ring : numpy.ndarray
+        Whether each bond is part of a ring system
+    ring_systems : numpy.ndarray
+        Biconnected component of each bond
+    """
+    bonds = np.reshape(np.array(bonds, dtype=int), (-1, 2))
+    n_components, components = get_biconnected_components(n_atoms, bonds)
+
+    n_bonds = np.bincount(components, minlength=n_components)
+
+    # atoms of each component, without duplicates
+    pairs = np.unique(
+        np.column_stack((np.repeat(components, 2), bonds.ravel())), axis=0
+    )
+    n_ring_atoms = np.bincount(pairs[:, 0], minlength=n_components)
+
+    is_ring = n_bonds > 1
+    if max_ring_size is not None:
+        is_ring &= n_ring_atoms <= max_ring_size
+
+    return is_ring[components], components
@@ -0,0 +1,72 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+import heapq
+
+
+def schedule_lpt(costs, n_workers):
+    r"""Distributes jobs over workers with the longest processing time (LPT) heuristic
+
+    The jobs are sorted by decreasing cost and each job is assigned to the worker
+    with the smallest load so far. This is :math:`\mathcal{O}(N \log N)` scaling and
+    the makespan is at most :math:`4/3` of the optimal makespan.
+
+    Parameters
+    ----------
+    costs : numpy.ndarray
+        Estimated cost of each job
+    n_workers : int
+        Number of workers
+
+    Returns
+    -------
+    workers : numpy.ndarray
+        Worker index of each job
+    loads : numpy.ndarray
+        Total cost of the jobs of each worker
+    """
+    if n_workers < 1:
+        raise ValueError("Number of workers must be positive")
+
+    costs = np.asarray(costs, dtype=float)
+    order = np.argsort(-costs, kind="stable")
+
+    workers = np.zeros(costs.size, dtype=int)
+    heap = [(0.0, worker) for worker in range(n_workers)]
+
+    for job, cost in zip(order.tolist(), costs[order].tolist()):
+        load, worker = heap[0]
+        workers[job] = worker
+        heapq.heapreplace(heap, (load + cost, worker))
+
+    loads = np.bincount(workers, weights=costs, minlength=n_workers)
+    return workers, loads
+
+
+def get_schedule_statistics(loads):
+    """Statistics of a schedule
+
+    Parameters
+    ----------
+    loads : numpy.ndarray
+        Total cost of the jobs of each worker
+
+    Returns
+    -------
+    statistics : dict
+        The predicted makespan (maximal load), the mean load and
+        the imbalance (makespan over mean load)
+    """
+    makespan = float(np.max(loads))
+    mean_load = float(np.mean(loads))
+
+    return {
+        "makespan": makespan,
+        "mean_load": mean_load,
+        "imbalance": makespan / mean_load if mean_load > 0 else 1.0,
+    }
@@ -0,0 +1,130 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""Orderings of points along space-filling curves. Points that are close along the
+curve are close in space, which improves memory locality when atoms are processed
+in this order, and keeps consecutive fragments (and jobs) spatially together.
+"""
+
+import numpy as np
+
+
+def get_space_filling_curve_order(points, curve="hilbert", n_bits=10):
+    """Returns the order of points along a space-filling curve
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        Cartesian coordinates
+    curve : str, optional
+        Either ``"hilbert"`` (default) or ``"morton"`` (Z-order)
+    n_bits : int, optional
+        Number of bits per axis of the grid the points are mapped to. Default is 10.
+
+    Returns
+    -------
+    order : numpy.ndarray
+        Permutation that sorts the points along the curve. The inverse permutation
+        is given by ``np.argsort(order)``.
+    """
+    if curve == "hilbert":
+        keys = get_hilbert_keys(points, n_bits)
+    elif curve == "morton":
+        keys = get_morton_keys(points, n_bits)
+    else:
+        raise ValueError(f"Unknown space-filling curve {curve}")
+
+    return np.argsort(keys, kind="stable")
+
+
+def get_morton_keys(points, n_bits=10):
+    """Position of points along the Morton (Z-order) curve, given by interleaving
+    the bits of their grid coordinates
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        Cartesian coordinates
+    n_bits : int, optional
+        Number of bits per axis of the grid the points are mapped to. Default is 10.
+
+    Returns
+    -------
+    keys : numpy.ndarray
+    """
+    return _interleave_bits(_get_grid_coordinates(points, n_bits), n_bits)
+
+
+def get_hilbert_keys(points, n_bits=10):
+    """Position of points along the Hilbert curve, determined with the algorithm of
+    J. Skilling, AIP Conf. Proc. 707, 381 (2004); https://doi.org/10.1063/1.1751381
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        Cartesian coordinates
+    n_bits : int, optional
+        Number of bits per axis of the grid the points are mapped to. Default is 10.
+
+    Returns
+    -------
+    keys : numpy.ndarray
+    """
+    X = _get_grid_coordinates(points, n_bits)
+    n_dims = X.shape[1]
+
+    # inverse undo of the excess work
+    Q = 1 << (n_bits - 1)
+    while Q > 1:
+        P = Q - 1
+        for i in range(n_dims):
+            is_set = (X[:, i] & Q) != 0
+            X[is_set, 0] ^= P
+
+            t = (X[~is_set, 0] ^ X[~is_set, i]) & P
+            X[~is_set, 0] ^= t
+            X[~is_set, i] ^= t
+        Q >>= 1
+
+    # Gray encoding
+    for i in range(1, n_dims):
+        X[:, i] ^= X[:, i - 1]
+
+    t = np.zeros(X.shape[0], dtype=X.dtype)
+    Q = 1 << (n_bits - 1)
+    while Q > 1:
+        t[(X[:, -1] & Q) != 0] ^= Q - 1
+        Q >>= 1
+    X ^= t[:, None]
+
+    return _interleave_bits(X, n_bits)
+
+
+def _get_grid_coordinates(points, n_bits):
+    """Maps points to integer coordinates on a cubic grid with 2**n_bits points per axis"""
+    if n_bits * np.shape(points)[1] > 63:
+        raise ValueError("Too many bits for 64 bit keys")
+
+    points = np.asarray(points, dtype=float)
+    lower = np.min(points, axis=0, initial=np.inf)
+    width = np.max(np.ptp(points, axis=0), initial=0.0) if points.size else 0.0
+
+    n_points = (1 << n_bits) - 1
+    scale = n_points / width if width > 0 else 0.0
+
+    return np.clip(np.floor((points - lower) * scale), 0, n_points).astype(np.int64)
+
+
+def _interleave_bits(X, n_bits):
+    """Interleaves the bits of the coordinates, starting with the most significant bit"""
+    n_dims = X.shape[1]
+    keys = np.zeros(X.shape[0], dtype=np.int64)
+    for bit in range(n_bits - 1, -1, -1):
+        for i in range(n_dims):
+            keys = (keys << 1) | ((X[:, i] >> bit) & 1)
+
+    return keys
@@ -0,0 +1,60 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+import pytest
+import os
+
+
+from fragmentino.checkpoint import (
+    save_npz_atomic,
+    load_npz,
+    write_checkpoint,
+    read_checkpoint,
+)
+
+
+class TestCheckpoint:
+    def test_save_and_load(self, tmp_path):
+        file_name = os.path.join(tmp_path, "arrays.npz")
+        save_npz_atomic(file_name, {"a": np.arange(5), "b": np.eye(3)})
+
+        arrays = load_npz(file_name)
+
+        assert np.array_equal(arrays["a"], np.arange(5))
+        assert np.array_equal(arrays["b"], np.eye(3))
+        assert os.listdir(tmp_path) == ["arrays.npz"]
+
+    def test_interrupted_write_keeps_previous_file(self, tmp_path):
+        file_name = os.path.join(tmp_path, "arrays.npz")
+        save_npz_atomic(file_name, {"a": np.arange(5)})
+
+        class Interrupting:
+            def __array__(self, *args, **kwargs):
+                raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            save_npz_atomic(file_name, {"a": np.zeros(3), "b": Interrupting()})
+
+        assert np.array_equal(load_npz(file_name)["a"], np.arange(5))
+        assert os.listdir(tmp_path) == ["arrays.npz"]
+
+    def test_version(self, tmp_path):
+        file_name = os.path.join(tmp_path, "checkpoint.npz")
+        write_checkpoint(file_name, {"a": np.arange(3)}, {"status": "complete"})
+
+        arrays, options = read_checkpoint(file_name)
+        assert np.array_equal(arrays["a"], np.arange(3))
+        assert options == {"status": "complete"}
+
+        save_npz_atomic(file_name, {"version": np.array(0), "options": np.array("{}")})
+        with pytest.raises(ValueError, match="Unsupported checkpoint version"):
+            read_checkpoint(file_name)
+
+        save_npz_atomic(file_name, {"a": np.arange(3)})
+        with pytest.raises(ValueError, match="not a checkpoint"):
+            read_checkpoint(file_name)
@@ -0,0 +1,143 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import json
+import numpy as np
+import pytest
+import os
+
+
+from fragmentino import MolecularFragmenter, FragmentSet, Molecule
+from fragmentino.cli import main, get_input_files
+
+file_path = os.path.dirname(__file__)
+
+
+def _read_summaries(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+class TestCLI:
+    def test_single_file(self, tmp_path, capsys):
+        file_name = os.path.join(file_path, "medium_molecule_1.xyz")
+
+        status = main([file_name, "--size", "10", "--cap", "-o", str(tmp_path)])
+        (summary,) = _read_summaries(capsys)
+
+        f = MolecularFragmenter(10, file_name)
+        assert status == 0
+        assert summary["input"] == file_name
+        assert summary["n_fragments"] == f.n_fragments
+        assert summary["n_capped_bonds"] == f.n_capped_bonds
+        assert summary["n_added_H"] == 2 * f.n_capped_bonds
+        assert set(summary["timings"]) == {"read", "fragment", "order", "cap", "write"}
+        assert summary["outputs"] == [
+            os.path.join(tmp_path, "medium_molecule_1_fragmented.xyz")
+        ]
+        assert os.path.isfile(summary["outputs"][0])
+
+    def test_separate_layout(self, tmp_path, capsys):
+        file_name = os.path.join(file_path, "medium_molecule_1.xyz")
+
+        main(
+            [file_name, "-s", "10", "--layout", "separate", "--order", "hilbert"]
+            + ["-o", str(tmp_path)]
+        )
+        (summary,) = _read_summaries(capsys)
+
+        assert len(summary["outputs"]) == summary["n_fragments"]
+        assert all(os.path.isfile(output) for output in summary["outputs"])
+
+    def test_npz_layout(self, tmp_path, capsys):
+        file_name = os.path.join(file_path, "medium_molecule_1.xyz")
+
+        main([file_name, "-s", "10", "--cap", "--layout", "npz", "-o", str(tmp_path)])
+        (summary,) = _read_summaries(capsys)
+        fragments = FragmentSet.load(summary["outputs"][0])
+
+        assert fragments.n_fragments == summary["n_fragments"]
+        assert fragments.n_added_H == summary["n_added_H"]
+
+    def test_bond_factor(self, tmp_path, capsys):
+        file_name = os.path.join(file_path, "..", "..", "docs", "dna_strand.xyz")
+
+        main(
+            [file_name, "-s", "10", "--cap", "--bond-factor", "1.0"]
+            + ["--layout", "npz", "-o", str(tmp_path)]
+        )
+        (summary,) = _read_summaries(capsys)
+        fragments = FragmentSet.load(summary["outputs"][0])
+
+        m = Molecule.from_xyz_file(file_name, bond_factor=1.0)
+        f = MolecularFragmenter.from_molecule(10, m)
+
+        assert fragments.bond_factor == 1.0
+        assert all(fragment.bond_factor == 1.0 for fragment in f)
+        assert summary["n_added_H"] == fragments.cap_xyz.shape[0]
+        assert summary["n_added_H"] == 2 * f.n_cut_bonds
+
+    def test_atom_order(self, tmp_path, capsys):
+        file_name = os.path.join(file_path, "solvated_molecule_1.xyz")
+
+        main([file_name, "-s", "10", "--atom-order", "morton", "-o", str(tmp_path)])
+        (summary,) = _read_summaries(capsys)
+
+        f = MolecularFragmenter(10, file_name)
+        assert summary["n_fragments"] == f.n_fragments
+        assert summary["n_capped_bonds"] == f.n_capped_bonds
+
+    def test_parallel_workers(self, tmp_path, capsys):
+        status = main([file_path, "-s", "10", "-j", "2", "-o", str(tmp_path)])
+        summaries = _read_summaries(capsys)
+
+        assert status == 0
+        assert sorted(summary["input"] for summary in summaries) == get_input_files(
+            [file_path]
+        )
+
+    def test_error(self, tmp_path, capsys):
+        file_name = os.path.join(file_path, "small_molecule_1.xyz")
+        missing = os.path.join(tmp_path, "missing.xyz")
+
+        status = main([file_name, missing, "-s", "10", "-o", str(tmp_path)])
+        summaries = _read_summaries(capsys)
+
+        assert status == 1
+        assert "error" not in summaries[0]
+        assert summaries[1]["input"] == missing
+        assert "error" in summaries[1]
+
+    def test_cell(self, tmp_path, capsys):
+        file_name = os.path.join(file_path, "medium_molecule_1.xyz")
+        options = [file_name, "-s", "10", "-o", str(tmp_path)]
+
+        lengths = ["40", "40", "40"]
+        vectors = ["40", "0", "0", "0", "40", "0", "0", "0", "40"]
+
+        assert main(options + ["--cell"] + lengths) == 0
+        assert main(options + ["--cell"] + vectors) == 0
+        summaries = _read_summaries(capsys)
+
+        assert all("error" not in summary for summary in summaries)
+        assert summaries[0]["n_fragments"] == summaries[1]["n_fragments"]
+
+        with pytest.raises(SystemExit):
+            main(options + ["--cell", "40", "40"])
+
+    def test_no_inputs(self, tmp_path):
+        with pytest.raises(SystemExit):
+            main([os.path.join(tmp_path, "*.xyz"), "-s", "10"])
+
+    def test_input_files(self):
+        pattern = os.path.join(file_path, "small_*.xyz")
+        single = os.path.join(file_path, "small_molecule_1.xyz")
+
+        file_names = get_input_files([single, pattern, file_path])
+
+        assert file_names[0] == single
+        assert len(file_names) == len(set(file_names))
+        assert len(file_names) == len(get_input_files([file_path]))
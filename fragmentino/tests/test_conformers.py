@@ -0,0 +1,125 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+import pytest
+import os
+from copy import deepcopy
+
+
+from fragmentino import Molecule
+from fragmentino import FileHandlerXYZ
+from fragmentino.conformers import ConformerEnsemble
+from fragmentino.periodic_table import Z_to_symbol
+
+
+def get_conformers(n_conformers):
+    file_path = os.path.dirname(__file__)
+    file_name = os.path.join(file_path, "medium_molecule_1.xyz")
+    m = Molecule.from_xyz_file(file_name)
+
+    rng = np.random.default_rng(7)
+    xyz = m.xyz[None, :, :] + rng.normal(scale=0.02, size=(n_conformers, m.size, 3))
+    return m, xyz
+
+
+class TestConformerEnsemble:
+    def test_consensus_fragmentation(self):
+        m, xyz = get_conformers(20)
+        e = ConformerEnsemble(m.Z, xyz, 10)
+
+        assert e.n_conformers == 20
+        assert e.bonds.shape == (32, 2)
+        assert e.bond_lengths.shape == (20, 32)
+        assert e.deviating_conformers.size == 0
+        assert np.all(np.bincount(e.fragment_labels) <= 10)
+        assert repr(e) == "ConformerEnsemble Conformers: 20 Fragments: 4"
+
+    def test_deviating_conformers(self):
+        m, xyz = get_conformers(20)
+        xyz[3, 0, :] += 5.0
+
+        e = ConformerEnsemble(m.Z, xyz, 10)
+
+        assert np.allclose(e.deviating_conformers, [3])
+        assert e.bonds.shape == (32, 2)
+
+        missing, extra = e.get_connectivity_differences(3)
+        assert missing.shape == (3, 2)
+        assert np.all(np.any(missing == 0, axis=1))
+        assert extra.shape == (0, 2)
+
+        missing, extra = e.get_connectivity_differences(0)
+        assert missing.shape == (0, 2)
+        assert extra.shape == (0, 2)
+
+    def test_bonds_of_each_conformer(self):
+        m, xyz = get_conformers(6)
+        xyz[2, 0, :] = xyz[2, 20, :] + [0.0, 0.0, 1.0]
+
+        e = ConformerEnsemble(m.Z, xyz, 10, block_size=50)
+
+        for conformer in range(6):
+            missing, extra = e.get_connectivity_differences(conformer)
+            bonds = {tuple(bond) for bond in e.bonds.tolist()}
+            bonds -= {tuple(bond) for bond in missing.tolist()}
+            bonds |= {tuple(bond) for bond in extra.tolist()}
+
+            reference = Molecule(m.Z, xyz[conformer]).get_bonds()
+            assert bonds == {(int(a1), int(a2)) for a1, a2, _ in reference}
+
+        assert np.allclose(e.deviating_conformers, [2])
+
+    def test_capped_geometries(self):
+        m, xyz = get_conformers(5)
+        e = ConformerEnsemble(m.Z, xyz, 10, block_size=100)
+
+        Z, capped_xyz, indices, offsets = e.get_capped_geometries()
+
+        assert capped_xyz.shape == (5, Z.size, 3)
+        assert offsets[0] == 0 and offsets[-1] == Z.size
+        assert np.all(Z[indices == -1] == 1)
+        assert np.array_equal(np.sort(indices[indices >= 0]), np.arange(m.size))
+
+        # each conformer is capped as by the fragmenter
+        for conformer in [0, 4]:
+            f = deepcopy(e.fragmenter)
+            for fragment in f:
+                fragment.xyz = xyz[conformer, fragment.indices]
+            f.add_H_to_capped_bonds()
+
+            for i, fragment in enumerate(f):
+                fragment_xyz = capped_xyz[conformer, offsets[i] : offsets[i + 1]]
+                assert np.allclose(
+                    np.sort(fragment_xyz, axis=0),
+                    np.sort(fragment.xyz, axis=0),
+                    atol=1e-6,
+                )
+
+    def test_from_xyz_files(self, tmp_path):
+        m, xyz = get_conformers(3)
+        symbols = [Z_to_symbol(Z) for Z in m.Z]
+
+        file_names = []
+        for i, conformer in enumerate(xyz):
+            file_names.append(str(tmp_path / f"conformer_{i}.xyz"))
+            FileHandlerXYZ(file_names[-1]).write(symbols, conformer)
+
+        e = ConformerEnsemble.from_xyz_files(file_names, 10)
+        assert e.n_conformers == 3
+        assert np.allclose(e.Z, m.Z)
+
+        FileHandlerXYZ(file_names[-1]).write(["H"] * m.size, xyz[0])
+        with pytest.raises(ValueError, match="Conformers must have the same atoms"):
+            ConformerEnsemble.from_xyz_files(file_names, 10)
+
+    def test_illegal_shape(self):
+        with pytest.raises(
+            ValueError,
+            match=r"Coordinates must have shape \(n_conformers, n_atoms, 3\)",
+        ):
+            ConformerEnsemble([1, 1], np.zeros((2, 3)), 10)
@@ -0,0 +1,28 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+import pytest
+import os
+
+
+from fragmentino.cost_models import ElectronCost, atom_count_cost
+
+
+class TestCostModels:
+    def test_atom_count_cost(self):
+        assert atom_count_cost(np.array([1, 1, 8])) == 3
+
+    def test_electron_cost(self):
+        cost_model = ElectronCost()
+        assert np.allclose(cost_model(np.array([1, 1, 8])), 10)
+
+        cost_model = ElectronCost(exponent=2)
+        assert np.allclose(cost_model(np.array([1, 1, 8])), 100)
+
+    def test_print(self):
+        assert repr(ElectronCost(3)) == "ElectronCost(exponent=3)"
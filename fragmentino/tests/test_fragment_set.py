@@ -0,0 +1,110 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+import pickle
+import pytest
+import os
+
+
+from fragmentino import MolecularFragmenter, FragmentSet
+
+file_path = os.path.dirname(__file__)
+
+
+class TestFragmentSet:
+    def test_from_fragmenter(self):
+        f = MolecularFragmenter(10, os.path.join(file_path, "medium_molecule_1.xyz"))
+        f.add_H_to_capped_bonds()
+        fragments = f.get_fragment_set()
+
+        assert len(fragments) == f.n_fragments
+        assert fragments.n_capped_bonds == f.n_capped_bonds
+        assert fragments.n_added_H == f.n_added_H
+        assert fragments.cut_bonds.shape[0] == f.n_cut_bonds
+        assert np.array_equal(fragments.labels, f.fragment_labels)
+        assert np.array_equal(fragments.fragment_sizes, f.fragment_sizes)
+
+        for fragment, reference in zip(fragments, f):
+            assert np.array_equal(fragment.indices, reference.indices)
+            assert np.array_equal(fragment.Z, reference.Z)
+            assert np.allclose(fragment.xyz, reference.xyz)
+
+    def test_from_reordered_fragmenter(self):
+        f = MolecularFragmenter(5, os.path.join(file_path, "solvated_molecule_1.xyz"))
+        f.add_H_to_capped_bonds()
+        f.order_fragments_by_centrality()
+        f.swap_fragments(0, f.n_fragments - 1)
+        fragments = f.get_fragment_set()
+
+        assert fragments.n_added_H == f.n_added_H
+        assert np.array_equal(fragments.fragment_sizes, f.fragment_sizes)
+
+        for i, (fragment, reference) in enumerate(zip(fragments, f)):
+            assert np.array_equal(fragment.indices, reference.indices)
+            assert np.allclose(fragment.xyz, reference.xyz)
+
+            # each cap is bonded to its capped atom
+            caps = fragments.cap_xyz[
+                fragments.cap_offsets[i] : fragments.cap_offsets[i + 1]
+            ]
+            capped_atoms = fragments.cap_atoms[
+                fragments.cap_offsets[i] : fragments.cap_offsets[i + 1]
+            ]
+            assert np.all(np.isin(capped_atoms, fragments.get_fragment_atoms(i)))
+            distances = np.linalg.norm(caps - fragments.xyz[capped_atoms], axis=1)
+            assert np.all(distances < 1.5)
+
+    def test_save_and_load(self, tmp_path):
+        f = MolecularFragmenter(10, os.path.join(file_path, "medium_molecule_1.xyz"))
+        f.add_H_to_capped_bonds()
+        fragments = f.get_fragment_set()
+
+        file_name = os.path.join(tmp_path, "fragments.npz")
+        fragments.save(file_name)
+        loaded = FragmentSet.load(file_name)
+
+        assert loaded.cell is None
+        assert np.array_equal(loaded.cap_offsets, fragments.cap_offsets)
+        assert np.allclose(loaded[-1].xyz, fragments[-1].xyz)
+        with np.load(file_name, allow_pickle=False) as data:
+            assert all(data[name].dtype != object for name in data.files)
+
+    def test_periodic(self):
+        m = MolecularFragmenter(
+            3, os.path.join(file_path, "small_molecule_1.xyz"), cell=[4.0, 4.0, 4.0]
+        )
+        fragments = m.get_fragment_set()
+
+        assert np.allclose(fragments.cell, m.m.cell)
+        for fragment, reference in zip(fragments, m):
+            assert np.allclose(fragment.xyz, reference.xyz)
+
+    def test_from_labels(self):
+        fragments = FragmentSet(
+            [8, 1, 1, 8, 1, 1],
+            np.arange(18.0).reshape(6, 3),
+            [0, 1, 0, 1, 0, 1],
+            cut_bonds=[[0, 1], [2, 3], [1, 2]],
+        )
+
+        assert np.array_equal(fragments.get_fragment_atoms(1), [1, 3, 5])
+        assert np.array_equal(fragments.capped_bonds, [[0, 1]])
+        assert np.array_equal(fragments.fragment_sizes, [3, 3])
+        assert fragments.n_added_H == 0
+
+        with pytest.raises(IndexError):
+            fragments[2]
+
+    def test_pickle(self):
+        f = MolecularFragmenter(10, os.path.join(file_path, "medium_molecule_1.xyz"))
+        f.add_H_to_capped_bonds()
+        fragments = f.get_fragment_set()
+
+        restored = pickle.loads(pickle.dumps(fragments))
+
+        assert np.array_equal(restored.fragment_atoms, fragments.fragment_atoms)
@@ -0,0 +1,107 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import copy
+import numpy as np
+import pickle
+import pytest
+import os
+
+
+from fragmentino import MolecularFragmenter, Molecule
+from fragmentino.fragment_view import FragmentView, pack_fragments
+
+file_path = os.path.dirname(__file__)
+
+
+class TestFragmentView:
+    def test_fragments_are_views(self):
+        f = MolecularFragmenter(10, os.path.join(file_path, "medium_molecule_1.xyz"))
+
+        assert all(isinstance(fragment, FragmentView) for fragment in f)
+        assert all(fragment.parent is f[0].parent for fragment in f)
+        assert np.shares_memory(f[1].xyz, f[0].parent.xyz)
+        assert sum(fragment.size for fragment in f) == f.m.size
+
+    def test_read_methods(self, tmp_path):
+        f = MolecularFragmenter(10, os.path.join(file_path, "medium_molecule_1.xyz"))
+        f.add_H_to_capped_bonds()
+
+        for fragment in f:
+            assert fragment.is_view
+            m = fragment.to_molecule()
+
+            assert np.allclose(fragment.center_of_mass, m.center_of_mass)
+            assert np.allclose(fragment.get_bonds(), m.get_bonds())
+            assert fragment.symbols == m.symbols
+
+        file_name = os.path.join(tmp_path, "fragment.xyz")
+        f[0].write_xyz(file_name)
+        assert np.allclose(Molecule.from_xyz_file(file_name).xyz, f[0].xyz)
+
+    def test_caps_in_side_buffer(self):
+        f = MolecularFragmenter(10, os.path.join(file_path, "medium_molecule_1.xyz"))
+        f.add_H_to_capped_bonds()
+
+        caps = [fragment.caps for fragment in f if fragment.caps is not None]
+        assert all(buffer is caps[0] for buffer in caps)
+        assert caps[0].size == f.n_added_H
+        assert f[0].parent.size == f.m.size
+
+        for fragment in f:
+            assert np.all(fragment.indices[fragment.n_atoms :] == -1)
+            assert np.all(fragment.Z[fragment.n_atoms :] == 1)
+
+    def test_copy_on_write(self):
+        parent = Molecule([8, 1, 1, 8, 1, 1], np.arange(18.0).reshape(6, 3))
+        xyz = parent.xyz.copy()
+        views = pack_fragments([parent[:3], parent[3:]])
+
+        views[0].add_atom(1, [0.0, 0.0, 0.0])
+        views[1].merge(views[0])
+
+        assert not views[0].is_view
+        assert views[0].size == 4
+        assert views[1].size == 7
+        assert np.allclose(views[0].parent.xyz, xyz)
+        assert np.array_equal(views[1].indices, [3, 4, 5, 0, 1, 2, -1])
+
+    def test_in_place_changes(self):
+        f = MolecularFragmenter(10, os.path.join(file_path, "medium_molecule_1.xyz"))
+        f.add_H_to_capped_bonds()
+        fragments = [fragment.to_molecule() for fragment in f]
+        fragments.append(f.m[np.arange(3)])
+        views = pack_fragments(fragments)
+
+        shift = np.array([1.0, 2.0, 3.0])
+        for view in views:
+            view.xyz += shift
+            view.xyz[0] = 0.0
+
+        for view, fragment in zip(views, fragments):
+            assert np.allclose(view.xyz[1:], fragment.xyz[1:] + shift)
+            assert np.allclose(view.xyz[0], 0.0)
+            assert np.array_equal(view.indices, fragment.indices)
+
+    def test_index_arrays(self):
+        parent = Molecule([8, 1, 1, 8, 1, 1], np.arange(18.0).reshape(6, 3))
+        view = FragmentView(parent, np.array([4, 0]))
+
+        assert view.size == 2
+        assert np.array_equal(view.indices, [4, 0])
+        assert np.allclose(view.xyz, parent.xyz[[4, 0]])
+
+    def test_copies_are_molecules(self):
+        f = MolecularFragmenter(10, os.path.join(file_path, "medium_molecule_1.xyz"))
+
+        assert repr(f[1]) == f"FragmentView {f[1].size}"
+
+        for m in (copy.deepcopy(f[1]), pickle.loads(pickle.dumps(f[1]))):
+            assert type(m) is Molecule
+            assert repr(m) == f"Molecule {f[1].size}"
+            assert not np.shares_memory(m.xyz, f[1].xyz)
+            assert np.array_equal(m.indices, f[1].indices)
@@ -10,6 +10,9 @@ import os
 
 
 from fragmentino import SimpleWeightedGraph
+from fragmentino import ContractableWeightedGraph
+from fragmentino import Molecule
+from fragmentino.profiling import Profiler
 
 
 class TestGraph:
@@ -85,3 +88,107 @@ class TestGraph:
         g.add_edge(3, 1, 0.3)
 
         assert g.size == 4
+
+    def test_merge_vertices_by_label(self):
+        g = ContractableWeightedGraph(2)
+        g.add_vertices([Molecule(Z, np.zeros(3)) for Z in [1, 2, 3, 4]])
+
+        g.add_edge(0, 1, 0.2)
+        g.add_edge(2, 0, 0.5)
+        g.add_edge(3, 2, 0.1)
+        g.add_edge(3, 1, 0.3)
+
+        g.merge_vertices_by_label([5, 3, 5, 4])
+
+        assert g.n_vertices == 3
+        assert np.allclose(g.vertices[0].Z, [1, 3])
+        assert np.allclose(g.vertices[1].Z, [2])
+        assert np.allclose(g.vertices[2].Z, [4])
+
+        edges = [[0, 2], [0, 1], [1, 2]]
+        assert np.allclose(edges, g.edges)
+        weights = [0.1, 0.2, 0.3]
+        assert np.allclose(weights, g.weights)
+
+    def test_permute_vertices(self):
+        g = ContractableWeightedGraph(2)
+        g.add_vertices([Molecule(Z, np.zeros(3)) for Z in [1, 2, 3, 4]])
+
+        g.add_edge(0, 1, 0.2)
+        g.add_edge(2, 3, 0.1)
+
+        g.permute_vertices([3, 1, 0, 2])
+
+        assert [vertex.Z[0] for vertex in g.vertices] == [4, 2, 1, 3]
+
+        edges = [[1, 2], [0, 3]]
+        assert np.allclose(edges, g.edges)
+        weights = [0.2, 0.1]
+        assert np.allclose(weights, g.weights)
+
+
+def _get_chain_graph(n_vertices, max_vertex_size, merged_size=None, profiler=None):
+    g = ContractableWeightedGraph(max_vertex_size, merged_size, profiler)
+    g.add_vertices([Molecule([1], [0.0, 0.0, float(i)]) for i in range(n_vertices)])
+    for i in range(n_vertices - 1):
+        g.add_edge(i, i + 1, 1.0 + 0.01 * i)
+    return g
+
+
+class TestContraction:
+    def test_complete(self):
+        g = _get_chain_graph(6, 2)
+
+        assert g.contract_by_smallest_weight() == "complete"
+        assert g.n_vertices == 3
+
+    def test_progress(self):
+        states = []
+        g = _get_chain_graph(6, 3)
+
+        g.contract_by_smallest_weight(progress=states.append, progress_interval=0)
+
+        assert [state.n_merges for state in states] == [0, 1, 2, 3, 4]
+        assert states[-1].n_edges == g.n_edges
+        assert [state.largest_vertex for state in states] == [1, 2, 3, 3, 3]
+        assert all(state.elapsed >= 0 for state in states)
+
+    def test_cancel(self):
+        class Cancel:
+            def __init__(self, n_calls):
+                self.n_calls = n_calls
+
+            def is_set(self):
+                self.n_calls -= 1
+                return self.n_calls < 0
+
+        g = _get_chain_graph(6, 6)
+
+        assert g.contract_by_smallest_weight(cancel=Cancel(2)) == "cancelled"
+        assert g.n_vertices == 4
+        assert max(vertex.size for vertex in g.vertices) <= 6
+
+    def test_time_budget(self):
+        g = _get_chain_graph(6, 6)
+
+        assert g.contract_by_smallest_weight(time_budget=0.0) == "timeout"
+        assert g.n_vertices == 6
+        assert g.n_edges == 5
+
+    def test_merged_size_is_cached(self):
+        pairs = []
+
+        def merged_size(v1, v2):
+            pairs.append((tuple(v1.xyz[:, 2]), tuple(v2.xyz[:, 2])))
+            return v1.size + v2.size
+
+        profiler = Profiler()
+        g = _get_chain_graph(8, 2, merged_size, profiler)
+        g.contract_by_smallest_weight()
+
+        reference = _get_chain_graph(8, 2)
+        reference.contract_by_smallest_weight()
+
+        assert len(pairs) == len(set(pairs))
+        assert len(pairs) < profiler.counters["edges_scanned"]
+        assert [v.size for v in g.vertices] == [v.size for v in reference.vertices]
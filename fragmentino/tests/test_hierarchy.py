@@ -0,0 +1,90 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+import pytest
+import os
+
+
+from fragmentino import MolecularFragmenter
+from fragmentino.hierarchy import FragmentHierarchy
+from fragmentino.rings import get_ring_bonds
+
+
+class TestHierarchy:
+    def test_hierarchy(self):
+        file_path = os.path.dirname(__file__)
+        f = MolecularFragmenter(5, os.path.join(file_path, "medium_molecule_1.xyz"))
+
+        h = f.get_hierarchy([5, 10, 40])
+
+        assert repr(h) == "FragmentHierarchy Levels: 3"
+        assert h.n_fragments(0) == f.n_fragments
+        assert h.n_fragments(2) == 1
+        assert np.allclose(np.sort(h.get_fragment_sizes(0)), np.sort(f.fragment_sizes))
+
+        for level, max_size in enumerate(h.max_sizes):
+            assert np.all(h.get_fragment_sizes(level) <= max_size)
+
+        assert len(h.capped_bonds[0]) == f.n_capped_bonds
+        assert len(h.capped_bonds[2]) == 0
+
+    def test_parents(self):
+        file_path = os.path.dirname(__file__)
+        f = MolecularFragmenter(10, os.path.join(file_path, "medium_molecule_1.xyz"))
+
+        h = f.get_hierarchy([10, 20])
+
+        assert np.allclose(h.get_labels(1), h.parents[1][h.get_labels(0)])
+        assert np.allclose(h.get_fragment_sizes(1), [4, 9, 20])
+
+        for child in h.get_children(1, 0):
+            assert h.parents[1][child] == 0
+
+    def test_from_bonds(self):
+        bonds = [[0, 1], [1, 2], [2, 3]]
+        h = FragmentHierarchy.from_bonds(4, bonds, [1.0, 2.0, 1.0], [2, 4])
+
+        assert np.allclose(h.get_labels(0), [0, 0, 1, 1])
+        assert np.allclose(h.capped_bonds[0], [[0, 1]])
+        assert np.allclose(h.get_labels(1), [0, 0, 0, 0])
+
+    def test_illegal_sizes(self):
+        with pytest.raises(
+            ValueError, match="Maximal fragment sizes must be increasing"
+        ):
+            FragmentHierarchy.from_bonds(2, [[0, 1]], [1.0], [4, 2])
+
+    def test_first_level(self):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "small_molecule_4.xyz")
+
+        for engine in ["greedy", "multilevel"]:
+            f = MolecularFragmenter(12, file_name, max_ring_size=10, engine=engine)
+            in_ring, _ = get_ring_bonds(f.m.size, f._bonds)
+            ring_bonds = f._bonds[in_ring]
+
+            h = f.get_hierarchy([12, 16])
+
+            assert np.allclose(h.get_labels(0), f.fragment_labels)
+            assert len(h.capped_bonds[0]) == f.n_capped_bonds
+
+            # a first level of another size keeps the rings whole, too
+            h = f.get_hierarchy([10, 16])
+
+            labels = h.get_labels(0)
+            assert np.all(labels[ring_bonds[:, 0]] == labels[ring_bonds[:, 1]])
+            assert np.all(h.get_fragment_sizes(0) <= 10)
+            assert np.sum(h.get_fragment_sizes(0)) == 16
+
+    def test_from_labels(self):
+        bonds = [[0, 1], [1, 2], [2, 3]]
+        h = FragmentHierarchy.from_labels([0, 1, 1, 2], bonds, [1.0, 2.0, 1.0], [2, 4])
+
+        assert np.allclose(h.get_labels(0), [0, 1, 1, 2])
+        assert np.allclose(h.capped_bonds[0], [[0, 1], [1, 2]])
+        assert np.allclose(h.get_fragment_sizes(1), [4])
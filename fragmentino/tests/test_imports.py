@@ -0,0 +1,50 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import subprocess
+import sys
+import pytest
+
+
+import fragmentino
+
+
+def _get_imported_modules(code):
+    """Top-level modules imported by running the code in a fresh interpreter"""
+    code += (
+        "\nimport sys\nprint(' '.join(sorted({m.split('.')[0] for m in sys.modules})))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return result.stdout.split()
+
+
+class TestImports:
+    def test_import_is_lazy(self):
+        modules = _get_imported_modules("import fragmentino")
+
+        assert "fragmentino" in modules
+        assert "plotly" not in modules
+        assert "scipy" not in modules
+        assert "multiprocessing" not in modules
+
+    def test_lazy_names(self):
+        modules = _get_imported_modules("from fragmentino import MoleculePlotter")
+
+        assert "plotly" in modules
+
+    def test_public_names(self):
+        from fragmentino.visualization_tools import MoleculeFigure, MoleculePlotter
+
+        assert fragmentino.MoleculeFigure is MoleculeFigure
+        assert fragmentino.MoleculePlotter is MoleculePlotter
+        assert "MoleculePlotter" in dir(fragmentino)
+
+    def test_unknown_name(self):
+        with pytest.raises(AttributeError):
+            fragmentino.NotAName
@@ -44,3 +44,20 @@ class TestIO:
 
         assert np.allclose(xyz, xyz_reference)
         assert all(symbols == symbols_reference)
+
+    def test_io_write_frames(self, tmp_path):
+        fh = io.FileHandlerXYZ(os.path.join(tmp_path, "frames.xyz"))
+        fh.write_frames(
+            [
+                (["H", "H"], np.zeros((2, 3)), "first"),
+                (["O"], np.ones((1, 3)), "second"),
+            ]
+        )
+
+        with open(os.path.join(tmp_path, "frames.xyz")) as f:
+            lines = f.read().splitlines()
+
+        assert len(lines) == 7
+        assert lines[0] == "2"
+        assert lines[4] == "1"
+        assert lines[5] == "second"
@@ -6,13 +6,18 @@
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
 import numpy as np
+import threading
 import pytest
 import os
+import json
 
 
 from fragmentino import MolecularFragmenter
 from fragmentino import Molecule
 from fragmentino import MoleculeFigure
+from fragmentino.cost_models import ElectronCost
+from fragmentino.rings import get_ring_bonds
+from fragmentino.space_filling_curves import get_hilbert_keys
 
 
 class TestFragmenter:
@@ -164,6 +169,186 @@ class TestFragmenter:
 
         f.plot_fragments("CPK")
 
+    def test_plot_single_traces(self, monkeypatch):
+        figures = []
+
+        def mockreturn(v):
+            figures.append(v.get_figure())
+
+        monkeypatch.setattr(MoleculeFigure, "show", mockreturn)
+
+        file_path = os.path.dirname(__file__)
+        f = MolecularFragmenter(10, os.path.join(file_path, "medium_molecule_1.xyz"))
+        f.add_H_to_capped_bonds()
+        f.plot_fragments()
+
+        bond_plot, atom_plot = figures[0].data
+        assert len(atom_plot.x) == np.sum(f.fragment_sizes)
+
+        labels = f.fragment_labels[f._bonds]
+        n_internal = np.count_nonzero(labels[:, 0] == labels[:, 1])
+        assert len(bond_plot.x) == 3 * (n_internal + 2 * f.n_capped_bonds)
+
+    def test_plot_level_of_detail(self, monkeypatch):
+        figures = []
+
+        def mockreturn(v):
+            figures.append(v.get_figure())
+
+        monkeypatch.setattr(MoleculeFigure, "show", mockreturn)
+
+        file_path = os.path.dirname(__file__)
+        f = MolecularFragmenter(10, os.path.join(file_path, "medium_molecule_1.xyz"))
+        f.plot_fragments(max_points=50)
+        f.plot_fragments(detail=[0])
+
+        assert len(figures[0].data) == 4
+        assert sum(len(plot.x) for plot in figures[0].data) <= 50
+        assert len(figures[1].data[1].x) == f.fragment_sizes[0]
+
+    def test_time_budget(self):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "medium_molecule_1.xyz")
+
+        f = MolecularFragmenter(10, file_name, time_budget=0.0)
+        g = MolecularFragmenter(10, file_name, time_budget=60.0)
+
+        assert f.contraction_status == "timeout"
+        assert f.n_fragments == f.m.size
+        assert g.contraction_status == "complete"
+        assert np.array_equal(
+            g.fragment_labels, MolecularFragmenter(10, file_name).fragment_labels
+        )
+
+    def test_cancel(self):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "medium_molecule_1.xyz")
+        cancel = threading.Event()
+        states = []
+
+        class Monitor:
+            """Sets the cancel event after 5 merges"""
+
+            n_checks = 0
+
+            def is_set(self):
+                self.n_checks += 1
+                if self.n_checks > 5:
+                    cancel.set()
+                return cancel.is_set()
+
+        f = MolecularFragmenter(10, file_name, progress=states.append, cancel=Monitor())
+
+        assert f.contraction_status == "cancelled"
+        assert f.n_fragments == f.m.size - 5
+        assert np.max(f.fragment_sizes) <= 10
+        assert states[-1].n_merges == 5
+
+    def test_resume_after_cancel(self, tmp_path):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "medium_molecule_1.xyz")
+        checkpoint = os.path.join(tmp_path, "checkpoint.npz")
+
+        class Monitor:
+            """Cancels once the first checkpoint is written"""
+
+            def is_set(self):
+                return os.path.exists(checkpoint)
+
+        f = MolecularFragmenter(
+            10,
+            file_name,
+            cancel=Monitor(),
+            checkpoint_file=checkpoint,
+            checkpoint_interval=0.0,
+        )
+        g = MolecularFragmenter.resume(checkpoint)
+        h = MolecularFragmenter(10, file_name)
+
+        assert f.contraction_status == "cancelled"
+        assert g.contraction_status == "complete"
+        assert np.array_equal(g.fragment_labels, h.fragment_labels)
+        assert np.allclose(g.g.edges, h.g.edges)
+        assert np.allclose(g.g.weights, h.g.weights)
+
+    def test_resume_after_timeout(self, tmp_path):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "solvated_molecule_1.xyz")
+        checkpoint = os.path.join(tmp_path, "checkpoint.npz")
+        cost_model = ElectronCost()
+
+        f = MolecularFragmenter(
+            100,
+            file_name,
+            cost_model=cost_model,
+            time_budget=0.0,
+            checkpoint_file=checkpoint,
+        )
+        assert f.contraction_status == "timeout"
+
+        with pytest.raises(ValueError):
+            MolecularFragmenter.resume(checkpoint)
+
+        g = MolecularFragmenter.resume(checkpoint, cost_model=cost_model)
+        h = MolecularFragmenter(100, file_name, cost_model=cost_model)
+
+        assert g.contraction_status == "complete"
+        assert np.array_equal(g.fragment_labels, h.fragment_labels)
+
+    def test_save_checkpoint(self, tmp_path):
+        file_path = os.path.dirname(__file__)
+        f = MolecularFragmenter(10, os.path.join(file_path, "medium_molecule_1.xyz"))
+        f.order_fragments_by_centrality()
+        f.add_H_to_capped_bonds()
+
+        checkpoint = os.path.join(tmp_path, "checkpoint.npz")
+        f.save_checkpoint(checkpoint)
+        g = MolecularFragmenter.resume(checkpoint)
+
+        assert g.n_fragments == f.n_fragments
+        assert g.n_added_H == f.n_added_H
+        for fragment_f, fragment_g in zip(f, g):
+            assert np.array_equal(fragment_f.indices, fragment_g.indices)
+            assert np.allclose(fragment_f.xyz, fragment_g.xyz)
+
+    def test_plot_to_html(self, tmp_path):
+        file_path = os.path.dirname(__file__)
+        f = MolecularFragmenter(10, os.path.join(file_path, "medium_molecule_1.xyz"))
+
+        file_name = os.path.join(tmp_path, "fragments.html")
+        f.plot_fragments(file_name=file_name)
+
+        assert os.path.getsize(file_name) > 0
+
+    def test_plot_after_reordering(self, tmp_path):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(tmp_path, "fragments.html")
+
+        def assert_caps_match(f):
+            assert len(f.added_H) == f.n_added_H
+            for v, capped_atom, hydrogen in f.added_H:
+                assert f[v].indices[capped_atom] >= 0
+                assert f[v].indices[hydrogen] == -1
+                distance = f[v].xyz[hydrogen] - f[v].xyz[capped_atom]
+                assert np.linalg.norm(distance) < 1.5
+
+        f = MolecularFragmenter(5, os.path.join(file_path, "solvated_molecule_1.xyz"))
+        f.add_H_to_capped_bonds()
+
+        f.order_fragments_by_centrality()
+        assert_caps_match(f)
+        f.plot_fragments(file_name=file_name)
+
+        f.swap_fragments(0, 3)
+        assert_caps_match(f)
+        f.order_fragments_by_space_filling_curve()
+        assert_caps_match(f)
+        f.cluster_closed_fragments()
+        assert_caps_match(f)
+        f.plot_fragments(file_name=file_name)
+
+        assert os.path.getsize(file_name) > 0
+
     def test_print(self):
 
         file_path = os.path.dirname(__file__)
@@ -176,7 +361,7 @@ class TestFragmenter:
         file_path = os.path.dirname(__file__)
         f = MolecularFragmenter(10, os.path.join(file_path, "medium_molecule_1.xyz"))
 
-        assert repr(f[2]) == "Molecule 9"
+        assert repr(f[2]) == "FragmentView 9"
 
     def test_order_fragments_by_centrality(self):
 
@@ -193,3 +378,435 @@ class TestFragmenter:
         order = np.argsort(np.linalg.norm(CM - np.mean(CM, axis=0), axis=1))
 
         assert np.allclose(order, [0, 1, 2, 3])
+
+    def test_motif_grouping(self):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "solvated_molecule_1.xyz")
+
+        def fragment_atoms(f):
+            return sorted(sorted(map(tuple, fragment.xyz.round(6))) for fragment in f)
+
+        for max_fragment_size in [2, 3, 10, 30]:
+            f_atoms = MolecularFragmenter(max_fragment_size, file_name)
+            f_motifs = MolecularFragmenter(
+                max_fragment_size, file_name, max_motif_size=3
+            )
+
+            assert fragment_atoms(f_atoms) == fragment_atoms(f_motifs)
+            assert f_atoms.n_capped_bonds == f_motifs.n_capped_bonds
+
+    def test_cluster_closed_fragments(self):
+        file_path = os.path.dirname(__file__)
+        f = MolecularFragmenter(10, os.path.join(file_path, "solvated_molecule_1.xyz"))
+
+        f.cluster_closed_fragments()
+
+        assert np.allclose(f.fragment_sizes, [10, 6, 4, 10, 9, 10])
+        assert f.n_capped_bonds == 3
+
+    def test_cluster_closed_fragments_size(self):
+        file_path = os.path.dirname(__file__)
+        f = MolecularFragmenter(3, os.path.join(file_path, "solvated_molecule_1.xyz"))
+        n_fragments = f.n_fragments
+
+        f.cluster_closed_fragments(max_cluster_size=7)
+
+        assert f.n_fragments < n_fragments
+        assert np.max(f.fragment_sizes) <= 7
+        assert np.sum(f.fragment_sizes) == 49
+
+    def test_fragmentation_periodic(self, tmp_path):
+        water = np.array(
+            [
+                [0.86681, 0.60100, 0.00000],
+                [-0.86681, 0.60144, 0.00000],
+                [0.00000, -0.07579, 0.00000],
+            ]
+        )
+        # four water molecules split by the boundaries of the cell
+        corners = np.array(
+            [[0.1, 3.0, 3.0], [3.0, 0.0, 3.0], [3.0, 3.0, 0.2], [7.6, 7.8, 7.9]]
+        )
+        xyz = np.vstack([water + corner for corner in corners]) % 8.0
+        Z = np.tile([1, 1, 8], 4)
+
+        file_name = os.path.join(tmp_path, "water_box.xyz")
+        Molecule(Z, xyz).write_xyz(file_name)
+
+        f = MolecularFragmenter(3, file_name)
+        assert f.n_fragments > 4
+
+        f = MolecularFragmenter(3, file_name, cell=[8.0, 8.0, 8.0])
+        assert np.allclose(f.fragment_sizes, [3, 3, 3, 3])
+
+        for fragment in f:
+            assert np.max(fragment.distances) < 2.0
+
+        f = MolecularFragmenter(2, file_name, cell=[8.0, 8.0, 8.0])
+        f.add_H_to_capped_bonds()
+
+        for fragment in f:
+            assert np.max(fragment.distances) < 2.0
+
+    def test_cost_model(self):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "medium_molecule_1.xyz")
+
+        f = MolecularFragmenter(50, file_name, cost_model=ElectronCost())
+
+        assert np.all(f.fragment_costs <= 50)
+        assert np.allclose(f.fragment_costs, [np.sum(fragment.Z) for fragment in f])
+
+        f = MolecularFragmenter(
+            50**2, file_name, max_motif_size=3, cost_model=ElectronCost(exponent=2)
+        )
+        assert np.all(f.fragment_costs <= 50**2)
+
+    def test_statistics(self):
+        file_path = os.path.dirname(__file__)
+        f = MolecularFragmenter(10, os.path.join(file_path, "medium_molecule_1.xyz"))
+
+        statistics = f.statistics
+
+        assert statistics["n_fragments"] == 4
+        assert statistics["n_capped_bonds"] == 3
+        assert np.allclose(statistics["fragment_costs"], [4, 10, 9, 10])
+        assert np.allclose(statistics["parallel_efficiency"], 33 / 40)
+
+    def test_cluster_closed_fragments_cost_model(self):
+        file_path = os.path.dirname(__file__)
+        f = MolecularFragmenter(
+            30,
+            os.path.join(file_path, "solvated_molecule_1.xyz"),
+            cost_model=ElectronCost(),
+        )
+
+        f.cluster_closed_fragments()
+
+        assert np.all(f.fragment_costs <= 30)
+        assert np.sum(f.fragment_sizes) == 49
+
+    def test_write_job_manifest(self, tmp_path):
+        file_path = os.path.dirname(__file__)
+        f = MolecularFragmenter(10, os.path.join(file_path, "medium_molecule_1.xyz"))
+
+        file_prefix = os.path.join(tmp_path, "medium_molecule_1")
+        manifest = f.write_job_manifest(file_prefix, 2)
+
+        with open(file_prefix + "_manifest.json") as json_file:
+            assert json.load(json_file) == manifest
+
+        assert manifest["makespan"] == 19
+        assert np.allclose(manifest["imbalance"], 19 / 16.5)
+        assert sorted(manifest["batches"][0]["fragments"]) == [1, 2]
+        assert sorted(manifest["batches"][1]["fragments"]) == [0, 3]
+
+        with open(file_prefix + "_batch_1.xyz") as xyz_file:
+            lines = xyz_file.readlines()
+
+        assert len(lines) == 4 + 10 + 2 * 2
+        assert lines[1].strip() == "Fragment 1"
+
+    def test_fragment_labels(self):
+        file_path = os.path.dirname(__file__)
+        f = MolecularFragmenter(10, os.path.join(file_path, "medium_molecule_1.xyz"))
+
+        labels = f.fragment_labels
+
+        assert np.allclose(np.bincount(labels), f.fragment_sizes)
+        for i, fragment in enumerate(f):
+            assert np.allclose(
+                f.m.xyz[labels == i], fragment.xyz[np.argsort(fragment.indices)]
+            )
+
+    def test_update_atoms_remove_and_add(self):
+        file_path = os.path.dirname(__file__)
+        f = MolecularFragmenter(10, os.path.join(file_path, "solvated_molecule_1.xyz"))
+
+        untouched = [fragment.xyz for fragment in f if 33 not in fragment.indices]
+
+        f.update_atoms(removed=[33, 34, 35])
+
+        assert f.m.size == 46
+        assert np.allclose(f.fragment_sizes, [1, 3, 3, 3, 3, 4, 10, 9, 10])
+        assert f.n_capped_bonds == 3
+        for fragment, xyz in zip(f, untouched):
+            assert np.allclose(fragment.xyz, xyz)
+
+        water = [[20.0, 20.0, 20.0], [20.9, 20.6, 20.0], [19.1, 20.6, 20.0]]
+        f.update_atoms(added_Z=[8, 1, 1], added_xyz=water)
+
+        assert np.allclose(f.fragment_sizes, [1, 3, 3, 3, 3, 4, 10, 9, 10, 3])
+        assert np.allclose(np.sort(f[-1].indices), [46, 47, 48])
+
+        bonds = np.array(f.m.get_bonds())
+        assert np.allclose(bonds[:, :2], f._bonds)
+        assert np.allclose(bonds[:, 2], f._bond_lengths)
+
+    def test_update_atoms_move(self):
+        file_path = os.path.dirname(__file__)
+        f = MolecularFragmenter(10, os.path.join(file_path, "solvated_molecule_1.xyz"))
+        f.add_H_to_capped_bonds()
+
+        # move a water molecule next to the solute, such that it binds
+        f.update_atoms(changed=[34, 35], xyz=[[-0.9, 0.2, 2.2], [-1.2, -0.5, 2.7]])
+
+        bonds = np.array(f.m.get_bonds())
+        assert np.allclose(bonds[:, :2], f._bonds)
+
+        assert np.all(f.fragment_labels >= 0)
+        assert np.all(f.fragment_sizes <= 10)
+        assert np.sum(f.fragment_sizes) == 49
+        assert f.n_added_H == 0
+
+    def test_update_atoms_bond_factor(self):
+        file_path = os.path.dirname(__file__)
+        m = Molecule.from_xyz_file(
+            os.path.join(file_path, "solvated_molecule_1.xyz"), bond_factor=1.2
+        )
+
+        for engine in ["greedy", "multilevel"]:
+            f = MolecularFragmenter.from_molecule(10, m, engine=engine)
+            f.add_H_to_capped_bonds()
+
+            # stretch an O-H bond to 1.2 A, which breaks it with this bond factor
+            oh = f.m.xyz[34] - f.m.xyz[35]
+            xyz = f.m.xyz[35] + 1.2 * oh / np.linalg.norm(oh)
+            f.update_atoms(changed=[34], xyz=xyz, removed=[0])
+
+            bonds = np.array(f.m.get_bonds())
+            assert np.allclose(bonds[:, :2], f._bonds)
+            assert np.allclose(bonds[:, 2], f._bond_lengths)
+            assert not np.any(np.all(f._bonds == [33, 34], axis=1))
+            assert np.sum(f.fragment_sizes) == 48
+
+            # the incremental update matches a full update
+            reference = MolecularFragmenter.from_molecule(10, m, engine=engine)
+            reference._labels = None
+            reference.update_atoms(changed=[34], xyz=xyz, removed=[0])
+
+            assert np.allclose(f.fragment_labels, reference.fragment_labels)
+            assert np.allclose(f.g.edges, reference.g.edges)
+            assert np.allclose(f.g.weights, reference.g.weights)
+
+    def test_multilevel_engine(self):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "medium_molecule_1.xyz")
+
+        f_greedy = MolecularFragmenter(10, file_name)
+        f = MolecularFragmenter(10, file_name, engine="multilevel")
+
+        assert np.all(f.fragment_sizes <= 10)
+        assert np.sum(f.fragment_sizes) == 33
+        assert f.n_cut_bonds <= f_greedy.n_cut_bonds
+        assert f.n_capped_bonds == f.n_cut_bonds
+
+        f = MolecularFragmenter(
+            10,
+            os.path.join(file_path, "solvated_molecule_1.xyz"),
+            max_motif_size=3,
+            engine="multilevel",
+        )
+        assert np.all(f.fragment_sizes <= 10)
+        assert np.sum(f.fragment_sizes) == 49
+
+    def test_refine_fragments(self):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "medium_molecule_1.xyz")
+
+        f = MolecularFragmenter(10, file_name)
+        n_cut_bonds = f.n_cut_bonds
+        f.add_H_to_capped_bonds()
+
+        before, after = f.refine_fragments()
+
+        assert before == n_cut_bonds
+        assert after == f.n_cut_bonds
+        assert after <= before
+        assert f.n_capped_bonds == after
+        assert np.all(f.fragment_sizes <= 10)
+        assert np.sum(f.fragment_sizes) == 33
+        assert f.n_added_H == 0
+
+        with pytest.raises(ValueError, match="Refinement does not support cost models"):
+            MolecularFragmenter(
+                10, file_name, cost_model=ElectronCost()
+            ).refine_fragments()
+
+    def test_ring_units(self):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "small_molecule_4.xyz")
+
+        f = MolecularFragmenter(10, file_name)
+        in_ring, _ = get_ring_bonds(f.m.size, f._bonds)
+        ring_bonds = f._bonds[in_ring]
+
+        labels = f.fragment_labels
+        assert np.any(labels[ring_bonds[:, 0]] != labels[ring_bonds[:, 1]])
+
+        for engine in ["greedy", "multilevel"]:
+            f = MolecularFragmenter(10, file_name, max_ring_size=10, engine=engine)
+
+            labels = f.fragment_labels
+            assert np.all(labels[ring_bonds[:, 0]] == labels[ring_bonds[:, 1]])
+            assert np.all(f.fragment_sizes <= 10)
+            assert np.sum(f.fragment_sizes) == 16
+
+            f.refine_fragments()
+            labels = f.fragment_labels
+            assert np.all(labels[ring_bonds[:, 0]] == labels[ring_bonds[:, 1]])
+
+    def test_update_atoms_keeps_ring_units(self):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "small_molecule_4.xyz")
+
+        for engine in ["greedy", "multilevel"]:
+            f = MolecularFragmenter(10, file_name, max_ring_size=10, engine=engine)
+            in_ring, _ = get_ring_bonds(f.m.size, f._bonds)
+            ring_bonds = f._bonds[in_ring]
+
+            f.update_atoms(changed=[0], xyz=f.m.xyz[0] + 0.01)
+
+            labels = f.fragment_labels
+            assert np.all(labels[ring_bonds[:, 0]] == labels[ring_bonds[:, 1]])
+            assert np.all(f.fragment_sizes <= 10)
+            assert np.sum(f.fragment_sizes) == 16
+
+    def test_ring_units_too_large(self):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "small_molecule_4.xyz")
+
+        f = MolecularFragmenter(8, file_name, max_ring_size=10)
+
+        assert np.all(f.fragment_sizes <= 8)
+        assert np.sum(f.fragment_sizes) == 16
+
+    def test_iter_fragments(self):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "solvated_molecule_1.xyz")
+
+        f = MolecularFragmenter(10, file_name)
+        f.add_H_to_capped_bonds()
+        reference = sorted(
+            tuple(sorted(fragment.indices[fragment.indices >= 0])) for fragment in f
+        )
+
+        for min_batch_size in [1, 1000]:
+            fragments = list(
+                MolecularFragmenter.iter_fragments(
+                    10, file_name, min_batch_size=min_batch_size
+                )
+            )
+
+            atoms = sorted(
+                tuple(sorted(fragment.indices[fragment.indices >= 0]))
+                for fragment in fragments
+            )
+            assert atoms == reference
+            assert sum(fragment.size for fragment in fragments) == 33 + 16 + 6
+
+        fragment = next(MolecularFragmenter.iter_fragments(10, file_name, add_H=False))
+        assert np.all(fragment.indices >= 0)
+
+    def test_iter_fragments_is_lazy(self, monkeypatch):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "solvated_molecule_1.xyz")
+
+        n_calls = []
+        from_molecule = MolecularFragmenter.from_molecule
+
+        def counting_from_molecule(*args, **kwargs):
+            n_calls.append(1)
+            return from_molecule(*args, **kwargs)
+
+        monkeypatch.setattr(
+            MolecularFragmenter, "from_molecule", counting_from_molecule
+        )
+
+        def no_dense_bonds(*args, **kwargs):
+            raise AssertionError("bonds are determined with linked cells")
+
+        # the bonds of the whole system are determined once and handed to each batch
+        monkeypatch.setattr(Molecule, "get_bonds", no_dense_bonds)
+
+        fragments = MolecularFragmenter.iter_fragments(10, file_name, min_batch_size=1)
+        next(fragments)
+        assert len(n_calls) == 1
+
+        list(fragments)
+        assert len(n_calls) == 7
+
+    def test_from_molecule(self):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "medium_molecule_1.xyz")
+
+        m = Molecule.from_xyz_file(file_name)
+        f = MolecularFragmenter.from_molecule(10, m[np.arange(10, 33)])
+
+        assert np.sum(f.fragment_sizes) == 23
+        assert np.all(np.sort(np.hstack([frag.indices for frag in f])) == np.arange(23))
+
+        m = Molecule(m.Z, m.xyz, cell=[20.0, 20.0, 20.0])
+        f = MolecularFragmenter.from_molecule(10, m)
+        f_parallel = MolecularFragmenter.from_molecule(10, m, n_workers=2)
+
+        assert np.array_equal(f._bonds, f_parallel._bonds)
+        assert np.array_equal(f.fragment_labels, f_parallel.fragment_labels)
+
+    def test_atom_order(self, monkeypatch):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "solvated_molecule_1.xyz")
+
+        f = MolecularFragmenter(10, file_name)
+
+        def no_dense_bonds(*args, **kwargs):
+            raise AssertionError("ordered atoms are binned with linked cells")
+
+        monkeypatch.setattr(Molecule, "get_bonds", no_dense_bonds)
+
+        for curve in ["hilbert", "morton"]:
+            for f_ordered in [
+                MolecularFragmenter(10, file_name, atom_order=curve),
+                MolecularFragmenter.from_molecule(10, f.m, atom_order=curve),
+            ]:
+                assert np.array_equal(f._bonds, f_ordered._bonds)
+                assert np.allclose(f._bond_lengths, f_ordered._bond_lengths)
+                assert np.array_equal(f.fragment_labels, f_ordered.fragment_labels)
+
+    def test_order_fragments_by_space_filling_curve(self):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "solvated_molecule_1.xyz")
+
+        f = MolecularFragmenter(5, file_name)
+
+        def get_capped_atom_pairs(f):
+            pairs = set()
+            for v1, v2 in np.reshape(f.g.edges, (-1, 2)).astype(int):
+                pairs.add(frozenset([tuple(f[v1].indices), tuple(f[v2].indices)]))
+            return pairs
+
+        capped_atom_pairs = get_capped_atom_pairs(f)
+        fragment_sizes = np.sort(f.fragment_sizes)
+
+        f.order_fragments_by_space_filling_curve()
+
+        assert get_capped_atom_pairs(f) == capped_atom_pairs
+        assert np.allclose(np.sort(f.fragment_sizes), fragment_sizes)
+
+        CM = np.array([fragment.center_of_mass for fragment in f])
+        ordered_keys = get_hilbert_keys(CM)
+        assert np.all(np.diff(ordered_keys) >= 0)
+
+    def test_illegal_engine(self):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "medium_molecule_1.xyz")
+
+        with pytest.raises(ValueError, match="Unknown fragmentation engine"):
+            MolecularFragmenter(10, file_name, engine="metis")
+
+        with pytest.raises(
+            ValueError, match="The multilevel engine does not support cost models"
+        ):
+            MolecularFragmenter(
+                10, file_name, engine="multilevel", cost_model=ElectronCost()
+            )
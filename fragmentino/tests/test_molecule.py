@@ -232,3 +232,54 @@ class TestMolecule:
         for i, (Z, xyz) in enumerate(m):
             assert Z == m[i].Z
             assert np.allclose(m[i].xyz, xyz)
+
+    def test_get_bonds_periodic(self):
+        Z = [8, 1, 1]
+        xyz = [[9.9, 5.0, 5.0], [0.6, 5.6, 5.0], [9.5, 4.1, 5.0]]
+
+        m = Molecule(Z, xyz)
+        assert len(m.get_bonds()) == 1
+
+        m = Molecule(Z, xyz, cell=[10.0, 10.0, 10.0])
+        bonds = m.get_bonds()
+
+        assert np.allclose([bond[:2] for bond in bonds], [[0, 1], [0, 2]])
+        assert np.allclose(bonds[0][2], np.linalg.norm([0.7, 0.6, 0.0]))
+
+    def test_get_bonds_triclinic(self):
+        cell = [[6.0, 0.0, 0.0], [2.0, 6.0, 0.0], [1.0, 1.0, 6.0]]
+        Z = [6, 6]
+        xyz = [[0.1, 0.1, 0.1], [8.7, 6.8, 5.9]]
+
+        m = Molecule(Z, xyz, cell=cell)
+        bonds = m.get_bonds()
+
+        assert len(bonds) == 1
+        assert np.allclose(bonds[0][2], np.linalg.norm([-0.4, -0.3, -0.2]))
+
+    def test_unwrap(self):
+        Z = [8, 1, 1]
+        xyz = [[9.9, 5.0, 5.0], [0.6, 5.6, 5.0], [9.5, 4.1, 5.0]]
+
+        m = Molecule(Z, xyz, cell=[10.0, 10.0, 10.0])
+        m.unwrap()
+
+        xyz_reference = [[9.9, 5.0, 5.0], [10.6, 5.6, 5.0], [9.5, 4.1, 5.0]]
+        assert np.allclose(xyz_reference, m.xyz)
+
+    def test_indices(self):
+        file_path = os.path.dirname(__file__)
+        m = Molecule.from_xyz_file(os.path.join(file_path, "small_molecule_1.xyz"))
+
+        assert m.indices is None
+
+        m1 = m[[2, 0]]
+        m2 = m[1]
+        assert np.allclose(m1.indices, [2, 0])
+        assert np.allclose(m1[1].indices, [0])
+
+        m1.merge(m2)
+        assert np.allclose(m1.indices, [2, 0, 1])
+
+        m1.add_atom(1, [0.0, 0.0, 0.0])
+        assert np.allclose(m1.indices, [2, 0, 1, -1])
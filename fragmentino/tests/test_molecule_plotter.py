@@ -25,3 +25,75 @@ class TestMoleculePlotter:
         data = [plotter.get_atom_plot(), plotter.get_bond_plot()]
         v = MoleculeFigure(data=data)
         v.get_figure()
+
+    def test_bond_lines(self):
+        file_path = os.path.dirname(__file__)
+        m = Molecule.from_xyz_file(os.path.join(file_path, "small_molecule_1.xyz"))
+        n_bonds = len(m.get_bonds())
+
+        bond_plot = MoleculePlotter(m).get_bond_plot()
+
+        assert len(bond_plot.x) == 3 * n_bonds
+        assert np.all(np.isnan(bond_plot.x[2::3]))
+        assert not np.any(np.isnan(bond_plot.x[0::3]))
+
+    def test_fragment_plots(self):
+        file_path = os.path.dirname(__file__)
+        m = Molecule.from_xyz_file(os.path.join(file_path, "small_molecule_1.xyz"))
+        bonds = np.array([bond[:2] for bond in m.get_bonds()], dtype=int)
+        labels = np.arange(m.size) % 2
+
+        plotter = MoleculePlotter(m, bonds=bonds)
+        bond_plot, atom_plot = plotter.get_fragment_plots(labels)
+
+        n_internal = np.count_nonzero(labels[bonds[:, 0]] == labels[bonds[:, 1]])
+        assert len(bond_plot.x) == 3 * n_internal
+        assert len(atom_plot.x) == m.size
+        assert np.array_equal(atom_plot.customdata, labels)
+        assert len(set(atom_plot.marker.color)) <= 2
+
+        bond_plot, atom_plot = plotter.get_fragment_plots(labels, colors="CPK")
+        assert bond_plot.line.color == "black"
+
+    def test_level_of_detail_plots(self):
+        file_path = os.path.dirname(__file__)
+        m = Molecule.from_xyz_file(os.path.join(file_path, "medium_molecule_1.xyz"))
+        bonds = np.array([bond[:2] for bond in m.get_bonds()], dtype=int)
+        labels = np.arange(m.size) // 5
+
+        plotter = MoleculePlotter(m, bonds=bonds)
+        plots = plotter.get_level_of_detail_plots(labels, detail=[1, 3])
+        bond_plot, atom_plot, glyph_plot, backbone_plot = plots
+
+        assert set(atom_plot.customdata) == {1, 3}
+        assert len(atom_plot.x) == np.count_nonzero(np.isin(labels, [1, 3]))
+        assert len(glyph_plot.x) == np.max(labels) + 1 - 2
+        assert np.all(np.isnan(backbone_plot.x[2::3]))
+
+    def test_point_budget(self):
+        file_path = os.path.dirname(__file__)
+        m = Molecule.from_xyz_file(os.path.join(file_path, "medium_molecule_1.xyz"))
+        labels = np.arange(m.size) // 2
+        center = np.mean(m.xyz, axis=0)
+
+        plotter = MoleculePlotter(m)
+        for max_points in [0, 7, 20, 100]:
+            plots = plotter.get_level_of_detail_plots(
+                labels, region=(center, 5.0), max_points=max_points
+            )
+            assert sum(len(plot.x) for plot in plots) <= max_points
+
+    def test_write_html(self, tmp_path):
+        file_path = os.path.dirname(__file__)
+        m = Molecule.from_xyz_file(os.path.join(file_path, "small_molecule_1.xyz"))
+
+        plotter = MoleculePlotter(m)
+        v = MoleculeFigure(data=[plotter.get_atom_plot(), plotter.get_bond_plot()])
+
+        file_name = os.path.join(tmp_path, "molecule.html")
+        v.write_html(file_name)
+
+        with open(file_name) as f:
+            html = f.read()
+        assert "<html>" in html
+        assert "plotly.js" in html
@@ -0,0 +1,94 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+import pytest
+import os
+
+
+from fragmentino import MolecularFragmenter
+from fragmentino.out_of_core import OutOfCoreFragmenter
+
+
+def get_canonical_labels(labels):
+    """Numbers the fragments in order of their first atom"""
+    _, first_atom, labels = np.unique(labels, return_index=True, return_inverse=True)
+    rank = np.empty(first_atom.size, dtype=int)
+    rank[np.argsort(first_atom)] = np.arange(first_atom.size)
+    return rank[labels.ravel()]
+
+
+class TestOutOfCoreFragmenter:
+    @pytest.mark.filterwarnings("ignore:A connected component")
+    def test_same_as_in_memory(self, tmp_path):
+        file_path = os.path.dirname(__file__)
+
+        for name in ["medium_molecule_1.xyz", "solvated_molecule_1.xyz"]:
+            file_name = os.path.join(file_path, name)
+            f = MolecularFragmenter(10, file_name)
+            labels = get_canonical_labels(f.fragment_labels)
+
+            capped_bonds = np.sort(labels[f._bonds], axis=1)
+            capped_bonds = np.unique(
+                capped_bonds[capped_bonds[:, 0] != capped_bonds[:, 1]], axis=0
+            )
+
+            for max_slab_size in [5, 20, 1000]:
+                o = OutOfCoreFragmenter(
+                    10, file_name, tmp_path / str(max_slab_size), max_slab_size
+                )
+
+                assert np.array_equal(o.labels, labels)
+                assert o.n_fragments == f.n_fragments
+                assert np.array_equal(
+                    np.unique(np.sort(o.capped_bonds, axis=1), axis=0), capped_bonds
+                )
+                assert o.bonds.shape == f._bonds.shape
+
+    @pytest.mark.filterwarnings("ignore:A connected component")
+    def test_options(self, tmp_path):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "solvated_molecule_1.xyz")
+
+        f = MolecularFragmenter(10, file_name, max_motif_size=3, engine="multilevel")
+        o = OutOfCoreFragmenter(
+            10, file_name, tmp_path, 10, max_motif_size=3, engine="multilevel"
+        )
+
+        assert np.array_equal(o.labels, get_canonical_labels(f.fragment_labels))
+
+    @pytest.mark.filterwarnings("ignore:A connected component")
+    def test_memory_mapped_results(self, tmp_path):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "medium_molecule_1.xyz")
+
+        o = OutOfCoreFragmenter(10, file_name, tmp_path, 10)
+
+        assert sorted(os.listdir(tmp_path)) == [
+            "Z.npy",
+            "bond_lengths.npy",
+            "bonds.npy",
+            "capped_bonds.npy",
+            "components.npy",
+            "labels.npy",
+            "xyz.npy",
+        ]
+        assert np.array_equal(np.load(tmp_path / "labels.npy"), o.labels)
+
+        fragment = o.get_fragment(0)
+        assert np.all(o.labels[fragment.indices] == 0)
+        assert fragment.size == np.count_nonzero(o.labels == 0)
+        assert repr(o) == "OutOfCoreFragmenter Fragments: 4 Capped bonds: 3"
+
+    def test_large_component(self, tmp_path):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "medium_molecule_1.xyz")
+
+        with pytest.warns(RuntimeWarning, match="component of 33 atoms exceeds"):
+            o = OutOfCoreFragmenter(10, file_name, tmp_path, 20)
+
+        assert o.n_fragments == MolecularFragmenter(10, file_name).n_fragments
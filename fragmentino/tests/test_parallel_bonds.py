@@ -0,0 +1,81 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+import pytest
+import os
+import sys
+
+
+from fragmentino import Molecule
+from fragmentino import MolecularFragmenter
+from fragmentino.neighbor_search import get_bonded_pairs
+from fragmentino.parallel_bonds import get_bonded_pairs_parallel
+
+
+class TestParallelBonds:
+    def test_same_as_serial(self):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "solvated_molecule_1.xyz")
+        m = Molecule.from_xyz_file(file_name)
+
+        reference = get_bonded_pairs(m.xyz, m._get_bonding_radii())
+
+        for n_workers in [1, 2, 5]:
+            bonds = get_bonded_pairs_parallel(m.xyz, m.Z, n_workers=n_workers)
+
+            for array, reference_array in zip(bonds, reference):
+                assert np.allclose(array, reference_array)
+
+    def test_same_as_serial_periodic(self):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "medium_molecule_1.xyz")
+        m = Molecule.from_xyz_file(file_name, cell=[8.0, 9.0, 10.0])
+
+        reference = get_bonded_pairs(m.xyz, m._get_bonding_radii(), m.cell)
+        bonds = get_bonded_pairs_parallel(m.xyz, m.Z, cell=m.cell, n_workers=3)
+
+        for array, reference_array in zip(bonds, reference):
+            assert np.allclose(array, reference_array)
+
+    def test_no_duplicates(self):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "medium_molecule_1.xyz")
+        m = Molecule.from_xyz_file(file_name)
+
+        rows, cols, _ = get_bonded_pairs_parallel(m.xyz, m.Z, n_workers=8)
+
+        assert np.all(rows < cols)
+        assert np.unique(np.column_stack((rows, cols)), axis=0).shape[0] == rows.size
+
+    def test_serial_fallback(self, monkeypatch):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "medium_molecule_1.xyz")
+        m = Molecule.from_xyz_file(file_name, cell=[8.0, 9.0, 10.0])
+
+        # as on Python 3.7, which has no shared memory
+        monkeypatch.setitem(sys.modules, "multiprocessing.shared_memory", None)
+
+        reference = get_bonded_pairs(m.xyz, m._get_bonding_radii(), m.cell)
+        bonds = get_bonded_pairs_parallel(m.xyz, m.Z, cell=m.cell, n_workers=3)
+
+        for array, reference_array in zip(bonds, reference):
+            assert np.allclose(array, reference_array)
+
+    def test_illegal_n_workers(self):
+        with pytest.raises(ValueError, match="Number of workers must be positive"):
+            get_bonded_pairs_parallel(np.zeros((2, 3)), [1, 1], n_workers=0)
+
+    def test_fragmenter(self):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "medium_molecule_1.xyz")
+
+        f = MolecularFragmenter(10, file_name)
+        f_parallel = MolecularFragmenter(10, file_name, n_workers=2)
+
+        assert np.array_equal(f.fragment_labels, f_parallel.fragment_labels)
+        assert f.n_capped_bonds == f_parallel.n_capped_bonds
@@ -0,0 +1,97 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+import pytest
+import os
+
+
+from fragmentino.partitioning import (
+    partition_multilevel,
+    refine_boundary,
+    refine_fiduccia_mattheyses,
+    split_disconnected_parts,
+    get_adjacency_matrix,
+    count_cut_edges,
+)
+
+
+class TestPartitioning:
+    def test_partition_chain(self):
+        edges = [[i, i + 1] for i in range(11)]
+        labels = partition_multilevel(12, edges, np.ones(11), 4)
+
+        assert np.allclose(np.bincount(labels), [4, 4, 4])
+        assert count_cut_edges(edges, labels) == 2
+
+    def test_partition_two_rings(self):
+        # two rings of six vertices, connected by a single edge
+        edges = [[i, (i + 1) % 6] for i in range(6)]
+        edges += [[6 + i, 6 + (i + 1) % 6] for i in range(6)]
+        edges += [[0, 6]]
+
+        labels = partition_multilevel(12, edges, np.ones(13), 6)
+
+        assert np.allclose(labels, [0] * 6 + [1] * 6)
+        assert count_cut_edges(edges, labels) == 1
+
+    def test_partition_vertex_sizes(self):
+        edges = [[0, 1], [1, 2], [2, 3]]
+        labels = partition_multilevel(4, edges, [1.0, 1.0, 1.0], 5, [3, 2, 2, 3])
+
+        assert np.allclose(labels, [0, 0, 1, 1])
+
+    def test_partition_illegal_sizes(self):
+        with pytest.raises(
+            ValueError, match="Vertex sizes cannot exceed the maximal part size"
+        ):
+            partition_multilevel(2, [[0, 1]], [1.0], 2, [3, 1])
+
+    def test_refine_boundary(self):
+        edges = [[0, 1], [1, 2], [2, 3], [3, 4], [4, 5]]
+        adjacency = get_adjacency_matrix(6, edges, np.ones(5))
+
+        labels = np.array([0, 0, 1, 0, 1, 1])
+        assert count_cut_edges(edges, labels) == 3
+
+        labels = refine_boundary(adjacency, np.ones(6), labels, 4)
+        assert count_cut_edges(edges, labels) == 1
+        assert np.all(np.bincount(labels) <= 4)
+
+    def test_refine_fiduccia_mattheyses(self):
+        edges = [[0, 1], [1, 2], [2, 3], [3, 4], [4, 5]]
+        adjacency = get_adjacency_matrix(6, edges, np.ones(5))
+
+        labels = np.array([0, 1, 0, 1, 0, 1])
+        assert count_cut_edges(edges, labels) == 5
+
+        labels = refine_fiduccia_mattheyses(adjacency, np.ones(6), labels, 4)
+        assert count_cut_edges(edges, labels) == 1
+        assert np.all(np.bincount(labels) <= 4)
+
+    def test_refine_fiduccia_mattheyses_never_worse(self):
+        # two rings of six vertices, connected by a single edge
+        edges = [[i, (i + 1) % 6] for i in range(6)]
+        edges += [[6 + i, 6 + (i + 1) % 6] for i in range(6)]
+        edges += [[0, 6]]
+        adjacency = get_adjacency_matrix(12, edges, np.ones(13))
+
+        labels = np.array([0] * 6 + [1] * 6)
+        refined = refine_fiduccia_mattheyses(adjacency, np.ones(12), labels, 6)
+        assert np.allclose(refined, labels)
+
+        labels = np.array([0, 0, 0, 1, 1, 1, 1, 1, 1, 0, 0, 0])
+        refined = refine_fiduccia_mattheyses(adjacency, np.ones(12), labels, 6)
+        assert count_cut_edges(edges, refined) <= count_cut_edges(edges, labels)
+        assert np.all(np.bincount(refined) <= 6)
+
+    def test_split_disconnected_parts(self):
+        edges = [[0, 1], [1, 2], [2, 3], [3, 4]]
+        adjacency = get_adjacency_matrix(5, edges, np.ones(4))
+
+        labels = split_disconnected_parts(adjacency, [1, 1, 0, 1, 1])
+        assert np.allclose(labels, [1, 1, 0, 2, 2])
@@ -0,0 +1,141 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import json
+import logging
+import numpy as np
+import pytest
+import os
+from copy import deepcopy
+
+
+from fragmentino import MolecularFragmenter, ContractableWeightedGraph, Molecule
+from fragmentino.profiling import Profiler, NullProfiler, null_profiler, timed
+
+
+class TestProfiler:
+    def test_timer(self):
+        p = Profiler()
+
+        for _ in range(3):
+            with p.timer("stage"):
+                pass
+
+        assert p.calls["stage"] == 3
+        assert p.timings["stage"] >= 0.0
+
+    def test_timer_with_exception(self):
+        p = Profiler()
+
+        with pytest.raises(RuntimeError):
+            with p.timer("stage"):
+                raise RuntimeError
+
+        assert p.calls["stage"] == 1
+
+    def test_count(self):
+        p = Profiler()
+        p.count("events")
+        p.count("events", 4)
+
+        assert p.counters == {"events": 5}
+
+    def test_report(self, tmp_path):
+        p = Profiler()
+        with p.timer("stage"):
+            p.count("events", np.int64(2))
+
+        file_name = os.path.join(tmp_path, "report.json")
+        report = json.loads(p.to_json(file_name))
+
+        assert report == p.get_report()
+        assert report["timings"]["stage"]["calls"] == 1
+        assert report["counters"] == {"events": 2}
+        with open(file_name) as f:
+            assert json.load(f) == report
+
+        p.reset()
+        assert p.get_report() == {"timings": {}, "counters": {}}
+
+    def test_sinks(self, caplog):
+        stages = []
+        logger = logging.getLogger("fragmentino.test")
+        p = Profiler(callback=lambda name, elapsed: stages.append(name), logger=logger)
+
+        with caplog.at_level(logging.DEBUG, logger="fragmentino.test"):
+            with p.timer("stage"):
+                pass
+
+        assert stages == ["stage"]
+        assert "stage" in caplog.text
+
+    def test_null_profiler(self):
+        with null_profiler.timer("stage"):
+            null_profiler.count("events")
+
+        assert null_profiler.timer("a") is null_profiler.timer("b")
+        assert deepcopy(null_profiler) is null_profiler
+        assert null_profiler.get_report() == {"timings": {}, "counters": {}}
+        assert not NullProfiler.enabled
+
+    def test_timed(self):
+        class Worker:
+            profiler = Profiler()
+
+            @timed("work")
+            def work(self, x):
+                return 2 * x
+
+        assert Worker().work(2) == 4
+        assert Worker.profiler.calls["work"] == 1
+
+
+class TestInstrumentation:
+    def test_fragmenter(self, tmp_path):
+        file_path = os.path.dirname(__file__)
+        file_name = os.path.join(file_path, "medium_molecule_1.xyz")
+        p = Profiler()
+
+        f = MolecularFragmenter(10, file_name, profiler=p)
+        f.add_H_to_capped_bonds()
+        f.write(os.path.join(tmp_path, "fragments"))
+
+        g = MolecularFragmenter(10, file_name)
+        assert np.array_equal(f.fragment_labels, g.fragment_labels)
+
+        report = p.get_report()
+        for stage in ["read_xyz", "bonds", "initial_labels", "contraction", "cap"]:
+            assert report["timings"][stage]["calls"] == 1
+
+        assert report["counters"]["atoms_read"] == f.m.size
+        assert report["counters"]["contractions"] == f.m.size - f.n_fragments
+        assert report["counters"]["atoms_written"] == f.m.size + f.n_added_H
+        assert (
+            report["counters"]["deepcopies"] == 2 * report["counters"]["contractions"]
+        )
+        assert report["counters"]["edges_scanned"] >= report["counters"]["contractions"]
+
+    def test_without_profiler(self):
+        file_path = os.path.dirname(__file__)
+        f = MolecularFragmenter(10, os.path.join(file_path, "small_molecule_1.xyz"))
+
+        assert f.profiler is null_profiler
+        assert f.g.profiler is null_profiler
+
+    def test_graph(self):
+        p = Profiler()
+        g = ContractableWeightedGraph(3, profiler=p)
+        g.add_vertices([Molecule([1], [0.0, 0.0, float(i)]) for i in range(4)])
+        g.add_edge(0, 1, 1.0)
+        g.add_edge(1, 2, 2.0)
+        g.add_edge(2, 3, 3.0)
+
+        g.contract_by_smallest_weight()
+
+        assert p.counters["contractions"] == 2
+        assert p.counters["deepcopies"] == 4
+        assert p.counters["allocated_bytes"] > 0
@@ -0,0 +1,60 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+
+
+from fragmentino.rings import get_biconnected_components, get_ring_bonds
+
+
+class TestRings:
+    def test_biconnected_components_tree(self):
+        edges = [[0, 1], [1, 2], [1, 3]]
+        n_components, components = get_biconnected_components(4, edges)
+
+        assert n_components == 3
+        assert np.unique(components).size == 3
+
+    def test_biconnected_components_rings(self):
+        # two triangles sharing vertex 2, and a tail 5-6 from vertex 4
+        edges = [[0, 1], [1, 2], [2, 0], [2, 3], [3, 4], [4, 2], [4, 5], [5, 6]]
+        n_components, components = get_biconnected_components(7, edges)
+
+        assert n_components == 4
+        assert np.unique(components[:3]).size == 1
+        assert np.unique(components[3:6]).size == 1
+        assert components[0] != components[3]
+        assert components[6] != components[7]
+
+    def test_biconnected_components_disconnected(self):
+        edges = [[0, 1], [1, 2], [2, 0], [3, 4]]
+        n_components, components = get_biconnected_components(6, edges)
+
+        assert n_components == 2
+        assert np.allclose(components[:3], components[0])
+
+    def test_ring_bonds(self):
+        # fused rings (0-5 and 4-9, sharing the bond 4-5) with a tail 9-10-11
+        edges = [[i, (i + 1) % 6] for i in range(6)]
+        edges += [[5, 6], [6, 7], [7, 8], [8, 9], [9, 4]]
+        edges += [[9, 10], [10, 11]]
+
+        in_ring, _ = get_ring_bonds(12, edges)
+        assert np.all(in_ring[:11])
+        assert not np.any(in_ring[11:])
+
+        in_ring, _ = get_ring_bonds(12, edges, max_ring_size=6)
+        assert not np.any(in_ring)
+
+        in_ring, _ = get_ring_bonds(12, edges, max_ring_size=10)
+        assert np.all(in_ring[:11])
+
+    def test_ring_bonds_no_bonds(self):
+        in_ring, ring_systems = get_ring_bonds(3, np.zeros((0, 2)))
+
+        assert in_ring.size == 0
+        assert ring_systems.size == 0
@@ -0,0 +1,41 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+import pytest
+import time
+
+
+from fragmentino.scheduling import schedule_lpt, get_schedule_statistics
+
+
+class TestScheduling:
+    def test_schedule_lpt(self):
+        workers, loads = schedule_lpt([5, 5, 4, 4, 3, 3, 3], 3)
+
+        assert np.allclose(workers, [0, 1, 2, 2, 0, 1, 0])
+        assert np.allclose(loads, [11, 8, 8])
+
+    def test_schedule_lpt_illegal_workers(self):
+        with pytest.raises(ValueError, match="Number of workers must be positive"):
+            schedule_lpt([1, 2], 0)
+
+    def test_schedule_statistics(self):
+        statistics = get_schedule_statistics(np.array([11, 8, 8]))
+
+        assert statistics["makespan"] == 11
+        assert np.allclose(statistics["mean_load"], 9)
+        assert np.allclose(statistics["imbalance"], 11 / 9)
+
+    def test_schedule_lpt_large(self):
+        costs = np.random.default_rng(1).integers(1, 50, 100000) ** 3
+
+        start = time.perf_counter()
+        workers, loads = schedule_lpt(costs, 64)
+        assert time.perf_counter() - start < 1.0
+
+        assert get_schedule_statistics(loads)["imbalance"] < 1.01
@@ -0,0 +1,54 @@
+#  fragmentino
+#  Copyright (C) 2021 the authors of fragmentino
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+import pytest
+
+
+from fragmentino.space_filling_curves import (
+    get_space_filling_curve_order,
+    get_hilbert_keys,
+    get_morton_keys,
+)
+
+
+def get_grid(n_bits):
+    points = np.meshgrid(*[np.arange(2**n_bits)] * 3, indexing="ij")
+    return np.stack(points, axis=-1).reshape(-1, 3).astype(float)
+
+
+class TestSpaceFillingCurves:
+    def test_hilbert_curve_is_continuous(self):
+        points = get_grid(3)
+        order = get_space_filling_curve_order(points, "hilbert", n_bits=3)
+
+        assert np.unique(get_hilbert_keys(points, 3)).size == points.shape[0]
+
+        steps = np.abs(np.diff(points[order], axis=0)).sum(axis=1)
+        assert np.allclose(steps, 1)
+
+    def test_morton_keys(self):
+        points = get_grid(1)
+        keys = get_morton_keys(points, 1)
+
+        # the bits of the keys are given by the coordinates
+        assert np.allclose(keys, points @ [4, 2, 1])
+
+    def test_inverse_permutation(self):
+        points = np.random.default_rng(1).random((50, 3))
+        order = get_space_filling_curve_order(points)
+        inverse = np.argsort(order)
+
+        assert np.allclose(points[order][inverse], points)
+
+    def test_degenerate_points(self):
+        assert get_space_filling_curve_order(np.zeros((0, 3))).size == 0
+        assert np.allclose(get_space_filling_curve_order(np.ones((3, 3))), [0, 1, 2])
+
+    def test_illegal_curve(self):
+        with pytest.raises(ValueError, match="Unknown space-filling curve"):
+            get_space_filling_curve_order(np.zeros((2, 3)), "peano")
@@ -52,6 +52,21 @@ class MoleculeFigure:
         """
         self.fig.show(**kwargs)  # pragma: no cover
 
+    def write_html(self, file_name, **kwargs):
+        """Writes the figure to a standalone HTML file, which includes plotly.js
+        and can be viewed without a running Python kernel
+
+        Parameters
+        ----------
+        file_name : str
+            File name with full or relative path
+        kwargs
+            Keyword arguments passed to :meth:`plotly.graph_objects.Figure.write_html`.
+        """
+        kwargs.setdefault("include_plotlyjs", True)
+        kwargs.setdefault("full_html", True)
+        self.fig.write_html(file_name, **kwargs)
+
     def get_figure(self):
         """Returns the generated figure
 
@@ -67,9 +82,24 @@ class MoleculeFigure:
 class MoleculePlotter:
     """Handles the generation of data for molecule plots using Plotly"""
 
-    def __init__(self, molecule, color=None):
+    def __init__(self, molecule, color=None, bonds=None):
+        """Creates the plotter
+
+        Parameters
+        ----------
+        molecule : Molecule
+            The molecule to plot
+        color : str, optional
+            String of color (hex or predefined color such as ``"pink"``).
+            Default is ``color=None``, see :meth:`get_bond_plot` and :meth:`get_atom_plot`.
+        bonds : numpy.ndarray, optional
+            Pairs of bonded atoms, if already known. Default is ``bonds=None``,
+            in which case the bonds are determined with
+            :meth:`fragmentino.Molecule.get_bonds`.
+        """
         self.molecule = molecule
         self.color = color
+        self.bonds = bonds
 
     def get_bond_plot(self, label="bonds"):
         """Gets the data for plotting bonds using plotly
@@ -93,28 +123,12 @@ class MoleculePlotter:
         else:
             bond_color = self.color
 
-        bonds = self.molecule.get_bonds()
-        x_lines = []
-        y_lines = []
-        z_lines = []
-
-        for bond in bonds:
-            x_lines.append(self.molecule.xyz[bond[0], 0])
-            x_lines.append(self.molecule.xyz[bond[1], 0])
-            x_lines.append(None)
-
-            y_lines.append(self.molecule.xyz[bond[0], 1])
-            y_lines.append(self.molecule.xyz[bond[1], 1])
-            y_lines.append(None)
-
-            z_lines.append(self.molecule.xyz[bond[0], 2])
-            z_lines.append(self.molecule.xyz[bond[1], 2])
-            z_lines.append(None)
+        lines = _get_bond_lines(self.molecule.xyz, self._get_bonds())
 
         bond_plot = go.Scatter3d(
-            x=x_lines,
-            y=y_lines,
-            z=z_lines,
+            x=lines[:, 0],
+            y=lines[:, 1],
+            z=lines[:, 2],
             name=label,
             mode="lines",
             line=dict(color=bond_color, width=7),
@@ -140,21 +154,10 @@ class MoleculePlotter:
         atom_plot : plotly.graph_object.Scatter3d
             3D scatter plot with atoms
         """
-        from fragmentino.periodic_table import (
-            Z_to_covalent_radius,
-            Z_to_color,
-        )
-
-        marker_sizes = (
-            15
-            * np.fromiter(map(Z_to_covalent_radius, (self.molecule.Z)), dtype=float)
-            * self.molecule.bond_factor
-        )
+        marker_sizes = self._get_marker_sizes()
 
         if self.color == None:  # Color by atomic number (CPK)
-            colors = []
-            for Z in self.molecule.Z:
-                colors.append(Z_to_color(Z))
+            colors = _get_CPK_colors(self.molecule.Z)
         else:
             colors = self.color
 
@@ -175,3 +178,254 @@ class MoleculePlotter:
             ),
         )
         return atom_plot
+
+    def get_fragment_plots(self, labels, colors="random"):
+        """Gets the data for plotting the fragments of a molecule as a single
+        trace of bonds and a single trace of atoms, with the fragment of each atom
+        shown when hovering. Only bonds within fragments are drawn.
+
+        Parameters
+        ----------
+        labels : numpy.ndarray
+            Fragment of each atom
+        colors : str, optional
+            ``"random"`` (default) for a random color per fragment, or ``"CPK"``
+            for atoms colored by atomic number and black bonds.
+
+        Returns
+        -------
+        plots : list
+            The bond plot and the atom plot (:class:`plotly.graph_objects.Scatter3d`)
+        """
+        labels = np.asarray(labels, dtype=int)
+        fragment_colors = _get_fragment_colors(labels, colors)
+
+        bonds = self._get_internal_bonds(labels)
+
+        return self._get_detail_plots(
+            labels, np.ones(labels.size, dtype=bool), bonds, fragment_colors
+        )
+
+    def get_level_of_detail_plots(
+        self, labels, detail=None, region=None, max_points=100000, colors="random"
+    ):
+        """Gets the data for plotting a very large fragmented system, with the number
+        of points sent to plotly bounded by ``max_points``
+
+        Fragments are shown at three levels of detail:
+
+        * all atoms and bonds of the fragments in ``detail`` and ``region``,
+        * a glyph at the centroid of each other fragment, sized by its number of atoms,
+        * a backbone connecting the centroids of bonded fragments.
+
+        The budget of points is used in this order. Detailed fragments that do not
+        fit are shown as glyphs, and the glyphs and the backbone are decimated
+        (every k-th is kept) to fit.
+
+        Parameters
+        ----------
+        labels : numpy.ndarray
+            Fragment of each atom
+        detail : list, optional
+            Fragments shown with all atoms. Default is ``detail=None``.
+        region : tuple, optional
+            Center and radius of a sphere, the fragments with their centroid inside are
+            shown with all atoms. Default is ``region=None``.
+        max_points : int, optional
+            Maximal number of points in the plots. Default is ``max_points=100000``.
+        colors : str, optional
+            ``"random"`` (default) for a random color per fragment, or ``"CPK"``
+            for atoms colored by atomic number.
+
+        Returns
+        -------
+        plots : list
+            The bond and atom plots of the detailed fragments, the glyph plot
+            and the backbone plot (:class:`plotly.graph_objects.Scatter3d`)
+        """
+        labels = np.asarray(labels, dtype=int)
+        n_fragments = np.max(labels, initial=-1) + 1
+        fragment_colors = _get_fragment_colors(labels, colors)
+
+        sizes = np.bincount(labels, minlength=n_fragments)
+        centroids = (
+            np.column_stack(
+                [
+                    np.bincount(labels, weights=x, minlength=n_fragments)
+                    for x in self.molecule.xyz.T
+                ]
+            )
+            / np.maximum(sizes, 1)[:, None]
+        )
+
+        bonds = np.reshape(np.asarray(self._get_bonds(), dtype=int), (-1, 2))
+        bonded_labels = labels[bonds]
+        is_internal = bonded_labels[:, 0] == bonded_labels[:, 1]
+
+        # fragments in detail, in order of priority, as long as they fit the budget
+        candidates = [] if detail is None else list(detail)
+        if region is not None:
+            center, radius = region
+            distances = np.linalg.norm(centroids - np.asarray(center), axis=1)
+            candidates.extend(np.flatnonzero(distances <= radius))
+        candidates = np.array(candidates, dtype=int)
+        candidates = candidates[np.sort(np.unique(candidates, return_index=True)[1])]
+
+        costs = sizes + 3 * np.bincount(
+            bonded_labels[is_internal, 0], minlength=n_fragments
+        )
+        fits = np.cumsum(costs[candidates]) <= max_points
+        in_detail = np.zeros(n_fragments, dtype=bool)
+        in_detail[candidates[fits]] = True
+        budget = max_points - np.sum(costs[in_detail])
+
+        glyphs = _decimate(np.flatnonzero(~in_detail & (sizes > 0)), budget)
+        budget -= glyphs.size
+
+        backbone = np.unique(np.sort(bonded_labels[~is_internal], axis=1), axis=0)
+        backbone = _decimate(backbone, budget // 3)
+
+        internal = bonds[is_internal & in_detail[bonded_labels[:, 0]]]
+        plots = self._get_detail_plots(
+            labels, in_detail[labels], internal, fragment_colors
+        )
+
+        glyph_colors = "gray" if fragment_colors is None else fragment_colors[glyphs]
+        plots.append(
+            go.Scatter3d(
+                x=centroids[glyphs, 0],
+                y=centroids[glyphs, 1],
+                z=centroids[glyphs, 2],
+                mode="markers",
+                name="fragments",
+                marker=dict(
+                    size=6 * np.cbrt(sizes[glyphs]), color=glyph_colors, opacity=0.5
+                ),
+                customdata=np.column_stack((glyphs, sizes[glyphs])),
+                hovertemplate="fragment %{customdata[0]}: %{customdata[1]} atoms"
+                + "<extra></extra>",
+            )
+        )
+
+        lines = _get_bond_lines(centroids, backbone)
+        plots.append(
+            go.Scatter3d(
+                x=lines[:, 0],
+                y=lines[:, 1],
+                z=lines[:, 2],
+                name="backbone",
+                mode="lines",
+                line=dict(color="gray", width=3),
+                hoverinfo="skip",
+            )
+        )
+
+        return plots
+
+    def _get_internal_bonds(self, labels):
+        bonds = np.reshape(np.asarray(self._get_bonds(), dtype=int), (-1, 2))
+        return bonds[labels[bonds[:, 0]] == labels[bonds[:, 1]]]
+
+    def _get_detail_plots(self, labels, atoms, bonds, fragment_colors):
+        """Bond and atom plot of the given atoms and bonds, colored by fragment
+        or, if ``fragment_colors`` is ``None``, by atomic number"""
+        lines = _get_bond_lines(self.molecule.xyz, bonds)
+        line_labels = np.repeat(labels[bonds[:, 0]], 3)
+
+        if fragment_colors is None:
+            atom_colors = _get_CPK_colors(self.molecule.Z[atoms])
+            line_colors = "black"
+        else:
+            atom_colors = fragment_colors[labels[atoms]]
+            line_colors = fragment_colors[line_labels]
+
+        hovertemplate = "fragment %{customdata}<extra></extra>"
+
+        bond_plot = go.Scatter3d(
+            x=lines[:, 0],
+            y=lines[:, 1],
+            z=lines[:, 2],
+            name="bonds",
+            mode="lines",
+            line=dict(color=line_colors, width=7),
+            customdata=line_labels,
+            hovertemplate=hovertemplate,
+        )
+
+        xyz = self.molecule.xyz[atoms]
+        atom_plot = go.Scatter3d(
+            x=xyz[:, 0],
+            y=xyz[:, 1],
+            z=xyz[:, 2],
+            mode="markers",
+            name="atoms",
+            marker=dict(
+                size=self._get_marker_sizes()[atoms],
+                color=atom_colors,
+                opacity=1,
+            ),
+            customdata=labels[atoms],
+            hovertemplate=hovertemplate,
+        )
+
+        return [bond_plot, atom_plot]
+
+    def _get_bonds(self):
+        if self.bonds is None:
+            return [bond[:2] for bond in self.molecule.get_bonds()]
+
+        return self.bonds
+
+    def _get_marker_sizes(self):
+        from fragmentino.periodic_table import Z_to_covalent_radius
+
+        return (
+            15
+            * np.fromiter(map(Z_to_covalent_radius, (self.molecule.Z)), dtype=float)
+            * self.molecule.bond_factor
+        )
+
+
+def _get_bond_lines(xyz, bonds):
+    """Coordinates of the bond lines, the bonds are separated by NaN
+
+    Returns
+    -------
+    lines : numpy.ndarray
+        Array of shape ``(3 * n_bonds, 3)``
+    """
+    bonds = np.reshape(np.asarray(bonds, dtype=int), (-1, 2))
+
+    lines = np.full((bonds.shape[0], 3, 3), np.nan)
+    lines[:, :2, :] = xyz[bonds]
+
+    return lines.reshape(-1, 3)
+
+
+def _get_CPK_colors(Z):
+    """Colors by atomic number (https://en.wikipedia.org/wiki/CPK_coloring)"""
+    from fragmentino.periodic_table import atom_color
+
+    return np.array(atom_color)[np.asarray(Z) - 1]
+
+
+def _get_fragment_colors(labels, colors):
+    """Random color of each fragment, or ``None`` for coloring by atomic number"""
+    if colors != "random":
+        return None
+
+    n_fragments = np.max(labels, initial=-1) + 1
+    rng = np.random.default_rng()
+    return np.array([f"#{c:06x}" for c in rng.integers(0, 0xFFFFFF, n_fragments)])
+
+
+def _decimate(items, max_items):
+    """Keeps every k-th item, such that at most ``max_items`` are left"""
+    max_items = max(int(max_items), 0)
+    if len(items) <= max_items:
+        return items
+
+    if max_items == 0:
+        return items[:0]
+
+    return items[:: -(-len(items) // max_items)]
@@ -18,4 +18,5 @@ setup(
     description="Description of package",
     install_requires=["numpy", "scipy", "plotly"],
     extras_require=extra_requirements,
+    entry_points={"console_scripts": ["fragmentino = fragmentino.cli:main"]},
 )